@@ -1,8 +1,20 @@
 import os
+import re
+import json
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
-from utils.process_manager import ProcessManager
-from utils.config_manager import ConfigManager
+import threading
+import time
+import uuid
+from flask import Flask, Response, g, render_template, request, jsonify, redirect, url_for, flash, stream_with_context
+from utils.supervisor_client import SupervisorClient
+from utils.supervision import create_portal, create_process_manager, start_supervision
+from utils.job_queue import JobConflict
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetrics, render_metrics
+
+try:
+    from flask_sock import ConnectionClosed, Sock
+except ImportError:  # The interactive WebSocket terminal needs flask-sock
+    Sock = None
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -12,20 +24,116 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 
+# Longest a /view request waits for an application to pass its readiness probes
+VIEW_READY_TIMEOUT = 30
+
+# Seconds between keep-alive comments on idle output streams
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Largest output log range served by one /logs request (bytes)
+LOG_READ_LIMIT = 4 * 1024 * 1024
+
+# Longest a long-polling /api/status request is held open (seconds)
+STATUS_MAX_WAIT = 60
+
+# Distinguishes status ETags of this process from those of an earlier run
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# Endpoints whose latency is exported on /metrics, by handler label
+TIMED_ENDPOINTS = {
+    'get_output': '/get_output',
+    'api_status': '/api/status',
+    'launch_application': '/launch'
+}
+
 # Initialize managers
-process_manager = ProcessManager()
-config_manager = ConfigManager()
+supervisor_socket = os.environ.get("SUPERVISOR_SOCKET")
+if supervisor_socket:
+    # Children, the application catalog and the job table belong to a separate
+    # daemon (python -m utils.supervisor_daemon) shared by every web worker;
+    # this process only talks to it
+    process_manager = SupervisorClient(supervisor_socket)
+    portal = process_manager.portal
+else:
+    process_manager = create_process_manager()
+    portal = create_portal(process_manager)
+# Interactive terminals for PTY-backed apps; without flask-sock /view falls back to SSE and POSTs
+sock = Sock(app) if Sock is not None else None
+if sock is None:
+    logger.warning("flask-sock is not installed: the interactive terminal is disabled, "
+                   "PTY apps fall back to streamed output and input forms")
+request_metrics = RequestMetrics(TIMED_ENDPOINTS.values())
+
+# Last serialized /api/status body and the generation it was built for
+status_cache = {}
+status_cache_lock = threading.Lock()
+
+def status_etag(generation):
+    """ETag of the status at a generation"""
+    return f"{BOOT_ID}-{generation}"
+
+def select_applications(data):
+    """
+    Applications a bulk request names by 'category', 'app_ids' or 'all'
+    
+    Returns:
+        tuple: (selection label, applications); an empty list names an
+        unknown category or application in the label's place
+        
+    Raises:
+        ValueError: If the request selects nothing or is malformed
+    """
+    if data.get('category'):
+        applications = list(portal.get_applications_by_category(data['category']))
+        if not applications:
+            return f"No applications in category '{data['category']}'", []
+        return f"category:{data['category']}", applications
+    if data.get('app_ids'):
+        app_ids = data['app_ids']
+        if not isinstance(app_ids, list) or not all(isinstance(app_id, str) for app_id in app_ids):
+            raise ValueError("app_ids must be a list of application IDs")
+        applications = [portal.get_application(app_id) for app_id in app_ids]
+        unknown = [app_id for app_id, application in zip(app_ids, applications) if not application]
+        if unknown:
+            return f"Applications not found: {', '.join(unknown)}", []
+        return f"apps:{','.join(app_ids)}", applications
+    if data.get('all'):
+        applications = list(portal.get_applications())
+        return ('all', applications) if applications else ("No applications configured", [])
+    raise ValueError("Specify app_id, app_ids, category or all")
+
+# Adoption, telemetry, log indexing and config watching run wherever the children live
+if not supervisor_socket:
+    start_supervision(portal)
+
+@app.before_request
+def start_request_timer():
+    """Note when a timed request started"""
+    if request.endpoint in TIMED_ENDPOINTS:
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Feed the latency of timed requests into their histogram"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        request_metrics.observe(TIMED_ENDPOINTS[request.endpoint], time.perf_counter() - started)
+    return response
 
 @app.route('/')
 def index():
     """Main portal page showing all available applications"""
     try:
-        applications = config_manager.get_applications()
-        running_apps = process_manager.get_running_processes()
-        
-        # Add status to each application
-        for app_config in applications:
-            app_config['status'] = 'running' if app_config['id'] in running_apps else 'stopped'
+        # Add status to a per-request copy; the shared configs are read-only
+        statuses = {entry['id']: entry for entry in portal.status_snapshot()}
+        applications = []
+        for app_config in portal.get_applications():
+            status = statuses.get(app_config['id'], {})
+            applications.append(dict(
+                app_config,
+                status=status.get('status', 'stopped'),
+                restart_pending='restart_pending' in status
+            ))
         
         return render_template('index.html', applications=applications)
     except Exception as e:
@@ -37,7 +145,7 @@ def index():
 def launch_application(app_id):
     """Launch a specific application"""
     try:
-        application = config_manager.get_application(app_id)
+        application = portal.get_application(app_id)
         if not application:
             flash(f"Application '{app_id}' not found", 'error')
             return redirect(url_for('index'))
@@ -47,16 +155,12 @@ def launch_application(app_id):
             flash(f"Application '{application['name']}' is already running", 'warning')
             return redirect(url_for('index'))
         
-        # Launch the application
-        success = process_manager.launch_application(app_id, application)
-        
-        if success:
-            flash(f"Application '{application['name']}' launched successfully", 'success')
-            logger.info(f"Successfully launched application: {app_id}")
-        else:
-            flash(f"Failed to launch application '{application['name']}'", 'error')
-            logger.error(f"Failed to launch application: {app_id}")
+        # Launch the application in the background
+        job = portal.submit('launch', app_id)
+        flash(f"Launching application '{application['name']}' (job {job['id']})", 'info')
             
+    except JobConflict as e:
+        flash(f"Application '{application['name']}' is busy: it has an unfinished {e.job['action']} job", 'warning')
     except Exception as e:
         logger.error(f"Error launching application {app_id}: {e}")
         flash(f"Error launching application: {str(e)}", 'error')
@@ -67,7 +171,7 @@ def launch_application(app_id):
 def stop_application(app_id):
     """Stop a running application"""
     try:
-        application = config_manager.get_application(app_id)
+        application = portal.get_application(app_id)
         if not application:
             flash(f"Application '{app_id}' not found", 'error')
             return redirect(url_for('index'))
@@ -77,16 +181,12 @@ def stop_application(app_id):
             flash(f"Application '{application['name']}' is not running", 'warning')
             return redirect(url_for('index'))
         
-        # Stop the application
-        success = process_manager.stop_application(app_id)
-        
-        if success:
-            flash(f"Application '{application['name']}' stopped successfully", 'success')
-            logger.info(f"Successfully stopped application: {app_id}")
-        else:
-            flash(f"Failed to stop application '{application['name']}'", 'error')
-            logger.error(f"Failed to stop application: {app_id}")
+        # Stop the application in the background
+        job = portal.submit('stop', app_id)
+        flash(f"Stopping application '{application['name']}' (job {job['id']})", 'info')
             
+    except JobConflict as e:
+        flash(f"Application '{application['name']}' is busy: it has an unfinished {e.job['action']} job", 'warning')
     except Exception as e:
         logger.error(f"Error stopping application {app_id}: {e}")
         flash(f"Error stopping application: {str(e)}", 'error')
@@ -97,7 +197,7 @@ def stop_application(app_id):
 def manage():
     """Application management page"""
     try:
-        applications = config_manager.get_applications()
+        applications = portal.get_applications()
         return render_template('manage.html', applications=applications)
     except Exception as e:
         logger.error(f"Error loading applications for management: {e}")
@@ -108,13 +208,8 @@ def manage():
 def add_application():
     """Add a new application to the portal"""
     try:
-        # Load existing applications to determine next ID
-        existing_apps = config_manager.get_applications()
-        existing_ids = [int(app['id']) for app in existing_apps if app.get('id', '').isdigit()]
-        next_id = str(max(existing_ids) + 1) if existing_ids else '100'
-        # Get basic form data (do not use ID from form)
+        # Get basic form data (the ID is allocated when the application is added)
         app_config = {
-            'id': next_id,
             'name': request.form.get('name', '').strip(),
             'description': request.form.get('description', '').strip(),
             'icon': request.form.get('icon', 'play-circle'),
@@ -164,8 +259,8 @@ def add_application():
             else:
                 flash('At least one component is required for multi-component applications.', 'error')
                 return redirect(url_for('manage'))
-        # Add application using config manager
-        if config_manager.add_application(app_config):
+        # Add application to the catalog
+        if portal.add_application(app_config):
             flash('Application added successfully!', 'success')
         else:
             flash('Failed to add application. Please check the logs.', 'error')
@@ -178,37 +273,43 @@ def add_application():
 
 @app.route('/remove_application/<app_id>')
 def remove_application(app_id):
-    """Remove an application from the portal"""
+    """Stop an application in the background and remove it from the portal"""
     try:
-        application = config_manager.get_application(app_id)
+        application = portal.get_application(app_id)
         if not application:
             flash(f"Application '{app_id}' not found", 'error')
             return redirect(url_for('manage'))
         
-        # Stop the application if it's running
-        if process_manager.is_running(app_id):
-            process_manager.stop_application(app_id)
-        
-        # Remove the application
-        success = config_manager.remove_application(app_id)
-        
-        if success:
-            flash(f"Application '{application['name']}' removed successfully", 'success')
-            logger.info(f"Removed application: {app_id}")
-        else:
-            flash("Failed to remove application", 'error')
+        job = portal.remove_application(app_id)
+        flash(f"Removing application '{application['name']}' (job {job['id']})", 'info')
             
+    except JobConflict as e:
+        flash(f"Application '{application['name']}' is busy: it has an unfinished {e.job['action']} job", 'warning')
     except Exception as e:
         logger.error(f"Error removing application {app_id}: {e}")
         flash(f"Error removing application: {str(e)}", 'error')
     
     return redirect(url_for('manage'))
 
+@app.route('/api/applications/<app_id>', methods=['DELETE'])
+def delete_application(app_id):
+    """Queue a job that stops an application and then removes it, returning the job immediately"""
+    try:
+        if not portal.get_application(app_id):
+            return jsonify({'success': False, 'error': f"Application '{app_id}' not found"}), 404
+        job = portal.remove_application(app_id)
+        return jsonify({'success': True, 'job': job}), 202
+    except JobConflict as e:
+        return jsonify({'success': False, 'error': str(e), 'job': e.job}), 409
+    except Exception as e:
+        logger.error(f"Error removing application {app_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/view/<app_id>')
 def view_application(app_id):
     """View a running application in a terminal-like interface or redirect to its URL if specified"""
     try:
-        application = config_manager.get_application(app_id)
+        application = portal.get_application(app_id)
         if not application:
             flash(f"Application '{app_id}' not found", 'error')
             return redirect(url_for('index'))
@@ -227,9 +328,14 @@ def view_application(app_id):
                     app_url = comp['url']
                     break
         if app_url:
-            return redirect(app_url)
+            # Don't send the browser to a server that isn't listening yet
+            if process_manager.wait_until_ready(app_id, timeout=VIEW_READY_TIMEOUT):
+                return redirect(app_url)
+            flash(f"Application '{application['name']}' is not ready yet", 'warning')
         
-        return render_template('terminal.html', application=application, app_id=app_id)
+        info = process_manager.get_process_info(app_id) or {}
+        return render_template('terminal.html', application=application, app_id=app_id,
+                               interactive=sock is not None and bool(info.get('pty')))
         
     except Exception as e:
         logger.error(f"Error viewing application {app_id}: {e}")
@@ -238,32 +344,106 @@ def view_application(app_id):
 
 @app.route('/send_input/<app_id>', methods=['POST'])
 def send_input(app_id):
-    """Send input to a running application"""
+    """Send input to a running application (or one of its components, with 'component')"""
     try:
         data = request.get_json()
         if not data or 'input' not in data:
             return jsonify({'success': False, 'error': 'No input provided'})
         
         user_input = data['input']
-        success = process_manager.send_input(app_id, user_input)
+        component = data.get('component') or None
+        success = process_manager.send_input(app_id, user_input, component)
+        queues = process_manager.get_input_status(app_id)
         
         if success:
-            return jsonify({'success': True})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to send input'})
+            return jsonify({'success': True, 'queue': queues})
+        if not process_manager.is_running(app_id):
+            return jsonify({'success': False, 'error': 'Application is not running'})
+        if any(queue['pending'] for queue in queues.values()):
+            # Backpressure: the child is not reading, retry later
+            return jsonify({'success': False, 'error': 'Input queue is full', 'queue': queues}), 429
+        return jsonify({'success': False, 'error': 'Failed to send input'})
             
     except Exception as e:
         logger.error(f"Error sending input to {app_id}: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+def terminal_socket(ws, app_id):
+    """
+    Interactive terminal session over a WebSocket
+    
+    Output goes to the client as binary frames of UTF-8 as soon as the
+    pump buffers it. Binary frames from the client are written to the
+    process unchanged; text frames carry JSON control messages:
+    {"type": "resize", "rows": ..., "cols": ...} or {"type": "input", "data": "..."}.
+    When the app stops the server sends {"type": "exit"} and closes.
+    """
+    component = request.args.get('component') or None
+    offset = request.args.get('offset', 0, type=int)
+    closed = threading.Event()
+    
+    def forward_output():
+        next_offset = offset
+        try:
+            while not closed.is_set():
+                chunk = process_manager.wait_output(app_id, next_offset, STREAM_HEARTBEAT_SECONDS, component)
+                if chunk is None:
+                    ws.send(json.dumps({'type': 'exit'}))
+                    break
+                if chunk['output']:
+                    next_offset = chunk['next_offset']
+                    ws.send(chunk['output'].encode('utf-8'))
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Error forwarding terminal output of {app_id}: {e}")
+        finally:
+            closed.set()
+            ws.close()
+    
+    threading.Thread(target=forward_output, name=f"terminal-{app_id}", daemon=True).start()
+    try:
+        while not closed.is_set():
+            message = ws.receive(timeout=STREAM_HEARTBEAT_SECONDS)
+            if message is None:
+                continue
+            if isinstance(message, bytes):
+                process_manager.write_terminal(app_id, message, component)
+                continue
+            try:
+                control = json.loads(message)
+                if control.get('type') == 'resize':
+                    process_manager.resize_terminal(app_id, max(1, int(control['rows'])),
+                                                    max(1, int(control['cols'])), component)
+                elif control.get('type') == 'input':
+                    process_manager.write_terminal(app_id, str(control['data']).encode('utf-8'), component)
+            except (ValueError, TypeError, KeyError, AttributeError):
+                logger.debug(f"Ignoring malformed terminal message for {app_id}: {message[:100]}")
+    except ConnectionClosed:
+        pass
+    finally:
+        closed.set()
+
+if sock is not None:
+    sock.route('/ws/terminal/<app_id>')(terminal_socket)
+
 @app.route('/get_output/<app_id>')
 def get_output(app_id):
-    """Get output from a running application"""
+    """Get output from a running application, starting at the caller's offset"""
     try:
-        output = process_manager.get_output(app_id)
+        offset = request.args.get('offset', 0, type=int)
+        chunk = process_manager.read_output(app_id, offset, request.args.get('component') or None)
+        if chunk is None:
+            return jsonify({
+                'success': True,
+                'output': '',
+                'offset': offset
+            })
         return jsonify({
             'success': True,
-            'output': output
+            'output': chunk['output'],
+            'offset': chunk['next_offset'],
+            'truncated': chunk['truncated']
         })
     except Exception as e:
         logger.error(f"Error getting output from {app_id}: {e}")
@@ -272,31 +452,276 @@ def get_output(app_id):
             'error': str(e)
         })
 
+@app.route('/stream_output/<app_id>')
+def stream_output(app_id):
+    """Stream output from a running application as Server-Sent Events"""
+    # EventSource reconnects send the last id they saw; fresh clients may pass ?offset=
+    try:
+        offset = int(request.headers.get('Last-Event-ID') or request.args.get('offset', 0))
+    except ValueError:
+        offset = 0
+    component = request.args.get('component') or None
+    
+    def generate():
+        next_offset = offset
+        while True:
+            chunk = process_manager.wait_output(app_id, next_offset, STREAM_HEARTBEAT_SECONDS, component)
+            if chunk is None:
+                yield "event: end\ndata: {}\n\n"
+                return
+            if chunk['output']:
+                next_offset = chunk['next_offset']
+                payload = json.dumps({'output': chunk['output'], 'truncated': chunk['truncated']})
+                yield f"id: {next_offset}\ndata: {payload}\n\n"
+            else:
+                # Idle: keep proxies from closing the connection
+                yield ": keep-alive\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/logs/<app_id>')
+def read_log(app_id):
+    """
+    Serve a range of an application's persisted output from disk
+    
+    The range is given by ?start=&end= byte offsets, ?since=&until= Unix
+    times, or a standard Range header (answered with 206). The served range
+    and the offset to continue from come back in X-Log-* headers.
+    """
+    try:
+        component = request.args.get('component') or None
+        range_args = {
+            'start': request.args.get('start', type=int),
+            'end': request.args.get('end', type=int),
+            'since': request.args.get('since', type=float),
+            'until': request.args.get('until', type=float),
+            'limit': min(request.args.get('limit', LOG_READ_LIMIT, type=int), LOG_READ_LIMIT)
+        }
+        byte_range = request.range if request.range and request.range.units == 'bytes' else None
+        if byte_range is not None and len(byte_range.ranges) == 1:
+            first, last = byte_range.ranges[0]
+            if first < 0:
+                # Suffix range ("bytes=-N"): the last N bytes
+                segments = process_manager.get_log_segments(app_id, component) or []
+                first = max(0, (segments[-1]['end'] if segments else 0) + first)
+            range_args['start'] = first
+            range_args['end'] = last
+        
+        chunk = process_manager.read_log(app_id, component, **range_args)
+        if chunk is None:
+            return jsonify({'success': False, 'error': 'Output logging is disabled'}), 404
+        
+        status = 200
+        headers = {
+            'X-Log-Start': str(chunk['start']),
+            'X-Log-Next-Offset': str(chunk['next_offset']),
+            'X-Log-End-Offset': str(chunk['end_offset']),
+            'X-Log-Truncated': 'true' if chunk['truncated'] else 'false',
+            'Accept-Ranges': 'bytes'
+        }
+        if byte_range is not None:
+            status = 206
+            headers['Content-Range'] = (
+                f"bytes {chunk['start']}-{chunk['next_offset'] - 1}/{chunk['end_offset']}"
+                if chunk['data'] else f"bytes */{chunk['end_offset']}"
+            )
+            if not chunk['data']:
+                status = 416
+        return Response(chunk['data'], status=status, mimetype='text/plain', headers=headers)
+    except Exception as e:
+        logger.error(f"Error reading output log of {app_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/logs/<app_id>')
+def log_index(app_id):
+    """List the on-disk output segments of an application (or ?component=)"""
+    segments = process_manager.get_log_segments(app_id, request.args.get('component') or None)
+    if segments is None:
+        return jsonify({'success': False, 'error': 'Output logging is disabled'}), 404
+    return jsonify({
+        'success': True,
+        'segments': segments,
+        'end_offset': segments[-1]['end'] if segments else 0
+    })
+
+@app.route('/api/search')
+def search_output():
+    """
+    Search the output of every application
+    
+    Query parameters: q (required), regex=1, case=1, app (repeatable),
+    component, since/until (Unix times), limit and context (lines).
+    """
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({'success': False, 'error': 'No query provided'}), 400
+    try:
+        result = process_manager.search_output(
+            query,
+            regex=request.args.get('regex') == '1',
+            case_sensitive=request.args.get('case') == '1',
+            app_ids=request.args.getlist('app') or None,
+            component=request.args.get('component') or None,
+            since=request.args.get('since', type=float),
+            until=request.args.get('until', type=float),
+            limit=min(request.args.get('limit', 100, type=int), 1000),
+            context=min(request.args.get('context', 2, type=int), 20)
+        )
+    except re.error as e:
+        return jsonify({'success': False, 'error': f"Invalid regular expression: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error searching output: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    names = {app_config['id']: app_config['name'] for app_config in portal.get_applications()}
+    for match in result['matches']:
+        match['app_name'] = names.get(match['app_id'])
+    return jsonify({'success': True, **result})
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a launch or stop job and return its ID immediately
+    
+    Acts on one application ('app_id'), or in bulk on a 'category', a list
+    of 'app_ids' or 'all' applications. Bulk launches run at most
+    'max_parallel' at a time under the manager's admission control; the
+    finished job carries the aggregated outcome as 'result'.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        app_id = data.get('app_id', '')
+        if action not in ('launch', 'stop'):
+            return jsonify({'success': False, 'error': "Action must be 'launch' or 'stop'"}), 400
+        
+        if not app_id:
+            try:
+                selection, applications = select_applications(data)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            if not applications:
+                return jsonify({'success': False, 'error': selection}), 404
+            max_parallel = data.get('max_parallel')
+            if max_parallel is not None and (not isinstance(max_parallel, int) or max_parallel < 1):
+                return jsonify({'success': False, 'error': 'max_parallel must be a positive integer'}), 400
+            job = portal.submit_bulk(action, selection, [a['id'] for a in applications], max_parallel)
+            return jsonify({'success': True, 'job': job}), 202
+        
+        application = portal.get_application(app_id)
+        if not application:
+            return jsonify({'success': False, 'error': f"Application '{app_id}' not found"}), 404
+        
+        active = portal.get_active_job(app_id)
+        if active is None:
+            if action == 'launch' and process_manager.is_running(app_id):
+                return jsonify({'success': False, 'error': 'Application is already running'}), 409
+            if action == 'stop' and not process_manager.is_running(app_id):
+                return jsonify({'success': False, 'error': 'Application is not running'}), 409
+        
+        job = portal.submit(action, app_id)
+        return jsonify({'success': True, 'job': job}), 202
+    except JobConflict as e:
+        # A stop during a launch (or the reverse) would otherwise be silently dropped
+        return jsonify({'success': False, 'error': str(e), 'job': e.job}), 409
+    except Exception as e:
+        logger.error(f"Error creating job: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/jobs')
+def list_jobs():
+    """List recent launch/stop jobs"""
+    return jsonify({
+        'success': True,
+        'jobs': portal.list_jobs()
+    })
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Get the state and per-component progress of a job"""
+    job = portal.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f"Job '{job_id}' not found"}), 404
+    return jsonify({'success': True, 'job': job})
+
+def status_body(generation):
+    """Serialized status for a generation, rebuilt only when the generation moves"""
+    with status_cache_lock:
+        if status_cache.get('generation') == generation:
+            return status_cache['body']
+    body = json.dumps({'success': True, 'generation': generation, 'applications': portal.status_snapshot()})
+    with status_cache_lock:
+        status_cache.update(generation=generation, body=body)
+    return body
+
 @app.route('/api/status')
 def api_status():
-    """API endpoint to get application status"""
+    """
+    API endpoint to get application status
+    
+    Responses carry an ETag for the status generation, and If-None-Match
+    gets a 304 while nothing changed. With ?wait=<seconds> such a request
+    is held open until the status changes or the wait runs out.
+    """
     try:
-        applications = config_manager.get_applications()
-        running_apps = process_manager.get_running_processes()
-        
-        status_data = []
-        for app_config in applications:
-            status_data.append({
-                'id': app_config['id'],
-                'name': app_config['name'],
-                'status': 'running' if app_config['id'] in running_apps else 'stopped'
-            })
+        generation = process_manager.status_generation
+        wait = min(max(request.args.get('wait', 0, type=float), 0), STATUS_MAX_WAIT)
+        if request.if_none_match.contains(status_etag(generation)) and wait:
+            generation = process_manager.wait_for_status_change(generation, wait)
+        etag = status_etag(generation)
         
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(status_body(generation), mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        logger.error(f"Error getting status: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/telemetry')
+def api_telemetry():
+    """Current and recent resource usage for every application in one call"""
+    try:
+        limit = request.args.get('samples', type=int)
         return jsonify({
             'success': True,
-            'applications': status_data
+            'interval': process_manager.telemetry.interval,
+            'applications': process_manager.telemetry.snapshot(limit)
         })
     except Exception as e:
-        logger.error(f"Error getting status: {e}")
+        logger.error(f"Error getting telemetry: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@app.route('/api/telemetry/<app_id>')
+def api_app_telemetry(app_id):
+    """Process details plus current and recent resource usage for one application"""
+    limit = request.args.get('samples', type=int)
+    return jsonify({
+        'success': True,
+        'process': process_manager.get_process_info(app_id),
+        'current': process_manager.telemetry.get_current(app_id),
+        'history': process_manager.telemetry.get_history(app_id, limit)
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint, rendered from cached counters only"""
+    names = {app_config['id']: app_config['name'] for app_config in portal.get_applications()}
+    body = render_metrics(process_manager.get_app_metrics(), names, request_metrics)
+    return Response(body, mimetype=None, headers={'Content-Type': METRICS_CONTENT_TYPE})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,3 +1,12 @@
+import os
+
+if __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+    # The debug reloader's watcher process re-runs this file in a child that
+    # serves requests; it must not take over running applications itself
+    os.environ['PORTAL_WATCHER_PROCESS'] = '1'
+else:
+    os.environ.pop('PORTAL_WATCHER_PROCESS', None)
+
 from app import app
 
 if __name__ == '__main__':
@@ -1,7 +1,11 @@
 // Portal JavaScript functionality
 
-// Auto-refresh status every 30 seconds
-let statusRefreshInterval;
+// Live status: long-poll /api/status, which answers as soon as anything changes
+const STATUS_POLL_WAIT = 25;       // seconds the server may hold a poll open
+const STATUS_RETRY_DELAY = 5000;   // ms to back off after a failed poll
+let statusRefreshActive = false;
+let statusRefreshTimer = null;
+let statusEtag = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize search and filter functionality
@@ -87,30 +91,59 @@ function filterApplications(searchTerm, category) {
 }
 
 function startStatusRefresh() {
-    statusRefreshInterval = setInterval(refreshStatus, 30000); // Refresh every 30 seconds
+    statusRefreshActive = true;
+    pollStatus();
 }
 
 function stopStatusRefresh() {
-    if (statusRefreshInterval) {
-        clearInterval(statusRefreshInterval);
+    statusRefreshActive = false;
+    if (statusRefreshTimer) {
+        clearTimeout(statusRefreshTimer);
+        statusRefreshTimer = null;
     }
 }
 
+function fetchStatus(wait) {
+    // Conditional request: 304 while nothing changed, held open up to `wait` seconds
+    const headers = statusEtag ? {'If-None-Match': statusEtag} : {};
+    const url = wait ? `/api/status?wait=${wait}` : '/api/status';
+    return fetch(url, {cache: 'no-store', headers: headers})
+        .then(response => {
+            if (response.status === 304) {
+                return;
+            }
+            statusEtag = response.headers.get('ETag');
+            return response.json().then(data => {
+                if (data.success) {
+                    updateStatusBadges(data.applications);
+                } else {
+                    throw new Error(data.error);
+                }
+            });
+        });
+}
+
+function pollStatus() {
+    if (!statusRefreshActive) {
+        return;
+    }
+    fetchStatus(STATUS_POLL_WAIT)
+        .then(() => {
+            statusRefreshTimer = setTimeout(pollStatus, 0);
+        })
+        .catch(error => {
+            console.error('Error refreshing status:', error);
+            statusRefreshTimer = setTimeout(pollStatus, STATUS_RETRY_DELAY);
+        });
+}
+
 function refreshStatus() {
     const statusIndicator = document.getElementById('statusRefresh');
     if (statusIndicator) {
         statusIndicator.style.display = 'block';
     }
     
-    fetch('/api/status')
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                updateStatusBadges(data.applications);
-            } else {
-                console.error('Failed to refresh status:', data.error);
-            }
-        })
+    fetchStatus(0)
         .catch(error => {
             console.error('Error refreshing status:', error);
         })
@@ -121,12 +154,20 @@ function refreshStatus() {
         });
 }
 
+function statusColor(status) {
+    const colors = {
+        running: 'success', starting: 'warning', restarting: 'warning', stopping: 'warning',
+        crashed: 'danger', 'crash-loop': 'danger'
+    };
+    return colors[status] || 'secondary';
+}
+
 function updateStatusBadges(applications) {
     applications.forEach(app => {
         const badge = document.querySelector(`[data-app-id="${app.id}"]`);
         if (badge) {
             badge.textContent = app.status;
-            badge.className = `badge bg-${app.status === 'running' ? 'success' : 'secondary'} status-badge`;
+            badge.className = `badge bg-${statusColor(app.status)} status-badge`;
         }
         
         // Update action buttons
@@ -138,7 +179,7 @@ function updateStatusBadges(applications) {
                 if (buttonContainer) {
                     const actionButton = buttonContainer.querySelector('a');
                     if (actionButton) {
-                        if (app.status === 'running') {
+                        if (app.status === 'running' || app.status === 'restarting') {
                             actionButton.href = `/stop/${app.id}`;
                             actionButton.className = 'btn btn-danger btn-sm';
                             actionButton.innerHTML = '<i data-feather="stop-circle"></i> Stop';
@@ -157,6 +198,98 @@ function updateStatusBadges(applications) {
     feather.replace();
 }
 
+// Run launch/stop as background jobs instead of blocking page loads
+
+document.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-job-action]');
+    if (!button) return;
+    e.preventDefault();
+    
+    const action = button.getAttribute('data-job-action');
+    const appId = button.getAttribute('data-job-app');
+    button.classList.add('disabled');
+    button.textContent = action === 'launch' ? 'Launching...' : 'Stopping...';
+    
+    fetch('/api/jobs', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ action: action, app_id: appId })
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            pollJob(data.job.id, button);
+        })
+        .catch(error => {
+            alert(`Failed to ${action} application: ${error.message}`);
+            window.location.reload();
+        });
+});
+
+// Launch/stop the selected category (or everything) as one bulk job
+document.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-bulk-action]');
+    if (!button) return;
+    e.preventDefault();
+    
+    const action = button.getAttribute('data-bulk-action');
+    const category = getCurrentCategory();
+    const scope = category ? `all ${category} applications` : 'all applications';
+    if (action === 'stop' && !confirm(`Stop ${scope}?`)) return;
+    button.classList.add('disabled');
+    button.textContent = action === 'launch' ? 'Launching...' : 'Stopping...';
+    
+    fetch('/api/jobs', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(category ? { action: action, category: category } : { action: action, all: true })
+    })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            pollJob(data.job.id, button);
+        })
+        .catch(error => {
+            alert(`Failed to ${action} ${scope}: ${error.message}`);
+            window.location.reload();
+        });
+});
+
+function pollJob(jobId, button) {
+    fetch(`/api/jobs/${jobId}`)
+        .then(response => response.json())
+        .then(data => {
+            const job = data.job;
+            if (!data.success || !job) {
+                window.location.reload();
+                return;
+            }
+            if (job.state === 'queued' || job.state === 'running') {
+                const components = Object.entries(job.progress);
+                if (components.length > 1) {
+                    const finished = ['ready', 'started', 'not-ready', 'failed', 'skipped', 'stopped'];
+                    const done = components.filter(([, state]) => finished.includes(state)).length;
+                    button.textContent = `${job.action === 'launch' ? 'Launching' : 'Stopping'} (${done}/${components.length})...`;
+                }
+                setTimeout(() => pollJob(jobId, button), 500);
+                return;
+            }
+            if (job.state === 'failed') {
+                alert(job.targets ? job.error : `Failed to ${job.action} application: ${job.error}`);
+            }
+            window.location.reload();
+        })
+        .catch(() => setTimeout(() => pollJob(jobId, button), 2000));
+}
+
 // Show/hide single vs multi-component config sections
 
 document.addEventListener('DOMContentLoaded', function() {
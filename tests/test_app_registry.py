@@ -0,0 +1,74 @@
+import pytest
+
+from utils.config_manager import ApplicationRegistry, freeze, thaw
+
+APPS = [
+    {'id': '100', 'name': 'Shell', 'command': 'bash'},
+    {'id': '105', 'name': 'Web', 'category': 'Web', 'components': [{'name': 'api', 'command': 'serve'}]},
+    {'id': 'docs', 'name': 'Docs', 'category': 'Web', 'command': 'mkdocs serve'},
+]
+
+
+@pytest.fixture
+def registry():
+    return ApplicationRegistry.build(APPS)
+
+
+def ids(apps):
+    return [app['id'] for app in apps]
+
+
+def test_build_indexes_by_id_and_category(registry):
+    assert ids(registry.applications) == ['100', '105', 'docs']
+    assert registry.by_id['docs']['name'] == 'Docs'
+    assert {category: ids(apps) for category, apps in registry.by_category.items()} == {
+        'General': ['100'], 'Web': ['105', 'docs']
+    }
+    assert registry.categories == ('General', 'Web')
+    assert registry.max_numeric_id == 105
+
+
+def test_entries_are_frozen(registry):
+    app = registry.by_id['105']
+    with pytest.raises(TypeError):
+        app['name'] = 'Changed'
+    assert isinstance(app['components'], tuple)
+    assert thaw(app) == APPS[1]
+    assert registry.to_list() == APPS
+
+
+def test_no_numeric_ids():
+    assert ApplicationRegistry.build([{'id': 'a', 'name': 'A'}]).max_numeric_id is None
+    assert ApplicationRegistry.build([]).categories == ()
+
+
+def test_with_added_leaves_original_untouched(registry):
+    added = registry.with_added(freeze({'id': '120', 'name': 'Tools', 'category': 'Ops'}))
+    assert ids(added.applications) == ['100', '105', 'docs', '120']
+    assert ids(added.by_category['Ops']) == ['120']
+    assert added.max_numeric_id == 120
+    assert '120' not in registry.by_id
+    assert 'Ops' not in registry.by_category
+    assert registry.max_numeric_id == 105
+
+
+def test_with_removed_drops_empty_category_and_recomputes_max_id(registry):
+    removed = registry.with_removed('105')
+    assert ids(removed.applications) == ['100', 'docs']
+    assert ids(removed.by_category['Web']) == ['docs']
+    assert removed.max_numeric_id == 100
+    removed = removed.with_removed('100')
+    assert 'General' not in removed.by_category
+    assert removed.max_numeric_id is None
+    assert ids(registry.applications) == ['100', '105', 'docs']
+
+
+def test_with_replaced_keeps_position_and_moves_category(registry):
+    replaced = registry.with_replaced('100', freeze({'id': '100', 'name': 'Shell', 'category': 'Web'}))
+    assert ids(replaced.applications) == ['100', '105', 'docs']
+    assert 'General' not in replaced.by_category
+    assert ids(replaced.by_category['Web']) == ['105', 'docs', '100']
+
+    renamed = registry.with_replaced('docs', freeze({'id': 'docs', 'name': 'Manual', 'category': 'Web'}))
+    assert [app['name'] for app in renamed.by_category['Web']] == ['Web', 'Manual']
+    assert registry.by_id['docs']['name'] == 'Docs'
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from utils.config_store import ConfigStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    snapshot = tmp_path / 'applications.json'
+    snapshot.write_text(json.dumps({'title': 'Portal', 'applications': [{'id': '100', 'name': 'One'}]}))
+    return ConfigStore(str(snapshot), compact_threshold=3)
+
+
+def test_load_replays_journal_over_snapshot(store):
+    store.append([
+        {'op': 'put', 'app': {'id': '101', 'name': 'Two'}},
+        {'op': 'put', 'app': {'id': '100', 'name': 'One, renamed'}},
+        {'op': 'delete', 'id': '101'},
+    ])
+    settings, applications = ConfigStore(store.snapshot_file).load()
+    assert settings == {'title': 'Portal'}
+    assert applications == [{'id': '100', 'name': 'One, renamed'}]
+
+
+def test_replay_is_idempotent(store):
+    store.append([{'op': 'put', 'app': {'id': '101', 'name': 'Two'}}])
+    _, applications = store.load()
+    store.write_snapshot({}, applications)
+    # The same operation replayed over a snapshot that already has it changes nothing
+    store.append([{'op': 'put', 'app': {'id': '101', 'name': 'Two'}}])
+    _, applications = store.load()
+    assert [app['id'] for app in applications] == ['100', '101']
+
+
+def test_torn_final_line_is_discarded_and_truncated(store):
+    store.append([{'op': 'put', 'app': {'id': '101', 'name': 'Two'}}])
+    with open(store.journal_file, 'a') as f:
+        f.write('{"op":"put","app":{"id":"10')
+    _, applications = store.load()
+    assert [app['id'] for app in applications] == ['100', '101']
+    with open(store.journal_file) as f:
+        assert f.read().endswith('}\n')
+
+
+def test_corrupt_line_is_skipped(store):
+    with open(store.journal_file, 'w') as f:
+        f.write('not json\n')
+    store.append([{'op': 'put', 'app': {'id': '101', 'name': 'Two'}}])
+    _, applications = store.load()
+    assert [app['id'] for app in applications] == ['100', '101']
+
+
+def test_hand_edited_snapshot_wins_over_older_journal(store):
+    store.append([{'op': 'put', 'app': {'id': '101', 'name': 'Two'}}])
+    later = os.stat(store.journal_file).st_mtime + 10
+    with open(store.snapshot_file, 'w') as f:
+        json.dump({'applications': [{'id': '200', 'name': 'Edited'}]}, f)
+    os.utime(store.snapshot_file, (later, later))
+    _, applications = store.load()
+    assert applications == [{'id': '200', 'name': 'Edited'}]
+    # Discarded entries still count, so the next compaction clears them
+    assert store.journal_entries == 1
+
+
+def test_compaction_folds_journal_into_snapshot(store):
+    operations = [{'op': 'put', 'app': {'id': str(101 + n), 'name': f'App {n}'}} for n in range(3)]
+    for operation in operations[:2]:
+        store.append([operation])
+        assert not store.needs_compaction()
+    store.append(operations[2:])
+    assert store.needs_compaction()
+
+    settings, applications = store.load()
+    assert store.write_snapshot(settings, applications)
+    assert store.journal_entries == 0
+    assert not store.needs_compaction()
+    assert os.path.getsize(store.journal_file) == 0
+    with open(store.snapshot_file) as f:
+        assert json.load(f) == {'title': 'Portal', 'applications': applications}
+    assert not [name for name in os.listdir(os.path.dirname(store.snapshot_file)) if name.endswith('.tmp')]
+
+    _, reloaded = ConfigStore(store.snapshot_file).load()
+    assert reloaded == applications
+
+
+def test_snapshot_changed_ignores_own_writes_and_touches(store):
+    store.load()
+    assert not store.snapshot_changed()
+    store.write_snapshot({}, [{'id': '100', 'name': 'One'}])
+    assert not store.snapshot_changed()
+
+    stat = os.stat(store.snapshot_file)
+    os.utime(store.snapshot_file, (stat.st_atime + 5, stat.st_mtime + 5))
+    assert not store.snapshot_changed()
+
+    with open(store.snapshot_file, 'w') as f:
+        json.dump({'applications': []}, f)
+    assert store.snapshot_changed()
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from utils import job_queue
+from utils.job_queue import FAILED, SUCCEEDED, JobConflict, JobQueue
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(max_workers=2)
+
+
+def blocking_work(release: threading.Event, result: bool = True):
+    def work(job):
+        release.wait(5)
+        return result
+    return work
+
+
+def wait_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+def test_same_action_returns_the_unfinished_job(queue):
+    release = threading.Event()
+    first = queue.submit('launch', 'app', blocking_work(release))
+    second = queue.submit('launch', 'app', blocking_work(release))
+    assert second is first
+    release.set()
+    wait_finished(first)
+    assert first.state == SUCCEEDED
+    # Once finished, the same action queues a new job
+    third = queue.submit('launch', 'app', lambda job: True)
+    assert third is not first
+    wait_finished(third)
+
+
+def test_other_action_conflicts(queue):
+    release = threading.Event()
+    launch = queue.submit('launch', 'app', blocking_work(release))
+    with pytest.raises(JobConflict) as raised:
+        queue.submit('stop', 'app', lambda job: True)
+    assert raised.value.app_id == 'app'
+    assert raised.value.job['id'] == launch.id
+    assert raised.value.job['action'] == 'launch'
+    assert launch.id in str(raised.value)
+    release.set()
+    wait_finished(launch)
+
+
+def test_bulk_job_blocks_its_targets(queue):
+    release = threading.Event()
+    bulk = queue.submit('launch', 'category:Web', blocking_work(release), targets=['a', 'b'])
+    assert queue.get_active('b') is bulk
+    with pytest.raises(JobConflict) as raised:
+        queue.submit('stop', 'b', lambda job: True)
+    assert raised.value.app_id == 'b'
+    assert raised.value.job['app_id'] == 'category:Web'
+    # An application outside the selection is unaffected
+    other = queue.submit('stop', 'c', lambda job: True)
+    release.set()
+    wait_finished(bulk)
+    wait_finished(other)
+    assert queue.get_active('b') is None
+
+
+def test_bulk_job_conflicts_with_a_target_job(queue):
+    release = threading.Event()
+    single = queue.submit('stop', 'b', blocking_work(release))
+    with pytest.raises(JobConflict) as raised:
+        queue.submit('launch', 'all', lambda job: True, targets=['a', 'b'])
+    assert raised.value.app_id == 'b'
+    assert raised.value.job['id'] == single.id
+    release.set()
+    wait_finished(single)
+
+
+def test_failures_are_recorded(queue):
+    refused = queue.submit('launch', 'a', lambda job: False)
+    def broken(job):
+        raise RuntimeError("boom")
+    crashed = queue.submit('launch', 'b', broken)
+    wait_finished(refused)
+    wait_finished(crashed)
+    assert (refused.state, refused.error) == (FAILED, "Failed to launch application")
+    assert (crashed.state, crashed.error) == (FAILED, "boom")
+    assert queue.get_active('a') is None
+
+
+def test_progress_and_snapshot(queue):
+    def work(job):
+        job.report('web', 'ready')
+        return True
+    job = queue.submit('launch', 'app', work)
+    wait_finished(job)
+    data = job.to_dict()
+    assert data['progress'] == {'web': 'ready'}
+    assert data['state'] == SUCCEEDED
+    assert data['started_at'] <= data['finished_at']
+    assert queue.get(job.id) is job
+    assert queue.list_jobs()[0] is job
+
+
+def test_finished_jobs_are_trimmed(queue, monkeypatch):
+    monkeypatch.setattr(job_queue, 'MAX_FINISHED_JOBS', 2)
+    jobs = []
+    for n in range(4):
+        jobs.append(queue.submit('stop', f'app-{n}', lambda job: True))
+        wait_finished(jobs[-1])
+    queue.submit('stop', 'app-4', lambda job: True)
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[-1].id) is jobs[-1]
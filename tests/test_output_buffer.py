@@ -0,0 +1,104 @@
+import threading
+
+from utils.output_buffer import OutputBuffer
+
+
+class RecordingSink:
+    def __init__(self):
+        self.appended = []
+        self.closed = False
+
+    def append(self, text):
+        self.appended.append(text)
+
+    def close(self):
+        self.closed = True
+
+
+def test_offsets_count_encoded_bytes():
+    buffer = OutputBuffer()
+    assert buffer.append("abc") == 3
+    assert buffer.append("é€") == 8
+    assert buffer.read(0) == ("abcé€", 0, 8)
+    assert buffer.read(3) == ("é€", 3, 8)
+    assert buffer.read(8) == ("", 8, 8)
+
+
+def test_starts_at_given_offset():
+    buffer = OutputBuffer(offset=1000)
+    buffer.append("hello")
+    assert (buffer.start_offset, buffer.end_offset) == (1000, 1005)
+    # An offset from before this buffer is clamped to its first byte
+    assert buffer.read(0) == ("hello", 1000, 1005)
+
+
+def test_wrap_evicts_oldest_bytes():
+    buffer = OutputBuffer(max_size=10)
+    buffer.append("0123456789")
+    buffer.append("abcd")
+    assert buffer.read(0) == ("456789abcd", 4, 14)
+    assert buffer.dropped == 4
+    assert buffer.start_offset == 4
+
+
+def test_wrap_drops_whole_chunks_then_trims_the_head():
+    buffer = OutputBuffer(max_size=5)
+    for text in ("aa", "bb", "cc", "dd"):
+        buffer.append(text)
+    assert buffer.read(0) == ("bccdd", 3, 8)
+    assert buffer.dropped == 3
+
+
+def test_wrap_never_splits_a_character():
+    buffer = OutputBuffer(max_size=3)
+    buffer.append("a€b")  # 1 + 3 + 1 bytes
+    # Cutting two bytes would leave part of the euro sign; the whole sign goes instead
+    assert buffer.read(0) == ("b", 4, 5)
+    assert buffer.dropped == 4
+
+
+def test_offset_past_end_restarts_from_oldest():
+    buffer = OutputBuffer()
+    buffer.append("fresh")
+    assert buffer.read(500) == ("fresh", 0, 5)
+
+
+def test_clear_keeps_offsets_monotonic():
+    buffer = OutputBuffer()
+    buffer.append("old")
+    buffer.clear()
+    assert buffer.read(0) == ("", 3, 3)
+    buffer.append("new")
+    assert buffer.read(3) == ("new", 3, 6)
+
+
+def test_sink_sees_every_append_and_close():
+    sink = RecordingSink()
+    buffer = OutputBuffer(max_size=2, sink=sink)
+    buffer.append("one")
+    buffer.append("two")
+    buffer.close()
+    assert sink.appended == ["one", "two"]
+    assert sink.closed
+    assert buffer.closed
+
+
+def test_wait_returns_on_new_output():
+    buffer = OutputBuffer()
+    buffer.append("x")
+    assert buffer.wait(0, timeout=0)
+    assert not buffer.wait(1, timeout=0.01)
+
+    timer = threading.Timer(0.05, buffer.append, args=("y",))
+    timer.start()
+    try:
+        assert buffer.wait(1, timeout=5)
+    finally:
+        timer.cancel()
+    assert buffer.read(1) == ("y", 1, 2)
+
+
+def test_wait_ends_when_closed():
+    buffer = OutputBuffer()
+    buffer.close()
+    assert not buffer.wait(0, timeout=5)
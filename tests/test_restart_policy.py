@@ -0,0 +1,79 @@
+from unittest import mock
+
+import pytest
+
+from utils import restart_policy
+from utils.restart_policy import ALWAYS, ON_FAILURE, RestartPolicy, RestartTracker
+
+
+def test_from_config_without_block_inherits():
+    inherited = RestartPolicy(ON_FAILURE)
+    assert RestartPolicy.from_config({}) is None
+    assert RestartPolicy.from_config({}, inherited) is inherited
+
+
+def test_from_config_accepts_policy_name():
+    policy = RestartPolicy.from_config({'restart': 'always'})
+    assert policy.policy == ALWAYS
+    assert policy.max_restarts == restart_policy.DEFAULT_MAX_RESTARTS
+
+
+@pytest.mark.parametrize('settings', ['never', {'policy': 'never'}, {'policy': 'sometimes'}])
+def test_from_config_never_or_unknown_disables(settings):
+    assert RestartPolicy.from_config({'restart': settings}, RestartPolicy(ALWAYS)) is None
+
+
+def test_from_config_reads_block():
+    policy = RestartPolicy.from_config({'restart': {'max_restarts': '3', 'window': 10,
+                                                    'backoff': 0.5, 'max_backoff': 4}})
+    assert policy.to_dict() == {'policy': ON_FAILURE, 'max_restarts': 3, 'window': 10.0,
+                                'backoff': 0.5, 'max_backoff': 4.0}
+
+
+def test_applies_to():
+    assert RestartPolicy(ALWAYS).applies_to(0)
+    assert not RestartPolicy(ON_FAILURE).applies_to(0)
+    assert RestartPolicy(ON_FAILURE).applies_to(1)
+    assert RestartPolicy(ON_FAILURE).applies_to(None)
+
+
+def test_backoff_doubles_up_to_max_with_equal_jitter():
+    tracker = RestartTracker(RestartPolicy(ON_FAILURE, max_restarts=10, initial_backoff=1, max_backoff=5))
+    for backoff in (1, 2, 4, 5, 5):
+        delay = tracker.next_delay()
+        assert backoff / 2 <= delay <= backoff
+    assert tracker.restarts == 5
+
+
+@pytest.mark.parametrize('fraction', [0.0, 1.0])
+def test_jitter_bounds(fraction):
+    tracker = RestartTracker(RestartPolicy(ON_FAILURE, max_restarts=10, initial_backoff=2, max_backoff=30))
+    with mock.patch.object(restart_policy.random, 'uniform', lambda low, high: low + (high - low) * fraction):
+        delays = [tracker.next_delay() for _ in range(3)]
+    if fraction == 0.0:
+        assert delays == [1.0, 2.0, 4.0]
+    else:
+        assert delays == [2.0, 4.0, 8.0]
+
+
+def test_crash_loop_once_window_budget_is_used():
+    tracker = RestartTracker(RestartPolicy(ON_FAILURE, max_restarts=2, window=60))
+    assert tracker.next_delay() is not None
+    assert tracker.next_delay() is not None
+    assert tracker.next_delay() is None
+    assert tracker.crash_loop
+    assert tracker.next_restart_at is None
+    assert tracker.to_dict()['recent_restarts'] == 2
+
+
+def test_restarts_outside_window_stop_counting():
+    tracker = RestartTracker(RestartPolicy(ON_FAILURE, max_restarts=2, window=60, initial_backoff=1))
+    with mock.patch.object(restart_policy.time, 'monotonic', return_value=1000.0):
+        tracker.next_delay()
+        tracker.next_delay()
+    with mock.patch.object(restart_policy.time, 'monotonic', return_value=1061.0):
+        delay = tracker.next_delay()
+    # The window emptied, so the backoff starts over
+    assert delay is not None and delay <= 1
+    assert not tracker.crash_loop
+    assert tracker.restarts == 3
@@ -0,0 +1,67 @@
+import socket
+from types import MappingProxyType
+
+import pytest
+
+from utils import supervisor_protocol
+from utils.supervisor_protocol import (CODEC_JSON, CODEC_MSGPACK, HEADER, ProtocolError, decode, encode,
+                                       recv_message, send_message)
+
+CODECS = [CODEC_JSON] + ([CODEC_MSGPACK] if supervisor_protocol.msgpack is not None else [])
+
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_frame_layout(codec):
+    frame = encode({'id': 1}, codec)
+    (length,) = HEADER.unpack(frame[:HEADER.size])
+    assert length == len(frame) - HEADER.size
+    assert frame[HEADER.size:HEADER.size + 1] == codec
+    assert decode(frame[HEADER.size:HEADER.size + 1], frame[HEADER.size + 1:]) == {'id': 1}
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_round_trip_over_socket(pair, codec):
+    message = {'id': 7, 'result': {'data': b'\x00\xffbytes', 'items': [1, 2.5, None, 'é']}}
+    send_message(pair[0], message, codec)
+    send_message(pair[0], {'id': 8}, codec)
+    assert recv_message(pair[1]) == message
+    assert recv_message(pair[1]) == {'id': 8}
+
+
+def test_frozen_configs_travel_as_plain_data(pair):
+    frozen = MappingProxyType({'id': '100', 'components': (MappingProxyType({'name': 'web'}),)})
+    send_message(pair[0], {'result': frozen}, CODEC_JSON)
+    assert recv_message(pair[1]) == {'result': {'id': '100', 'components': [{'name': 'web'}]}}
+
+
+def test_clean_close_between_frames(pair):
+    pair[0].close()
+    assert recv_message(pair[1]) is None
+
+
+@pytest.mark.parametrize('cut', [2, HEADER.size + 3])
+def test_close_mid_frame(pair, cut):
+    pair[0].sendall(encode({'id': 1, 'padding': 'x' * 32}, CODEC_JSON)[:cut])
+    pair[0].close()
+    with pytest.raises(ProtocolError):
+        recv_message(pair[1])
+
+
+@pytest.mark.parametrize('length', [0, supervisor_protocol.MAX_FRAME_SIZE + 1])
+def test_bad_length(pair, length):
+    pair[0].sendall(HEADER.pack(length) + CODEC_JSON)
+    with pytest.raises(ProtocolError):
+        recv_message(pair[1])
+
+
+def test_unknown_codec():
+    with pytest.raises(ProtocolError):
+        decode(b'X', b'{}')
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Launches that may be warming up at once across all bulk operations
+DEFAULT_MAX_CONCURRENT = 4
+
+# Host headroom a launch needs to be admitted
+DEFAULT_MAX_CPU_PERCENT = 90.0
+DEFAULT_MIN_AVAILABLE_MEMORY = 10.0  # percent of RAM
+
+# Longest a launch waits for headroom before it is admitted anyway (seconds)
+DEFAULT_MAX_WAIT = 60.0
+
+# How often a waiting launch re-checks the host (seconds); also the CPU sampling window
+PRESSURE_CHECK_INTERVAL = 0.5
+
+
+class AdmissionController:
+    """
+    Paces bulk launches so a large batch cannot thrash the host
+
+    At most max_concurrent launches are in flight. A launch keeps its slot
+    until its application is ready (or gives up on readiness), so what is
+    bounded is the number of apps warming up, not just how fast processes
+    get spawned. A launch is also held back while CPU use is above
+    max_cpu_percent or available memory is below min_available_memory
+    percent. After max_wait seconds of pressure it goes ahead anyway, so a
+    busy host slows a batch down but never stalls it.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 max_cpu_percent: float = DEFAULT_MAX_CPU_PERCENT,
+                 min_available_memory: float = DEFAULT_MIN_AVAILABLE_MEMORY,
+                 max_wait: float = DEFAULT_MAX_WAIT):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_cpu_percent = max_cpu_percent
+        self.min_available_memory = min_available_memory
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self.forced = 0  # launches admitted despite pressure after max_wait
+        self._slots = threading.Semaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._pressure: Optional[str] = None
+        # Prime the counter; cpu_percent(None) reports use since the previous call
+        psutil.cpu_percent(None)
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """
+        Hold a launch slot for the duration of the block
+
+        Yields:
+            float: Seconds spent waiting for the slot and for headroom
+        """
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            self._slots.acquire()
+            try:
+                self._wait_for_headroom(started)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield time.monotonic() - started
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _wait_for_headroom(self, started: float):
+        """Sleep while the host is under pressure, up to max_wait"""
+        while True:
+            pressure = self.pressure()
+            if pressure is None:
+                return
+            if time.monotonic() - started >= self.max_wait:
+                with self._lock:
+                    self.forced += 1
+                logger.warning(f"Admitting launch despite host pressure ({pressure}) after {self.max_wait:.0f}s")
+                return
+            time.sleep(PRESSURE_CHECK_INTERVAL)
+
+    def pressure(self) -> Optional[str]:
+        """
+        Why the host cannot take another launch right now
+
+        Returns:
+            Optional[str]: e.g. 'cpu 97%', or None if there is headroom
+        """
+        with self._lock:
+            if time.monotonic() - self._checked_at < PRESSURE_CHECK_INTERVAL:
+                return self._pressure
+            cpu = psutil.cpu_percent(None)
+            memory = psutil.virtual_memory()
+            available = memory.available * 100.0 / memory.total if memory.total else 100.0
+            if cpu > self.max_cpu_percent:
+                self._pressure = f"cpu {cpu:.0f}%"
+            elif available < self.min_available_memory:
+                self._pressure = f"available memory {available:.0f}%"
+            else:
+                self._pressure = None
+            self._checked_at = time.monotonic()
+            return self._pressure
+
+    def to_dict(self) -> Dict:
+        """Limits and current occupancy for status reporting"""
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'forced': self.forced,
+                'pressure': self._pressure
+            }
@@ -0,0 +1,438 @@
+import asyncio
+import codecs
+import concurrent.futures
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+from utils.input_writer import DEFAULT_MAX_PENDING
+from utils.output_buffer import OutputBuffer
+from utils.output_pump import READ_CHUNK_SIZE
+from utils.process_reaper import ExitCallback
+from utils.readiness import ReadinessProbe
+from utils.spool import SPOOL_IDLE_WAIT, SPOOL_POLL_INTERVAL, SpoolTail
+
+logger = logging.getLogger(__name__)
+
+# Threads running exit callbacks, which take app locks and write the state file
+EXIT_HANDLER_THREADS = 4
+
+# Poll interval for exits of processes that are not our children and have no pidfd
+EXIT_POLL_INTERVAL = 0.5
+
+
+class AsyncioEngine:
+    """
+    Does the process I/O of a ProcessManager on a single asyncio event loop
+
+    Children are started with asyncio's subprocess support, and one loop
+    thread owns every child's output, queued input, exit wait and
+    background readiness probe. Supervising hundreds of children then takes
+    a handful of threads instead of two or three per child. Every method
+    may be called from any thread; exit callbacks run on a small pool so a
+    slow one never stalls the loop.
+    """
+
+    name = 'asyncio'
+
+    def __init__(self, on_exit: ExitCallback):
+        self.on_exit = on_exit
+        self.loop = asyncio.new_event_loop()
+        self._exit_handlers = concurrent.futures.ThreadPoolExecutor(
+            EXIT_HANDLER_THREADS, thread_name_prefix='process-exit'
+        )
+        _install_child_watcher(self.loop)
+        self._thread = threading.Thread(target=self.loop.run_forever, name='process-engine', daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """Run a coroutine on the engine loop and wait for its result (not from the loop itself)"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Blocking on the process engine from its own loop would deadlock")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def popen(self, args, stdin=None, stdout=None, stderr=None, shell: bool = False,
+              bufsize: int = 0, **popen_kwargs) -> 'AsyncProcess':
+        """
+        Start a child through the loop (same arguments as subprocess.Popen)
+
+        PIPE is served with plain os.pipe() pairs rather than asyncio
+        transports, so the returned process has unbuffered file objects as
+        stdin/stdout just like Popen, whatever the spawn mode.
+        """
+        child_ends = []
+        streams = {}
+        if stdin == subprocess.PIPE:
+            read_end, write_end = os.pipe()
+            stdin = read_end
+            child_ends.append(read_end)
+            streams['stdin'] = os.fdopen(write_end, 'wb', buffering=0)
+        if stdout == subprocess.PIPE:
+            read_end, write_end = os.pipe()
+            stdout = write_end
+            child_ends.append(write_end)
+            streams['stdout'] = os.fdopen(read_end, 'rb', buffering=0)
+        try:
+            if shell:
+                spawn = asyncio.create_subprocess_shell(args, stdin=stdin, stdout=stdout, stderr=stderr,
+                                                        **popen_kwargs)
+            else:
+                spawn = asyncio.create_subprocess_exec(*args, stdin=stdin, stdout=stdout, stderr=stderr,
+                                                       **popen_kwargs)
+            process = self.run(spawn)
+        except Exception:
+            for stream in streams.values():
+                stream.close()
+            raise
+        finally:
+            for fd in child_ends:
+                os.close(fd)
+        return AsyncProcess(self, process, args, **streams)
+
+    def watch(self, key: Hashable, process):
+        """Report the process's exit to the exit callback"""
+        asyncio.run_coroutine_threadsafe(self._watch(key, process), self.loop)
+
+    async def _watch(self, key: Hashable, process):
+        try:
+            if isinstance(process, AsyncProcess):
+                return_code = await process.process.wait()
+            else:
+                return_code = await self._wait_foreign(process)
+        except Exception as e:
+            logger.error(f"Error waiting for PID {process.pid}: {e}")
+            return
+        self._exit_handlers.submit(self._dispatch, key, process, return_code, time.time())
+
+    async def _wait_foreign(self, process) -> int:
+        """Exit code of a process that is not an asyncio child (a re-adopted one)"""
+        if process.poll() is not None:
+            return process.returncode
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except (AttributeError, OSError):
+            pidfd = None
+        if pidfd is None:
+            while process.poll() is None:
+                await asyncio.sleep(EXIT_POLL_INTERVAL)
+            return process.returncode
+        try:
+            await self.readable(pidfd)
+        finally:
+            os.close(pidfd)
+        return process.wait()
+
+    def _dispatch(self, key: Hashable, process, return_code: int, exited_at: float):
+        """Invoke the exit callback, never letting it kill the worker"""
+        try:
+            self.on_exit(key, process, return_code, exited_at)
+        except Exception as e:
+            logger.error(f"Exit handler for {key} failed: {e}")
+
+    async def readable(self, fd: int, timeout: Optional[float] = None) -> bool:
+        """Wait until fd is readable; False if the timeout passed first"""
+        ready = self.loop.create_future()
+        self.loop.add_reader(fd, lambda: ready.done() or ready.set_result(True))
+        try:
+            return await asyncio.wait_for(ready, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.loop.remove_reader(fd)
+
+    def pump_output(self, stream, on_output: Callable[[str], None], name: str) -> 'AsyncOutputPump':
+        """Drain a child's output into on_output until EOF"""
+        pump = AsyncOutputPump(self, stream, on_output, name)
+        self.loop.call_soon_threadsafe(pump.start)
+        return pump
+
+    def input_writer(self, stream, name: str, max_pending: int = DEFAULT_MAX_PENDING) -> 'AsyncInputWriter':
+        """Bounded, non-blocking input queue feeding a child's stdin"""
+        return AsyncInputWriter(self.loop, stream, name, max_pending)
+
+    def wait_ready(self, probe: ReadinessProbe, is_alive: Callable[[], bool],
+                   buffer: Optional[OutputBuffer], timeout: float) -> bool:
+        """Run a readiness probe on the loop and wait for the outcome"""
+        return self.run(probe.wait_async(is_alive, buffer, timeout))
+
+    def probe_in_background(self, probe: ReadinessProbe, is_alive: Callable[[], bool],
+                            buffer: Optional[OutputBuffer], timeout: float,
+                            on_done: Callable[[bool], None], name: str):
+        """Run a readiness probe on the loop without waiting for it; on_done gets the outcome"""
+        future = asyncio.run_coroutine_threadsafe(probe.wait_async(is_alive, buffer, timeout), self.loop)
+
+        def finished(future: concurrent.futures.Future):
+            if future.exception() is not None:
+                logger.error(f"Readiness probe {name} failed: {future.exception()}")
+            on_done(future.exception() is None and future.result())
+        future.add_done_callback(finished)
+
+
+def _install_child_watcher(loop: asyncio.AbstractEventLoop):
+    """
+    Have the loop learn about child exits through pidfds
+
+    Before Python 3.12 asyncio's default watcher blocks a thread per child;
+    3.12 and later use pidfds on their own where the kernel has them.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, 'pidfd_open'):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError as e:
+        logger.warning(f"pidfds are unavailable, asyncio will wait for each child on a thread: {e}")
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
+class AsyncProcess:
+    """
+    Popen-like handle on a child started by an AsyncioEngine
+
+    The loop's child watcher reaps the child, so poll() and wait() read the
+    exit code it collected instead of calling waitpid() (which would steal
+    the exit status from the watcher), and signals are sent with os.kill().
+    """
+
+    def __init__(self, engine: AsyncioEngine, process: asyncio.subprocess.Process, args,
+                 stdin=None, stdout=None):
+        self.engine = engine
+        self.process = process
+        self.pid = process.pid
+        self.args = args
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.returncode
+
+    def poll(self) -> Optional[int]:
+        """Exit code once the process has exited, else None"""
+        return self.process.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for the process to exit
+
+        Raises:
+            subprocess.TimeoutExpired: If it is still running after timeout seconds
+        """
+        if self.process.returncode is not None:
+            return self.process.returncode
+        try:
+            return self.engine.run(asyncio.wait_for(self.process.wait(), timeout))
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+
+    def send_signal(self, sig: int):
+        if self.process.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class AsyncOutputPump:
+    """
+    OutputPump counterpart driven by the engine loop
+
+    Pipes and PTY masters are read from a reader callback whenever they
+    turn readable; a SpoolTail is followed by a task that sleeps on its
+    inotify descriptor. Only touched from the loop thread, except for the
+    bytes_read counter.
+    """
+
+    def __init__(self, engine: AsyncioEngine, stream, on_output: Callable[[str], None], name: str):
+        self.engine = engine
+        self.stream = stream
+        self.on_output = on_output
+        self.name = f"output-pump-{name}"
+        self.bytes_read = 0  # raw bytes drained so far, for metrics
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._fd: Optional[int] = None
+
+    def start(self):
+        """Loop thread: begin draining"""
+        if isinstance(self.stream, SpoolTail):
+            self.engine.loop.create_task(self._follow_spool())
+            return
+        try:
+            self._fd = self.stream.fileno()
+            os.set_blocking(self._fd, False)
+            self.engine.loop.add_reader(self._fd, self._on_readable)
+        except (OSError, ValueError) as e:
+            logger.error(f"Output pump {self.name} failed: {e}")
+            self._finish()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, READ_CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            # EIO/EBADF once the child side has gone away
+            data = b''
+        if not data:
+            self.engine.loop.remove_reader(self._fd)
+            self._finish()
+            return
+        self._consume(data)
+
+    async def _follow_spool(self):
+        tail: SpoolTail = self.stream
+        try:
+            while True:
+                data = tail.read_nowait(READ_CHUNK_SIZE)
+                if data is None:
+                    if tail.wakeup_fd is None:
+                        await asyncio.sleep(SPOOL_POLL_INTERVAL)
+                    elif await self.engine.readable(tail.wakeup_fd, SPOOL_IDLE_WAIT):
+                        tail.drain_wakeups()
+                    continue
+                if not data:
+                    break
+                self._consume(data)
+        except Exception as e:
+            logger.error(f"Output pump {self.name} failed: {e}")
+        finally:
+            self._finish()
+
+    def _consume(self, data: bytes):
+        self.bytes_read += len(data)
+        self._emit(self._decoder.decode(data))
+
+    def _finish(self):
+        """Flush the decoder and close the stream at EOF"""
+        self._emit(self._decoder.decode(b'', final=True))
+        try:
+            self.stream.close()
+        except Exception:
+            pass
+
+    def _emit(self, text: str):
+        """Forward text to the callback, never letting it kill the pump"""
+        if not text:
+            return
+        try:
+            self.on_output(text)
+        except Exception as e:
+            logger.error(f"Output handler for {self.name} failed: {e}")
+
+
+class AsyncInputWriter:
+    """
+    InputWriter counterpart whose writes are done by the engine loop
+
+    write() only queues (under the same byte limit) and schedules a flush;
+    the loop writes through a non-blocking descriptor and waits for it to
+    turn writable while the child is not reading. Whatever queued up in
+    the meantime goes out as one write.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stream, name: str,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.loop = loop
+        self.stream = stream
+        self.name = f"input-writer-{name}"
+        self.max_pending = max_pending
+        self.pending = 0  # bytes queued and not yet written
+        self.bytes_written = 0
+        self.rejected = 0  # writes refused because the queue was full
+        self.closed = False
+        self._queue: List[bytes] = []
+        self._lock = threading.Lock()
+        self._waiting = False  # loop thread only: registered for writability
+        self._fd = stream.fileno()
+        os.set_blocking(self._fd, False)
+
+    def write(self, data: bytes) -> bool:
+        """
+        Queue bytes for the child without blocking
+
+        Args:
+            data: Bytes to write
+
+        Returns:
+            bool: False if the writer is closed or the data would take the
+            queue past its limit (nothing is queued then)
+        """
+        with self._lock:
+            if self.closed or self.pending + len(data) > self.max_pending:
+                self.rejected += 1
+                return False
+            self._queue.append(data)
+            self.pending += len(data)
+        self.loop.call_soon_threadsafe(self._flush)
+        return True
+
+    def close(self):
+        """Stop after dropping anything still queued"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._queue.clear()
+            self.pending = 0
+        self.loop.call_soon_threadsafe(self._stop_waiting)
+
+    def _flush(self):
+        """Loop thread: write queued input until the queue is empty or the child's pipe is full"""
+        while True:
+            with self._lock:
+                if self.closed or not self._queue:
+                    break
+                data = b''.join(self._queue)
+                self._queue = [data]
+            try:
+                written = os.write(self._fd, data)
+            except BlockingIOError:
+                if not self._waiting:
+                    self.loop.add_writer(self._fd, self._flush)
+                    self._waiting = True
+                return
+            except (OSError, ValueError) as e:
+                # EPIPE/EIO/EBADF once the child has exited
+                logger.debug(f"Input writer {self.name} stopped: {e}")
+                self.close()
+                return
+            with self._lock:
+                if self.closed:
+                    break
+                # Writes queued meanwhile were appended after our chunk
+                if written < len(data):
+                    self._queue[0] = data[written:]
+                else:
+                    self._queue.pop(0)
+                self.pending = max(0, self.pending - written)
+                self.bytes_written += written
+        self._stop_waiting()
+
+    def _stop_waiting(self):
+        if self._waiting:
+            self.loop.remove_writer(self._fd)
+            self._waiting = False
+
+    def to_dict(self) -> Dict:
+        """Queue depth and counters for status reporting"""
+        return {
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'bytes_written': self.bytes_written,
+            'rejected': self.rejected,
+            'closed': self.closed
+        }
@@ -1,16 +1,152 @@
 import json
 import os
 import logging
-from typing import Dict, List, Optional
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from utils.config_store import ConfigStore
+from utils.restart_policy import ON_FAILURE, POLICIES
+from utils.resource_limits import ResourceLimits
 
 logger = logging.getLogger(__name__)
 
+# First ID handed out when no numeric application IDs exist yet
+FIRST_APPLICATION_ID = 100
+
+# Seconds without further changes after which the journal is folded into the config file
+COMPACT_DELAY = 1.0
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Recursively turn a frozen configuration back into plain dicts and lists"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ApplicationRegistry:
+    """
+    Immutable, indexed snapshot of the configured applications
+
+    Mutations return a new registry; the old one stays valid for any reader
+    still holding it.
+    """
+
+    def __init__(self, applications: Tuple[Mapping, ...], by_id: Dict[str, Mapping],
+                 by_category: Dict[str, Tuple[Mapping, ...]], max_numeric_id: Optional[int]):
+        self.applications = applications
+        self.by_id = by_id
+        self.by_category = by_category
+        self.max_numeric_id = max_numeric_id
+        self.categories = tuple(sorted(by_category))
+
+    @classmethod
+    def build(cls, applications: List[Dict]) -> 'ApplicationRegistry':
+        """Index a list of plain application dicts"""
+        return cls.from_frozen(tuple(freeze(app) for app in applications))
+
+    @classmethod
+    def from_frozen(cls, frozen: Tuple[Mapping, ...]) -> 'ApplicationRegistry':
+        """Index application configs that are already frozen"""
+        by_id = {app.get('id'): app for app in frozen}
+        by_category: Dict[str, Tuple[Mapping, ...]] = {}
+        for app in frozen:
+            category = app.get('category', 'General')
+            by_category[category] = by_category.get(category, ()) + (app,)
+        return cls(frozen, by_id, by_category, cls._max_id(frozen))
+
+    @staticmethod
+    def _max_id(applications: Tuple[Mapping, ...]) -> Optional[int]:
+        """Largest numeric application ID, or None if there are none"""
+        numeric = [int(app['id']) for app in applications if str(app.get('id', '')).isdigit()]
+        return max(numeric) if numeric else None
+
+    def with_added(self, app: Mapping) -> 'ApplicationRegistry':
+        """Registry with one more application"""
+        category = app.get('category', 'General')
+        by_id = dict(self.by_id)
+        by_id[app['id']] = app
+        by_category = dict(self.by_category)
+        by_category[category] = by_category.get(category, ()) + (app,)
+        max_id = self.max_numeric_id
+        if str(app['id']).isdigit():
+            max_id = max(max_id or 0, int(app['id']))
+        return ApplicationRegistry(self.applications + (app,), by_id, by_category, max_id)
+
+    def with_removed(self, app_id: str) -> 'ApplicationRegistry':
+        """Registry without one application"""
+        app = self.by_id[app_id]
+        category = app.get('category', 'General')
+        applications = tuple(existing for existing in self.applications if existing is not app)
+        by_id = dict(self.by_id)
+        del by_id[app_id]
+        by_category = dict(self.by_category)
+        remaining = tuple(existing for existing in by_category[category] if existing is not app)
+        if remaining:
+            by_category[category] = remaining
+        else:
+            del by_category[category]
+        max_id = self.max_numeric_id
+        if str(app_id).isdigit() and int(app_id) == max_id:
+            max_id = self._max_id(applications)
+        return ApplicationRegistry(applications, by_id, by_category, max_id)
+
+    def with_replaced(self, app_id: str, app: Mapping) -> 'ApplicationRegistry':
+        """Registry with one application's configuration swapped for another"""
+        old = self.by_id[app_id]
+        applications = tuple(app if existing is old else existing for existing in self.applications)
+        by_id = dict(self.by_id)
+        by_id[app_id] = app
+        by_category = dict(self.by_category)
+        old_category = old.get('category', 'General')
+        new_category = app.get('category', 'General')
+        if old_category == new_category:
+            by_category[old_category] = tuple(
+                app if existing is old else existing for existing in by_category[old_category]
+            )
+        else:
+            remaining = tuple(existing for existing in by_category[old_category] if existing is not old)
+            if remaining:
+                by_category[old_category] = remaining
+            else:
+                del by_category[old_category]
+            by_category[new_category] = by_category.get(new_category, ()) + (app,)
+        return ApplicationRegistry(applications, by_id, by_category, self.max_numeric_id)
+
+    def to_list(self) -> List[Dict]:
+        """Plain, JSON-serialisable list of application dicts"""
+        return [thaw(app) for app in self.applications]
+
+
 class ConfigManager:
     """Manages application configuration and persistence"""
     
-    def __init__(self, config_file: str = 'config/applications.json'):
+    def __init__(self, config_file: str = 'config/applications.json', compact_delay: float = COMPACT_DELAY):
         self.config_file = config_file
         self.config_dir = os.path.dirname(config_file)
+        self.settings: Dict = {}  # top-level config keys other than 'applications'
+        self.registry = ApplicationRegistry.build([])
+        self.store = ConfigStore(config_file)
+        self._write_lock = threading.RLock()
+        self._batch_operations: Optional[List[Dict]] = None
+        # Keeps the hand-editable file current: compacts once writes go quiet
+        self.compact_delay = compact_delay
+        self._compact_timer: Optional[threading.Timer] = None
+        # Set when the snapshot could not be parsed, so it is never compacted over
+        self._snapshot_unreadable = False
+        self._reload_listeners: List[Callable[[Dict[str, List[str]]], None]] = []
         self._ensure_config_directory()
         self._load_config()
     
@@ -21,45 +157,130 @@ class ConfigManager:
             logger.info(f"Created config directory: {self.config_dir}")
     
     def _load_config(self):
-        """Load configuration from JSON file"""
+        """Load configuration from the snapshot file and its journal"""
+        settings, applications = {}, []
+        self._snapshot_unreadable = False
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
+            if self.store.exists():
+                settings, applications = self.store.load()
                 logger.info(f"Loaded configuration from {self.config_file}")
             else:
                 # Create default configuration
-                self.config = {"applications": []}
-                self._save_config()
+                self.store.write_snapshot({}, [])
                 logger.info(f"Created default configuration at {self.config_file}")
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing config file {self.config_file}: {e}")
-            self.config = {"applications": []}
+            self._snapshot_unreadable = True
         except Exception as e:
             logger.error(f"Error loading config file {self.config_file}: {e}")
-            self.config = {"applications": []}
+            self._snapshot_unreadable = True
+        
+        with self._write_lock:
+            self.settings = settings
+            self.registry = ApplicationRegistry.build(applications)
+            # Fold changes left in the journal into the hand-editable snapshot
+            if self.store.journal_entries:
+                self._compact()
     
-    def _save_config(self):
-        """Save configuration to JSON file"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            logger.info(f"Saved configuration to {self.config_file}")
+    def _compact(self):
+        """Rewrite the snapshot from the registry and clear the journal (caller holds the write lock)"""
+        if self._snapshot_unreadable:
+            logger.warning(f"Not compacting over unreadable config file {self.config_file}; "
+                           f"changes stay in {self.store.journal_file}")
+            return
+        if self.store.snapshot_changed():
+            # Edited by hand since we last read it; the next reload merges the
+            # edit with newer journal entries and compacts then
+            logger.info(f"Not compacting over unreloaded edits to {self.config_file}")
+            return
+        self.store.write_snapshot(self.settings, self.registry.to_list())
+    
+    def _schedule_compaction(self):
+        """Compact once no change has been made for compact_delay seconds (caller holds the write lock)"""
+        if self._compact_timer is not None:
+            self._compact_timer.cancel()
+        self._compact_timer = threading.Timer(self.compact_delay, self._compact_when_idle)
+        self._compact_timer.daemon = True
+        self._compact_timer.start()
+    
+    def _compact_when_idle(self):
+        """Timer callback: fold the journal into the config file"""
+        with self._write_lock:
+            if self._batch_operations is not None:
+                self._schedule_compaction()
+                return
+            self._compact_timer = None
+            if not self.store.journal_entries:
+                return
+            if not self.store.snapshot_changed():
+                self._compact()
+                return
+        # Hand edits arrived in the meantime: merge them rather than overwrite them
+        self.reload_config()
+    
+    def _commit(self, registry: ApplicationRegistry, operations: List[Dict]) -> bool:
+        """Journal a change and publish the new registry to readers (caller holds the write lock)"""
+        if self._batch_operations is not None:
+            self._batch_operations.extend(operations)
+            self.registry = registry
             return True
-        except Exception as e:
-            logger.error(f"Error saving config file {self.config_file}: {e}")
+        
+        if not self.store.append(operations):
             return False
+        self.registry = registry
+        if self.store.needs_compaction():
+            self._compact()
+        else:
+            self._schedule_compaction()
+        return True
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group several changes into a single journal write
+        
+        Changes are visible to readers as they are made and reach disk together
+        when the block exits. If the block raises, or the final write fails,
+        the registry reverts to its state before the batch.
+        
+        Raises:
+            OSError: If the batched changes could not be written
+        """
+        with self._write_lock:
+            if self._batch_operations is not None:
+                # Nested batch: the outer one flushes
+                yield
+                return
+            
+            before = self.registry
+            self._batch_operations = []
+            try:
+                yield
+                operations = self._batch_operations
+            except BaseException:
+                self.registry = before
+                raise
+            finally:
+                self._batch_operations = None
+            
+            if not self.store.append(operations):
+                self.registry = before
+                raise OSError(f"Failed to persist {len(operations)} configuration change(s)")
+            if self.store.needs_compaction():
+                self._compact()
+            elif operations:
+                self._schedule_compaction()
     
-    def get_applications(self) -> List[Dict]:
+    def get_applications(self) -> Tuple[Mapping, ...]:
         """
         Get all configured applications
         
         Returns:
-            List[Dict]: List of application configurations
+            Tuple[Mapping, ...]: Read-only application configurations
         """
-        return self.config.get('applications', [])
+        return self.registry.applications
     
-    def get_application(self, app_id: str) -> Optional[Dict]:
+    def get_application(self, app_id: str) -> Optional[Mapping]:
         """
         Get a specific application configuration
         
@@ -67,41 +288,44 @@ class ConfigManager:
             app_id: Unique identifier for the application
             
         Returns:
-            Optional[Dict]: Application configuration or None if not found
+            Optional[Mapping]: Read-only application configuration or None if not found
+        """
+        return self.registry.by_id.get(app_id)
+    
+    def next_application_id(self) -> str:
+        """
+        Get the ID a newly added application should receive
+        
+        Returns:
+            str: One more than the largest numeric ID in use
         """
-        applications = self.get_applications()
-        for app in applications:
-            if app.get('id') == app_id:
-                return app
-        return None
+        max_id = self.registry.max_numeric_id
+        return str(max_id + 1) if max_id is not None else str(FIRST_APPLICATION_ID)
     
     def add_application(self, app_config: Dict) -> bool:
         """
         Add a new application configuration
         
         Args:
-            app_config: Application configuration dictionary
+            app_config: Application configuration dictionary; one without an
+                'id' gets next_application_id(), chosen under the write lock
+                so concurrent adds never receive the same ID
             
         Returns:
             bool: True if added successfully, False otherwise
         """
         try:
             # Validate required fields
-            required_fields = ['id', 'name']
-            for field in required_fields:
-                if not app_config.get(field):
-                    logger.error(f"Missing required field '{field}' in application config")
-                    return False
+            if not app_config.get('name'):
+                logger.error("Missing required field 'name' in application config")
+                return False
             
             # Check if components or command is provided
             if not app_config.get('command') and not app_config.get('components'):
                 logger.error("Either 'command' or 'components' must be provided")
                 return False
             
-            # Check if application ID already exists
-            if self.get_application(app_config['id']):
-                logger.error(f"Application with ID '{app_config['id']}' already exists")
-                return False
+            app_config = thaw(app_config)
             
             # Set default values
             app_config.setdefault('description', '')
@@ -118,16 +342,19 @@ class ConfigManager:
                     component.setdefault('working_dir', app_config.get('working_dir', ''))
                     component.setdefault('order', 0)
             
-            # Add to configuration
-            self.config['applications'].append(app_config)
-            
-            # Save to file
-            if self._save_config():
-                logger.info(f"Added application: {app_config['id']}")
-                return True
-            else:
-                # Remove from memory if save failed
-                self.config['applications'].remove(app_config)
+            with self._write_lock:
+                if not app_config.get('id'):
+                    app_config['id'] = self.next_application_id()
+                # Check if application ID already exists
+                if app_config['id'] in self.registry.by_id:
+                    logger.error(f"Application with ID '{app_config['id']}' already exists")
+                    return False
+                
+                # Add to configuration and journal it
+                if self._commit(self.registry.with_added(freeze(app_config)),
+                                [{'op': 'put', 'app': app_config}]):
+                    logger.info(f"Added application: {app_config['id']}")
+                    return True
                 return False
                 
         except Exception as e:
@@ -145,24 +372,15 @@ class ConfigManager:
             bool: True if removed successfully, False otherwise
         """
         try:
-            applications = self.config.get('applications', [])
-            
-            # Find and remove the application
-            for i, app in enumerate(applications):
-                if app.get('id') == app_id:
-                    removed_app = applications.pop(i)
-                    
-                    # Save to file
-                    if self._save_config():
-                        logger.info(f"Removed application: {app_id}")
-                        return True
-                    else:
-                        # Restore if save failed
-                        applications.insert(i, removed_app)
-                        return False
-            
-            logger.warning(f"Application with ID '{app_id}' not found")
-            return False
+            with self._write_lock:
+                if app_id not in self.registry.by_id:
+                    logger.warning(f"Application with ID '{app_id}' not found")
+                    return False
+                
+                if self._commit(self.registry.with_removed(app_id), [{'op': 'delete', 'id': app_id}]):
+                    logger.info(f"Removed application: {app_id}")
+                    return True
+                return False
             
         except Exception as e:
             logger.error(f"Error removing application {app_id}: {e}")
@@ -180,39 +398,26 @@ class ConfigManager:
             bool: True if updated successfully, False otherwise
         """
         try:
-            applications = self.config.get('applications', [])
-            
-            # Find and update the application
-            for app in applications:
-                if app.get('id') == app_id:
-                    # Store original values in case we need to rollback
-                    original_values = {}
-                    for key, value in updates.items():
-                        if key in app:
-                            original_values[key] = app[key]
-                        app[key] = value
-                    
-                    # Save to file
-                    if self._save_config():
-                        logger.info(f"Updated application: {app_id}")
-                        return True
-                    else:
-                        # Rollback changes if save failed
-                        for key, value in original_values.items():
-                            app[key] = value
-                        for key in updates:
-                            if key not in original_values:
-                                app.pop(key, None)
-                        return False
-            
-            logger.warning(f"Application with ID '{app_id}' not found")
-            return False
+            with self._write_lock:
+                app = self.registry.by_id.get(app_id)
+                if app is None:
+                    logger.warning(f"Application with ID '{app_id}' not found")
+                    return False
+                
+                updated = thaw(app)
+                updated.update(thaw(updates))
+                updated['id'] = app_id
+                if self._commit(self.registry.with_replaced(app_id, freeze(updated)),
+                                [{'op': 'put', 'app': updated}]):
+                    logger.info(f"Updated application: {app_id}")
+                    return True
+                return False
             
         except Exception as e:
             logger.error(f"Error updating application {app_id}: {e}")
             return False
     
-    def get_applications_by_category(self, category: str) -> List[Dict]:
+    def get_applications_by_category(self, category: str) -> Tuple[Mapping, ...]:
         """
         Get applications filtered by category
         
@@ -220,10 +425,9 @@ class ConfigManager:
             category: Category to filter by
             
         Returns:
-            List[Dict]: List of applications in the specified category
+            Tuple[Mapping, ...]: Read-only applications in the specified category
         """
-        applications = self.get_applications()
-        return [app for app in applications if app.get('category') == category]
+        return self.registry.by_category.get(category, ())
     
     def get_categories(self) -> List[str]:
         """
@@ -232,11 +436,7 @@ class ConfigManager:
         Returns:
             List[str]: List of unique categories
         """
-        applications = self.get_applications()
-        categories = set()
-        for app in applications:
-            categories.add(app.get('category', 'General'))
-        return sorted(list(categories))
+        return list(self.registry.categories)
     
     def validate_application(self, app_config: Dict) -> List[str]:
         """
@@ -269,9 +469,83 @@ class ConfigManager:
         if command and not isinstance(command, str):
             errors.append("Command must be a string")
         
+        # Restart policy validation (app level and per component)
+        for owner in [app_config, *app_config.get('components', [])]:
+            restart = owner.get('restart')
+            policy = restart.get('policy', ON_FAILURE) if isinstance(restart, Mapping) else restart
+            if restart is not None and policy not in POLICIES:
+                errors.append(f"Restart policy must be one of: {', '.join(POLICIES)}")
+            if not isinstance(owner.get('pty', False), bool):
+                errors.append("pty must be true or false")
+            try:
+                ResourceLimits.from_config(owner)
+            except (TypeError, ValueError) as e:
+                errors.append(f"Invalid resources: {e}")
+        
         return errors
     
-    def reload_config(self):
-        """Reload configuration from file"""
-        self._load_config()
-        logger.info("Configuration reloaded")
+    def reload_config(self) -> Dict[str, List[str]]:
+        """
+        Reload configuration from file, applying only what changed
+        
+        Unchanged applications keep their existing (identical) config objects.
+        Registered reload listeners receive the diff.
+        
+        Returns:
+            Dict[str, List[str]]: IDs of 'added', 'removed' and 'changed' applications
+        """
+        with self._write_lock:
+            previous, previous_settings = self.registry, self.settings
+            self._load_config()
+            if self._snapshot_unreadable:
+                # Keep serving the last good catalog rather than an empty one
+                self.registry, self.settings = previous, previous_settings
+                return {'added': [], 'removed': [], 'changed': []}
+            
+            current = self.registry
+            diff = {
+                'added': [app_id for app_id in current.by_id if app_id not in previous.by_id],
+                'removed': [app_id for app_id in previous.by_id if app_id not in current.by_id],
+                'changed': [
+                    app_id for app_id, app in current.by_id.items()
+                    if app_id in previous.by_id and thaw(previous.by_id[app_id]) != thaw(app)
+                ]
+            }
+            if not diff['changed'] and not diff['added'] and not diff['removed']:
+                self.registry = previous
+            else:
+                # Hand readers the same objects for apps that did not change
+                changed = set(diff['changed'])
+                self.registry = ApplicationRegistry.from_frozen(tuple(
+                    previous.by_id[app.get('id')] if app.get('id') in previous.by_id and app.get('id') not in changed else app
+                    for app in current.applications
+                ))
+        
+        logger.info(f"Configuration reloaded: {len(diff['added'])} added, "
+                    f"{len(diff['removed'])} removed, {len(diff['changed'])} changed")
+        for listener in list(self._reload_listeners):
+            try:
+                listener(diff)
+            except Exception as e:
+                logger.error(f"Config reload listener failed: {e}")
+        return diff
+    
+    def reload_if_changed(self) -> Optional[Dict[str, List[str]]]:
+        """
+        Reload only if the config file's content differs from what was last loaded
+        
+        Returns:
+            Optional[Dict[str, List[str]]]: The reload diff, or None if nothing changed
+        """
+        if not self.store.snapshot_changed():
+            return None
+        return self.reload_config()
+    
+    def add_reload_listener(self, listener: Callable[[Dict[str, List[str]]], None]):
+        """
+        Register a callback that receives the diff after each reload
+        
+        Args:
+            listener: Callable taking {'added': [...], 'removed': [...], 'changed': [...]}
+        """
+        self._reload_listeners.append(listener)
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Journal entries accumulated before the snapshot is rewritten
+DEFAULT_COMPACT_THRESHOLD = 100
+
+
+class ConfigStore:
+    """
+    Crash-safe persistence for the application catalog
+
+    The snapshot (the JSON file people edit by hand) is only ever replaced
+    atomically: written to a temp file, fsynced and renamed over the old one.
+    Individual changes are appended to a journal next to it, one JSON line
+    per operation, and folded into the snapshot once the journal grows past
+    a threshold. Journal operations are idempotent ("put" an app, "delete"
+    an id), so replaying a journal over a snapshot that already contains its
+    changes is harmless. Each operation is stamped with the time it was
+    written, and operations older than the snapshot file are not replayed:
+    when someone edits the file by hand, the file wins.
+    """
+
+    def __init__(self, snapshot_file: str, compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        self.snapshot_file = snapshot_file
+        self.journal_file = snapshot_file + '.journal'
+        self.compact_threshold = compact_threshold
+        self.journal_entries = 0
+        # Identity of the snapshot as last read or written by us, used to tell
+        # external edits apart from our own writes
+        self.snapshot_stat: Optional[Tuple[int, int, int]] = None
+        self.snapshot_digest: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """True if a snapshot has been written before"""
+        return os.path.exists(self.snapshot_file)
+
+    def load(self) -> Tuple[Dict, List[Dict]]:
+        """
+        Read the snapshot and replay the journal over it
+
+        Returns:
+            Tuple[Dict, List[Dict]]: Top-level settings (everything except
+            'applications') and the application list
+
+        Raises:
+            json.JSONDecodeError: If the snapshot itself is not valid JSON
+        """
+        config = {"applications": []}
+        snapshot_mtime = None
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'rb') as f:
+                data = f.read()
+                stat = os.fstat(f.fileno())
+            config = json.loads(data)
+            self.snapshot_stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            self.snapshot_digest = hashlib.sha256(data).hexdigest()
+            snapshot_mtime = stat.st_mtime
+        settings = {key: value for key, value in config.items() if key != 'applications'}
+        applications = list(config.get('applications', []))
+
+        operations = self._read_journal()
+        replayed = [
+            operation for operation in operations
+            if snapshot_mtime is None or operation.get('at', snapshot_mtime) >= snapshot_mtime
+        ]
+        if len(replayed) < len(operations):
+            logger.warning(f"Discarding {len(operations) - len(replayed)} journal entries older than "
+                           f"the last edit of {self.snapshot_file}")
+        for operation in replayed:
+            self._apply(applications, operation)
+        # Counts the discarded entries too, so the next compaction clears them
+        self.journal_entries = len(operations)
+        return settings, applications
+
+    def _read_journal(self) -> List[Dict]:
+        """Parse journal lines, cutting off a torn final line from an interrupted append"""
+        if not os.path.exists(self.journal_file):
+            return []
+        with open(self.journal_file, 'rb') as f:
+            data = f.read()
+
+        complete_length = data.rfind(b'\n') + 1
+        if complete_length < len(data):
+            logger.warning(f"Discarding incomplete final journal entry in {self.journal_file}")
+            # Truncate so the next append doesn't get glued onto the fragment
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(complete_length)
+                f.flush()
+                os.fsync(f.fileno())
+
+        operations = []
+        for number, line in enumerate(data[:complete_length].decode('utf-8').split('\n'), 1):
+            if not line.strip():
+                continue
+            try:
+                operations.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.error(f"Skipping corrupt journal entry {number} in {self.journal_file}")
+        return operations
+
+    @staticmethod
+    def _apply(applications: List[Dict], operation: Dict):
+        """Apply one journal operation to an application list in place"""
+        if operation.get('op') == 'put':
+            app = operation['app']
+            for index, existing in enumerate(applications):
+                if existing.get('id') == app.get('id'):
+                    applications[index] = app
+                    return
+            applications.append(app)
+        elif operation.get('op') == 'delete':
+            applications[:] = [app for app in applications if app.get('id') != operation.get('id')]
+        else:
+            logger.warning(f"Unknown journal operation: {operation.get('op')}")
+
+    def append(self, operations: List[Dict]) -> bool:
+        """
+        Durably record a batch of operations with a single fsync
+
+        Args:
+            operations: Journal operations ({'op': 'put', 'app': {...}} or
+                {'op': 'delete', 'id': ...})
+
+        Returns:
+            bool: True once the operations are on disk
+        """
+        if not operations:
+            return True
+        try:
+            now = time.time()
+            payload = ''.join(json.dumps(dict(operation, at=now), separators=(',', ':')) + '\n'
+                              for operation in operations)
+            with self._lock:
+                with open(self.journal_file, 'a') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.journal_entries += len(operations)
+            return True
+        except Exception as e:
+            logger.error(f"Error appending to journal {self.journal_file}: {e}")
+            return False
+
+    def needs_compaction(self) -> bool:
+        """True once the journal has grown past the compaction threshold"""
+        return self.journal_entries >= self.compact_threshold
+
+    def write_snapshot(self, settings: Dict, applications: List[Dict]) -> bool:
+        """
+        Atomically replace the snapshot and empty the journal
+
+        Args:
+            settings: Top-level settings to keep alongside the applications
+            applications: Full application list
+
+        Returns:
+            bool: True if the snapshot was replaced
+        """
+        config = dict(settings)
+        config['applications'] = applications
+        directory = os.path.dirname(self.snapshot_file) or '.'
+        try:
+            with self._lock:
+                data = json.dumps(config, indent=2).encode('utf-8')
+                fd, temp_path = tempfile.mkstemp(
+                    prefix=os.path.basename(self.snapshot_file) + '.', suffix='.tmp', dir=directory
+                )
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        stat = os.fstat(f.fileno())
+                    os.replace(temp_path, self.snapshot_file)
+                    self.snapshot_stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                    self.snapshot_digest = hashlib.sha256(data).hexdigest()
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+                    raise
+                self._fsync_directory(directory)
+
+                # The snapshot now holds every journaled change
+                with open(self.journal_file, 'w') as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.journal_entries = 0
+            logger.info(f"Wrote configuration snapshot {self.snapshot_file}")
+            return True
+        except Exception as e:
+            logger.error(f"Error writing configuration snapshot {self.snapshot_file}: {e}")
+            return False
+
+    def snapshot_changed(self) -> bool:
+        """
+        Check whether the snapshot differs from what we last read or wrote
+
+        A cheap stat comparison runs first; the file is only hashed when its
+        mtime, size or inode moved, so touches and rewrites with identical
+        content don't count as changes.
+
+        Returns:
+            bool: True if the snapshot's content changed (or it was deleted)
+        """
+        try:
+            stat = os.stat(self.snapshot_file)
+        except FileNotFoundError:
+            return self.snapshot_stat is not None
+        current = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if current == self.snapshot_stat:
+            return False
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return False
+        if digest == self.snapshot_digest:
+            self.snapshot_stat = current
+            return False
+        return True
+
+    @staticmethod
+    def _fsync_directory(directory: str):
+        """Make a rename durable (no-op where directories can't be opened)"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,128 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Seconds between stat checks when inotify is unavailable
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Quiet period after an event before checking, so editors that write in
+# several steps are seen once
+DEBOUNCE_SECONDS = 0.2
+
+
+def open_inotify(path: str, mask: int) -> Optional[int]:
+    """
+    Open a non-blocking inotify fd watching one file or directory
+
+    Returns:
+        Optional[int]: The fd, or None when not on Linux
+
+    Raises:
+        OSError: If inotify could not be set up
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        raise OSError("inotify is not supported by this libc")
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+        error = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(error, "inotify_add_watch failed")
+    return fd
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Watches a config file and calls back when it may have changed
+
+    Uses inotify on the file's directory (editors and deploy tools usually
+    replace files rather than rewrite them) and falls back to polling. The
+    callback is expected to check whether the content really changed.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], None],
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__(name="config-watcher", daemon=True)
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._inotify_fd: Optional[int] = None
+
+    def stop(self):
+        """Ask the watcher thread to exit"""
+        self._stop_event.set()
+
+    def run(self):
+        """Wait for filesystem events (or poll) and trigger the callback"""
+        self._inotify_fd = self._open_inotify()
+        if self._inotify_fd is None:
+            logger.info(f"Watching {self.path} by polling every {self.poll_interval}s")
+        else:
+            logger.info(f"Watching {self.path} with inotify")
+
+        try:
+            # Catch anything that changed before the watch was in place
+            self._notify()
+            while not self._stop_event.is_set():
+                if self._inotify_fd is None:
+                    self._stop_event.wait(self.poll_interval)
+                elif not self._wait_for_event(self.poll_interval):
+                    continue
+                else:
+                    # Let multi-step writes settle, then swallow their events
+                    self._stop_event.wait(DEBOUNCE_SECONDS)
+                    self._drain_events()
+                self._notify()
+        finally:
+            if self._inotify_fd is not None:
+                os.close(self._inotify_fd)
+
+    def _notify(self):
+        """Invoke the callback, never letting it kill the watcher"""
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Config change handler failed: {e}")
+
+    def _open_inotify(self) -> Optional[int]:
+        """Set up an inotify watch on the config directory, or None if unsupported"""
+        try:
+            return open_inotify(os.path.dirname(self.path) or '.', WATCH_MASK)
+        except OSError as e:
+            logger.warning(f"inotify unavailable, falling back to polling: {e}")
+            return None
+
+    def _wait_for_event(self, timeout: float) -> bool:
+        """Block until the inotify fd is readable or the timeout passes"""
+        ready, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        return bool(ready)
+
+    def _drain_events(self):
+        """Discard queued inotify events; which file changed is checked by content"""
+        while True:
+            try:
+                if not os.read(self._inotify_fd, 64 * 1024):
+                    return
+            except BlockingIOError:
+                return
@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Most input bytes queued for one process before further input is rejected
+DEFAULT_MAX_PENDING = 64 * 1024
+
+
+class InputWriter(threading.Thread):
+    """
+    Background thread that feeds queued input to a child's stdin
+
+    Callers only ever append to a bounded queue, so a child that stops
+    reading can fill its pipe and block this thread but never the caller.
+    Whatever queued up while a write was in progress goes out as one write.
+    """
+
+    def __init__(self, stream, name: str, max_pending: int = DEFAULT_MAX_PENDING):
+        super().__init__(name=f"input-writer-{name}", daemon=True)
+        self.stream = stream
+        self.max_pending = max_pending
+        self.pending = 0  # bytes queued and not yet written
+        self.bytes_written = 0
+        self.rejected = 0  # writes refused because the queue was full
+        self.closed = False
+        self._queue: List[bytes] = []
+        self._cond = threading.Condition()
+
+    def write(self, data: bytes) -> bool:
+        """
+        Queue bytes for the child without blocking
+
+        Args:
+            data: Bytes to write
+
+        Returns:
+            bool: False if the writer is closed or the data would take the
+            queue past its limit (nothing is queued then)
+        """
+        with self._cond:
+            if self.closed or self.pending + len(data) > self.max_pending:
+                self.rejected += 1
+                return False
+            self._queue.append(data)
+            self.pending += len(data)
+            self._cond.notify()
+        return True
+
+    def close(self):
+        """Stop after dropping anything still queued"""
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self.pending = 0
+            self._cond.notify()
+
+    def run(self):
+        """Write queued input until closed or the child's stdin goes away"""
+        try:
+            fd = self.stream.fileno()
+            while True:
+                with self._cond:
+                    while not self._queue and not self.closed:
+                        self._cond.wait()
+                    if self.closed:
+                        return
+                    data = b''.join(self._queue)
+                    self._queue.clear()
+                view = memoryview(data)
+                while view:
+                    # Blocks while the child is not reading a pipe (only this thread
+                    # waits); a spooled child's non-blocking FIFO raises EAGAIN instead
+                    written = os.write(fd, view)
+                    view = view[written:]
+                    with self._cond:
+                        self.pending = max(0, self.pending - written)
+                        self.bytes_written += written
+        except BlockingIOError:
+            logger.warning(f"Input writer {self.name} stopped: the process is not reading its input")
+        except (OSError, ValueError) as e:
+            # EPIPE/EIO/EBADF once the child has exited
+            logger.debug(f"Input writer {self.name} stopped: {e}")
+        finally:
+            self.close()
+
+    def to_dict(self) -> Dict:
+        """Queue depth and counters for status reporting"""
+        return {
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'bytes_written': self.bytes_written,
+            'rejected': self.rejected,
+            'closed': self.closed
+        }
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Finished jobs kept around for polling
+MAX_FINISHED_JOBS = 200
+
+
+class JobConflict(Exception):
+    """
+    Raised when an application already has an unfinished job doing something else
+
+    Carries the conflicting job as a to_dict() snapshot, so it survives the
+    trip over the supervisor socket.
+    """
+
+    def __init__(self, job: Dict, app_id: Optional[str] = None):
+        self.job = job
+        self.app_id = app_id or job['app_id']
+        super().__init__(f"{self.app_id} has an unfinished {job['action']} job ({job['id']})")
+
+
+class Job:
+    """A launch, stop or remove operation running in the background"""
+
+    def __init__(self, action: str, app_id: str, targets: Optional[List[str]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.action = action
+        self.app_id = app_id
+        # Applications a bulk job acts on; app_id then names the selection (e.g. 'category:Web')
+        self.targets = targets
+        self.state = QUEUED
+        self.error: Optional[str] = None
+        self.result: Optional[Dict] = None  # aggregated outcome of a bulk job
+        self.progress: Dict[str, str] = {}  # component name (app_id for bulk jobs) -> state
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        """True once the job has succeeded or failed"""
+        return self.state in (SUCCEEDED, FAILED)
+
+    def report(self, component: str, state: str):
+        """Record progress for one component or application (used as a ProcessManager callback)"""
+        with self._lock:
+            self.progress[component] = state
+
+    def to_dict(self) -> Dict:
+        """JSON-serialisable snapshot of the job"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'action': self.action,
+                'app_id': self.app_id,
+                'targets': self.targets,
+                'state': self.state,
+                'error': self.error,
+                'progress': dict(self.progress),
+                'result': self.result,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+class JobQueue:
+    """Runs launch/stop/remove jobs on a bounded worker pool and keeps their status"""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: Dict[str, Job] = OrderedDict()
+        self._active: Dict[str, Job] = {}  # app_id (or bulk selection) -> unfinished job
+        self._lock = threading.Lock()
+
+    def submit(self, action: str, app_id: str, work: Callable[[Job], bool],
+               targets: Optional[List[str]] = None) -> Job:
+        """
+        Queue an operation on an application
+
+        Only one unfinished job per application is allowed. Submitting the
+        same action while one is queued or running returns the existing job
+        instead; a different action (e.g. a stop during a launch) is refused.
+        A bulk job counts as the unfinished job of its selection and of every
+        one of its targets.
+
+        Args:
+            action: Operation name ('launch', 'stop' or 'remove')
+            app_id: Application the job acts on, or the selection a bulk job acts on
+            work: Callable doing the work; receives the job and returns success
+            targets: Applications of a bulk job
+
+        Returns:
+            Job: The new job, or the application's unfinished job with the same action
+
+        Raises:
+            JobConflict: If the application, or a target, has an unfinished
+                job with another action
+        """
+        keys = [app_id, *(targets or [])]
+        with self._lock:
+            active = self._active.get(app_id)
+            if active is not None and not active.finished and active.action == action:
+                return active
+            for key in keys:
+                active = self._active.get(key)
+                if active is not None and not active.finished and active.action != action:
+                    raise JobConflict(active.to_dict(), key)
+
+            job = Job(action, app_id, targets)
+            self._jobs[job.id] = job
+            for key in keys:
+                self._active[key] = job
+            self._trim()
+
+        self._executor.submit(self._run, job, work)
+        logger.info(f"Queued {action} job {job.id} for application {app_id}")
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], bool]):
+        """Execute a job on a worker thread and record its outcome"""
+        job.state = RUNNING
+        job.started_at = time.time()
+        try:
+            succeeded = work(job)
+            job.state = SUCCEEDED if succeeded else FAILED
+            if not succeeded and job.error is None:
+                job.error = f"Failed to {job.action} application"
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.action} {job.app_id}) failed: {e}")
+            job.state = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                for key in [job.app_id, *(job.targets or [])]:
+                    if self._active.get(key) is job:
+                        del self._active[key]
+
+    def _trim(self):
+        """Forget the oldest finished jobs past the retention limit (caller holds the lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a job
+
+        Args:
+            job_id: Identifier returned by submit()
+
+        Returns:
+            Optional[Job]: The job, or None if unknown or expired
+        """
+        return self._jobs.get(job_id)
+
+    def get_active(self, app_id: str) -> Optional[Job]:
+        """Unfinished job for an application (its own or a bulk job it is part of), if any"""
+        job = self._active.get(app_id)
+        return job if job is not None and not job.finished else None
+
+    def list_jobs(self) -> List[Job]:
+        """All retained jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
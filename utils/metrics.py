@@ -0,0 +1,156 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Lifecycle states exported as a one-hot state set
+APP_STATES = ('starting', 'running', 'restarting', 'stopping', 'stopped', 'crashed', 'crash-loop')
+
+PREFIX = 'applauncher'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, safe to observe from any thread"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative bucket counts (ending with +Inf) and the sum"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class RequestMetrics:
+    """Latency histograms for the portal's own request handlers"""
+
+    def __init__(self, handlers: Iterable[str]):
+        """
+        Args:
+            handlers: Names of the handlers to track; others are ignored
+        """
+        self.histograms: Dict[str, Histogram] = {handler: Histogram() for handler in handlers}
+
+    def observe(self, handler: str, seconds: float):
+        """Record the duration of one request to a tracked handler"""
+        histogram = self.histograms.get(handler)
+        if histogram is not None:
+            histogram.observe(seconds)
+
+
+def _escape(value) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    """Render a label set"""
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str):
+    """Write the HELP and TYPE header of a metric family"""
+    lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+
+def render_metrics(app_metrics: Dict[str, Dict], names: Dict[str, str],
+                   request_metrics: Optional[RequestMetrics] = None) -> str:
+    """
+    Render application and portal metrics in the Prometheus text format
+
+    Args:
+        app_metrics: Output of ProcessManager.get_app_metrics()
+        names: app_id -> display name, added as a label
+        request_metrics: Portal request latency histograms
+
+    Returns:
+        str: Exposition text
+    """
+    lines: List[str] = []
+    apps = sorted(app_metrics.items())
+
+    def app_labels(app_id: str, **extra) -> str:
+        return _labels(app_id=app_id, name=names.get(app_id, ''), **extra)
+
+    _family(lines, 'app_state', 'gauge', 'Lifecycle state of each application (1 for the current state).')
+    for app_id, metrics in apps:
+        for state in APP_STATES:
+            lines.append(f"{PREFIX}_app_state{app_labels(app_id, state=state)} {int(metrics['state'] == state)}")
+
+    counters = (
+        ('launches', 'app_launches_total', 'Successful launches.'),
+        ('restarts', 'app_restarts_total', 'Automatic restarts by the supervisor.'),
+        ('launch_failures', 'app_launch_failures_total', 'Launches that failed.'),
+        ('crashes', 'app_crashes_total', 'Process exits with a non-zero exit code.'),
+        ('output_bytes', 'app_output_bytes_total', 'Bytes read from child output pipes; rate() gives bytes per second.'),
+        ('dropped_output', 'app_output_dropped_total', 'Output bytes evicted from the ring buffer before being read.'),
+        ('input_rejected', 'app_input_rejected_total', 'Input writes refused because the stdin queue was full.'),
+    )
+    for key, name, help_text in counters:
+        _family(lines, name, 'counter', help_text)
+        for app_id, metrics in apps:
+            lines.append(f"{PREFIX}_{name}{app_labels(app_id)} {metrics[key]}")
+
+    _family(lines, 'app_input_queue_bytes', 'gauge', 'Input bytes queued for the application\'s processes but not yet written.')
+    for app_id, metrics in apps:
+        lines.append(f"{PREFIX}_app_input_queue_bytes{app_labels(app_id)} {metrics['input_pending']}")
+
+    latencies = (
+        ('launch_seconds', 'app_launch_seconds', 'Duration of the latest launch call.'),
+        ('time_to_ready', 'app_time_to_ready_seconds', 'Seconds from launch until every readiness probe passed.'),
+    )
+    for key, name, help_text in latencies:
+        _family(lines, name, 'gauge', help_text)
+        for app_id, metrics in apps:
+            if metrics[key] is not None:
+                lines.append(f"{PREFIX}_{name}{app_labels(app_id)} {metrics[key]}")
+
+    resources = (
+        ('cpu_percent', 'app_cpu_percent', 'CPU usage of the whole process tree at the latest sample.'),
+        ('rss', 'app_memory_rss_bytes', 'Resident memory of the whole process tree at the latest sample.'),
+        ('num_fds', 'app_open_fds', 'Open file descriptors of the process tree at the latest sample.'),
+        ('processes', 'app_processes', 'Processes in the tree at the latest sample.'),
+    )
+    for key, name, help_text in resources:
+        _family(lines, name, 'gauge', help_text)
+        for app_id, metrics in apps:
+            sample = metrics['telemetry']
+            if sample is None:
+                continue
+            for component, values in sorted(sample['components'].items()):
+                lines.append(f"{PREFIX}_{name}{app_labels(app_id, component=component)} {values[key]}")
+
+    if request_metrics is not None:
+        _family(lines, 'http_request_duration_seconds', 'histogram', 'Portal request latency by handler.')
+        for handler, histogram in sorted(request_metrics.histograms.items()):
+            cumulative, total = histogram.snapshot()
+            for bound, count in zip(histogram.buckets + (float('inf'),), cumulative):
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{PREFIX}_http_request_duration_seconds_bucket{_labels(handler=handler, le=le)} {count}")
+            lines.append(f"{PREFIX}_http_request_duration_seconds_sum{_labels(handler=handler)} {total}")
+            lines.append(f"{PREFIX}_http_request_duration_seconds_count{_labels(handler=handler)} {cumulative[-1]}")
+
+    return '\n'.join(lines) + '\n'
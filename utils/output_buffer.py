@@ -0,0 +1,161 @@
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+# Default cap on retained output per buffer (bytes of UTF-8 encoded output)
+DEFAULT_MAX_SIZE = 256 * 1024
+
+
+class OutputBuffer:
+    """
+    Bounded ring buffer of process output addressed by absolute offsets
+
+    Output is held UTF-8 encoded and offsets count bytes, the same unit as
+    the spool and the OutputLog, so a buffer started at its log's end
+    offset hands out offsets that address the same output in the log.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, sink: Optional[object] = None,
+                 offset: int = 0):
+        """
+        Args:
+            max_size: Bytes retained in memory
+            sink: Optional persistent copy (e.g. an OutputLog) with append(text)
+                and close(); it sees every append in buffer order, under the
+                buffer's lock, so its append must queue rather than do I/O
+            offset: Offset of the first byte, e.g. the end of the sink's log
+        """
+        self.max_size = max_size
+        self.sink = sink
+        self._chunks = deque()  # (start_offset, data)
+        self._start = offset  # offset of the oldest retained byte
+        self._end = offset  # offset one past the newest byte
+        self._dropped = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def start_offset(self) -> int:
+        """Offset of the oldest byte still held in the buffer"""
+        with self._cond:
+            return self._start
+
+    @property
+    def end_offset(self) -> int:
+        """Offset one past the newest byte written to the buffer"""
+        with self._cond:
+            return self._end
+
+    @property
+    def closed(self) -> bool:
+        """True once the producing process has gone away"""
+        with self._cond:
+            return self._closed
+
+    @property
+    def dropped(self) -> int:
+        """Number of bytes evicted because the buffer was full"""
+        with self._cond:
+            return self._dropped
+
+    def append(self, text: str) -> int:
+        """
+        Append output to the buffer, evicting the oldest data past the cap
+
+        Args:
+            text: Decoded output text
+
+        Returns:
+            int: Offset one past the appended text
+        """
+        if not text:
+            return self._end
+
+        data = text.encode('utf-8')
+        with self._cond:
+            self._chunks.append((self._end, data))
+            self._end += len(data)
+            if self.sink is not None:
+                self.sink.append(text)
+            self._evict()
+            self._cond.notify_all()
+            return self._end
+
+    def _evict(self):
+        """Drop whole chunks (and then a partial head) until under the cap"""
+        while self._chunks and self._end - self._start > self.max_size:
+            offset, data = self._chunks[0]
+            excess = self._end - self._start - self.max_size
+            # Never keep half a character: cut at the next UTF-8 lead byte
+            while excess < len(data) and data[excess] & 0xC0 == 0x80:
+                excess += 1
+            if len(data) <= excess:
+                self._chunks.popleft()
+                self._start = offset + len(data)
+                self._dropped += len(data)
+            else:
+                self._chunks[0] = (offset + excess, data[excess:])
+                self._start = offset + excess
+                self._dropped += excess
+
+    def read(self, offset: int = 0) -> Tuple[str, int, int]:
+        """
+        Read everything written at or after an offset without blocking
+
+        Offsets older than the retained window are clamped to the oldest
+        byte still available. Offsets past the end (e.g. from a client that
+        outlived a previous buffer) restart from the oldest byte.
+
+        Args:
+            offset: Absolute byte offset to read from
+
+        Returns:
+            Tuple[str, int, int]: Output text, the byte offset it actually
+            starts at, and the offset to pass on the next read
+        """
+        with self._cond:
+            if offset > self._end:
+                offset = self._start
+            offset = max(offset, self._start)
+            if offset >= self._end:
+                return "", offset, self._end
+
+            parts = []
+            for chunk_offset, data in reversed(self._chunks):
+                if chunk_offset + len(data) <= offset:
+                    break
+                parts.append(data[max(0, offset - chunk_offset):])
+            parts.reverse()
+            # Offsets we hand out fall between characters; anything else is replaced, not fatal
+            return b"".join(parts).decode('utf-8', errors='replace'), offset, self._end
+
+    def wait(self, offset: int, timeout: float) -> bool:
+        """
+        Block until output past an offset is available or the timeout passes
+
+        Args:
+            offset: Offset the caller has already consumed up to
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            bool: True if newer output is available, False on timeout or
+            once the buffer is closed with nothing left to read
+        """
+        with self._cond:
+            # An offset past the end is stale and is answered immediately
+            self._cond.wait_for(lambda: self._end != offset or self._closed, timeout)
+            return self._end != offset
+
+    def close(self):
+        """Mark the buffer finished and wake every waiting reader"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self.sink is not None:
+            self.sink.close()
+
+    def clear(self):
+        """Discard all retained output while keeping offsets monotonic"""
+        with self._cond:
+            self._chunks.clear()
+            self._start = self._end
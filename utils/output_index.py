@@ -0,0 +1,385 @@
+import bisect
+import logging
+import queue
+import re
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Output bytes per indexed block; matches are verified one block at a time
+BLOCK_SIZE = 64 * 1024
+
+# Blocks kept in the index; the oldest quarter is dropped past this
+DEFAULT_MAX_BLOCKS = 200_000
+
+# Default number of matches returned by a search
+DEFAULT_SEARCH_LIMIT = 100
+
+# Lines of context returned on each side of a match
+DEFAULT_CONTEXT_LINES = 2
+
+# Prefix added to component lines in the combined app output
+COMPONENT_PREFIX = re.compile(r'^\[([^\]\n]+)\] ')
+
+
+def trigrams(text: str) -> Set[str]:
+    """Distinct lowercase trigrams of a piece of text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Literal runs every match of a regex must contain
+
+    Only plain concatenations of literals (including inside groups) are
+    used; anything optional, repeated or alternated ends a run. An empty
+    result means the index can't narrow the search.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return []
+    runs: List[str] = []
+    current: List[str] = []
+
+    def walk(items):
+        for op, value in items:
+            if op == sre_parse.LITERAL:
+                current.append(chr(value))
+            elif op == sre_parse.SUBPATTERN and value[-1] is not None:
+                walk(value[-1])
+            else:
+                if current:
+                    runs.append(''.join(current))
+                    current.clear()
+    walk(parsed)
+    if current:
+        runs.append(''.join(current))
+    return [run for run in runs if len(run) >= 3]
+
+
+class _Block:
+    """One indexed stretch of an app's output log"""
+
+    __slots__ = ('app_id', 'start', 'end', 'first_ts', 'last_ts', 'chunk_offsets', 'chunk_times')
+
+    def __init__(self, app_id: str, start: int, end: int, chunk_offsets: array, chunk_times: array):
+        self.app_id = app_id
+        self.start = start
+        self.end = end
+        self.chunk_offsets = chunk_offsets  # relative offsets where each appended chunk began
+        self.chunk_times = chunk_times  # and when it was written
+        self.first_ts = chunk_times[0] if chunk_times else 0.0
+        self.last_ts = chunk_times[-1] if chunk_times else 0.0
+
+    def time_at(self, relative_offset: int) -> float:
+        """Time the byte at a block-relative offset was written"""
+        index = bisect.bisect_right(self.chunk_offsets, relative_offset) - 1
+        return self.chunk_times[max(0, index)] if self.chunk_times else 0.0
+
+
+class _Builder:
+    """Accumulates a stream's output until a full, line-aligned block can be indexed"""
+
+    def __init__(self, start: int):
+        self.start = start
+        self.data = bytearray()
+        self.chunk_offsets = array('L')
+        self.chunk_times = array('d')
+
+    @property
+    def end(self) -> int:
+        """Log offset the next contiguous chunk should start at"""
+        return self.start + len(self.data)
+
+    def add(self, offset: int, data: bytes, timestamp: float):
+        """Append a chunk; the caller detaches pending data first if it isn't contiguous"""
+        if not self.data:
+            self.start = offset
+        self.chunk_offsets.append(len(self.data))
+        self.chunk_times.append(timestamp)
+        self.data += data
+
+    def take(self) -> Optional[Tuple[int, bytes, array, array]]:
+        """Split off a block ending at a line break once enough output has accumulated"""
+        if len(self.data) < BLOCK_SIZE:
+            return None
+        cut = self.data.rfind(b'\n') + 1
+        if cut <= 0:
+            # One enormous line: cut it rather than grow without bound
+            cut = len(self.data)
+        data = bytes(self.data[:cut])
+        split = bisect.bisect_left(self.chunk_offsets, cut)
+        offsets, times = self.chunk_offsets[:split], self.chunk_times[:split]
+        start = self.start
+
+        rest_times = self.chunk_times[split:]
+        rest_offsets = array('L', (value - cut for value in self.chunk_offsets[split:]))
+        if cut < len(self.data) and (not rest_offsets or rest_offsets[0] != 0):
+            # The chunk straddling the cut continues into the next block
+            rest_offsets.insert(0, 0)
+            rest_times.insert(0, times[-1])
+        self.start += cut
+        del self.data[:cut]
+        self.chunk_offsets, self.chunk_times = rest_offsets, rest_times
+        return start, data, offsets, times
+
+    def detach(self) -> Tuple[int, bytes, array, array]:
+        """Hand over everything accumulated so far as a (short) block and start empty"""
+        block = (self.start, bytes(self.data), self.chunk_offsets, self.chunk_times)
+        self.data = bytearray()
+        self.chunk_offsets, self.chunk_times = array('L'), array('d')
+        return block
+
+
+class OutputIndex:
+    """
+    Incremental trigram index over every application's output log
+
+    Output is handed over by the log writers and indexed on a background
+    thread, so pumps never wait on it. The index maps each lowercase trigram
+    to the blocks (about 64 KiB of an app's combined output) containing it.
+    A query intersects the postings of its trigrams and only reads and
+    verifies those candidate blocks from disk; a regex without a usable
+    literal, or a query shorter than three characters, falls back to
+    scanning every block. Output not yet filling a block is kept in memory
+    and always scanned.
+    """
+
+    def __init__(self, read_range: Callable[[str, int, int], bytes],
+                 max_blocks: int = DEFAULT_MAX_BLOCKS):
+        """
+        Args:
+            read_range: Reads bytes [start, end) of an app's output log
+            max_blocks: Blocks kept before the oldest are dropped
+        """
+        self.read_range = read_range
+        self.max_blocks = max_blocks
+        self._blocks: Dict[int, _Block] = {}
+        self._postings: Dict[str, array] = {}
+        self._next_id = 0
+        self._builders: Dict[str, _Builder] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="output-indexer", daemon=True)
+        self._worker.start()
+
+    def add(self, app_id: str, offset: int, data: bytes, timestamp: float):
+        """Queue output written to an app's log at the given offset (called by OutputLog)"""
+        self._queue.put((app_id, offset, data, timestamp))
+
+    def _run(self):
+        """Indexer thread: append to builders and index every completed block"""
+        while True:
+            app_id, offset, data, timestamp = self._queue.get()
+            try:
+                with self._lock:
+                    builder = self._builders.get(app_id)
+                    if builder is None:
+                        builder = self._builders[app_id] = _Builder(offset)
+                    # A gap (e.g. a log rebuilt from disk): index what we have as is
+                    detached = builder.detach() if builder.data and offset != builder.end else None
+                    builder.add(offset, data, timestamp)
+                    block = builder.take()
+                if detached is not None:
+                    self._index_block(app_id, *detached)
+                while block is not None:
+                    self._index_block(app_id, *block)
+                    with self._lock:
+                        block = builder.take()
+            except Exception as e:
+                logger.error(f"Error indexing output of {app_id}: {e}")
+
+    def _index_block(self, app_id: str, start: int, data: bytes, offsets: array, times: array):
+        """Add one block's trigrams to the postings"""
+        grams = trigrams(data.decode('utf-8', errors='replace'))
+        with self._lock:
+            block_id = self._next_id
+            self._next_id += 1
+            self._blocks[block_id] = _Block(app_id, start, start + len(data), offsets, times)
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array('L')
+                postings.append(block_id)
+            if len(self._blocks) > self.max_blocks:
+                self._evict()
+
+    def _evict(self):
+        """Drop the oldest quarter of the blocks (caller holds the lock)"""
+        cutoff = self._next_id - (self.max_blocks * 3) // 4
+        for block_id in [block_id for block_id in self._blocks if block_id < cutoff]:
+            del self._blocks[block_id]
+        for gram in list(self._postings):
+            postings = self._postings[gram]
+            keep = postings[bisect.bisect_left(postings, cutoff):]
+            if keep:
+                self._postings[gram] = keep
+            else:
+                del self._postings[gram]
+
+    def _candidates(self, grams: Iterable[str]) -> Optional[List[int]]:
+        """Blocks containing every trigram, or None when there is nothing to narrow by (caller holds the lock)"""
+        grams = list(grams)
+        if not grams:
+            return None
+        lists = sorted((self._postings.get(gram, array('L')) for gram in grams), key=len)
+        result = set(lists[0])
+        for postings in lists[1:]:
+            if not result:
+                break
+            result.intersection_update(postings)
+        return sorted(result)
+
+    def search(self, query: str, regex: bool = False, case_sensitive: bool = False,
+               app_ids: Optional[Iterable[str]] = None, component: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = DEFAULT_SEARCH_LIMIT, context: int = DEFAULT_CONTEXT_LINES) -> Dict:
+        """
+        Find output lines matching a query, newest first
+
+        Args:
+            query: Text to find, or a regular expression with regex=True
+            regex: Treat the query as a regular expression
+            case_sensitive: Match case exactly (the index itself is case-insensitive)
+            app_ids: Only search these applications
+            component: Only lines from this component ('[name] ' prefix)
+            since: Only output written at or after this Unix time
+            until: Only output written at or before this Unix time
+            limit: Most matches returned
+            context: Lines of context on each side of a match
+
+        Returns:
+            Dict: 'matches' (app_id, component, timestamp, offset, line,
+            before, after) and 'stats' on how much of the index was used
+
+        Raises:
+            re.error: If a regex query does not compile
+        """
+        started = time.perf_counter()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        pattern = re.compile(query if regex else re.escape(query), flags | re.MULTILINE)
+        literals = required_literals(query) if regex else ([query] if len(query) >= 3 else [])
+        grams = set().union(*(trigrams(literal) for literal in literals)) if literals else set()
+        wanted = set(app_ids) if app_ids is not None else None
+
+        with self._lock:
+            candidates = self._candidates(grams)
+            indexed = candidates is not None
+            if candidates is None:
+                candidates = sorted(self._blocks)
+            blocks = [self._blocks[block_id] for block_id in reversed(candidates) if block_id in self._blocks]
+            tails = [
+                (app_id, builder.start, bytes(builder.data), builder.chunk_offsets[:], builder.chunk_times[:])
+                for app_id, builder in self._builders.items() if builder.data
+            ]
+            total_blocks = len(self._blocks)
+
+        matches: List[Dict] = []
+        scanned = 0
+
+        # Unindexed tails are the newest output, so they go first
+        sources = [_Block(app_id, start, start + len(data), offsets, times) for app_id, start, data, offsets, times in tails]
+        tail_data = {id(block): tail[2] for block, tail in zip(sources, tails)}
+        sources.extend(blocks)
+
+        for block in sources:
+            if len(matches) >= limit:
+                break
+            if wanted is not None and block.app_id not in wanted:
+                continue
+            if (since is not None and block.last_ts < since) or (until is not None and block.first_ts > until):
+                continue
+            data = tail_data.get(id(block))
+            if data is None:
+                try:
+                    data = self.read_range(block.app_id, block.start, block.end)
+                except Exception as e:
+                    logger.debug(f"Skipping unreadable output block of {block.app_id}: {e}")
+                    continue
+            scanned += 1
+            matches.extend(self._match_block(block, data, pattern, component, since, until,
+                                             limit - len(matches), context))
+
+        return {
+            'matches': matches,
+            'stats': {
+                'indexed': indexed,
+                'blocks': total_blocks,
+                'candidates': len(blocks) + len(tails),
+                'scanned': scanned,
+                'pending': self._queue.qsize(),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+            }
+        }
+
+    @staticmethod
+    def _match_block(block: _Block, data: bytes, pattern: re.Pattern, component: Optional[str],
+                     since: Optional[float], until: Optional[float], limit: int, context: int) -> List[Dict]:
+        """Verify a candidate block, newest matching line first"""
+        text = data.decode('utf-8', errors='replace')
+        # One pass over the whole block, then only the lines that matched are examined
+        line_starts = sorted({text.rfind('\n', 0, match.start()) + 1 for match in pattern.finditer(text)},
+                             reverse=True)
+        results = []
+        for line_start in line_starts:
+            if len(results) >= limit:
+                break
+            line_end = text.find('\n', line_start)
+            line_end = len(text) if line_end < 0 else line_end
+            line = text[line_start:line_end]
+            if line_start == len(text) or not pattern.search(line):
+                # Empty trailing line, or a match that spanned lines
+                continue
+            prefix = COMPONENT_PREFIX.match(line)
+            if component is not None and (prefix is None or prefix.group(1) != component):
+                continue
+            relative_offset = len(text[:line_start].encode('utf-8'))
+            timestamp = block.time_at(relative_offset)
+            if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+                continue
+            results.append({
+                'app_id': block.app_id,
+                'component': prefix.group(1) if prefix else None,
+                'timestamp': timestamp,
+                'offset': block.start + relative_offset,
+                'line': line,
+                'before': _lines_before(text, line_start, context),
+                'after': _lines_after(text, line_end, context)
+            })
+        return results
+
+
+def _lines_before(text: str, line_start: int, count: int) -> List[str]:
+    """Up to count lines ending just before line_start"""
+    lines = []
+    end = line_start - 1
+    while count > 0 and end >= 0:
+        start = text.rfind('\n', 0, end) + 1
+        lines.append(text[start:end])
+        end = start - 1
+        count -= 1
+    lines.reverse()
+    return lines
+
+
+def _lines_after(text: str, line_end: int, count: int) -> List[str]:
+    """Up to count lines starting just after line_end"""
+    lines = []
+    start = line_end + 1
+    while count > 0 and start < len(text):
+        end = text.find('\n', start)
+        end = len(text) if end < 0 else end
+        lines.append(text[start:end])
+        start = end + 1
+        count -= 1
+    return lines
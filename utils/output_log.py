@@ -0,0 +1,473 @@
+import bisect
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Size at which the active segment is rotated and compressed
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+
+# Compressed segments kept per stream; older ones are deleted
+DEFAULT_MAX_SEGMENTS = 50
+
+# Bytes between (offset, timestamp) marks used for time-range lookups
+MARK_INTERVAL = 64 * 1024
+
+# Largest range served by one read
+DEFAULT_READ_LIMIT = 1024 * 1024
+
+ACTIVE_SEGMENT = 'current.log'
+ACTIVE_MARKS = 'current.marks'
+INDEX_FILE = 'index.jsonl'
+
+# Decompressed segments kept in memory for repeated range reads (e.g. searches)
+SEGMENT_CACHE_SIZE = 8
+
+# Output waiting for the log writer across all logs before more is dropped (bytes)
+MAX_PENDING_WRITES = 16 * 1024 * 1024
+
+CODECS = ('gzip', 'zstd')
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+class _LogWriter:
+    """Background thread doing the file writes of every OutputLog, in submission order"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._pending = 0  # bytes queued and not yet written
+        self.dropped = 0  # bytes dropped because the writer was too far behind
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, log: 'OutputLog', data: Optional[bytes], timestamp: Optional[float]):
+        """Queue a write (or, with data None, a close) for a log"""
+        with self._lock:
+            if data is not None:
+                if self._pending + len(data) > MAX_PENDING_WRITES:
+                    if not self.dropped:
+                        logger.warning("Output log writer is falling behind, dropping log output")
+                    self.dropped += len(data)
+                    return
+                self._pending += len(data)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="output-log-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((log, data, timestamp))
+
+    def _run(self):
+        while True:
+            log, data, timestamp = self._queue.get()
+            if data is None:
+                try:
+                    log._close()
+                except OSError as e:
+                    logger.error(f"Error closing output log in {log.directory}: {e}")
+                continue
+            log._write(data, timestamp)
+            with self._lock:
+                self._pending -= len(data)
+
+
+_writer = _LogWriter()
+
+# One lock per log directory, shared by every OutputLog open on it: each
+# launch, read and reindex opens its own instance, and rotation, retention
+# and index.jsonl rewrites must not interleave between them
+_directory_locks: Dict[str, threading.Lock] = {}
+_directory_locks_lock = threading.Lock()
+
+
+def _directory_lock(directory: str) -> threading.Lock:
+    """The lock of a log directory, created on first use"""
+    key = os.path.realpath(directory)
+    with _directory_locks_lock:
+        lock = _directory_locks.get(key)
+        if lock is None:
+            lock = _directory_locks[key] = threading.Lock()
+        return lock
+
+
+def stream_directory(root: str, app_id: str, component: Optional[str] = None) -> str:
+    """Directory holding one app's (or one component's) output log"""
+    safe = lambda name: re.sub(r'[^A-Za-z0-9_.-]', '_', str(name)) or '_'
+    if component is None:
+        return os.path.join(root, safe(app_id), 'output')
+    return os.path.join(root, safe(app_id), 'components', safe(component))
+
+
+class OutputLog:
+    """
+    Append-only, size-rotated output log of one stream on disk
+
+    Output is appended to an uncompressed active segment. Once it passes the
+    segment size it is renamed and compressed (gzip, or zstd when the
+    zstandard package is installed and asked for) on a background thread, and
+    an entry with its byte range, first/last timestamps and periodic
+    (offset, timestamp) marks is appended to index.jsonl. Offsets are bytes of
+    UTF-8 output counted from the start of the log and survive restarts of
+    both the app and the portal.
+
+    Reads only look at files, so a log can be read after its app has
+    stopped or crashed, or from a fresh instance that never wrote to it.
+
+    append() only queues the output: one writer thread shared by every log
+    does the file writes and rotations, so a slow disk never holds up the
+    output pumps or the readers of their buffers.
+    """
+
+    def __init__(self, directory: str, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS, codec: str = 'gzip',
+                 on_write: Optional[Callable[[int, bytes, float], None]] = None):
+        """
+        Args:
+            directory: Directory holding this stream's segments
+            segment_size: Bytes after which the active segment is rotated
+            max_segments: Compressed segments kept
+            codec: 'gzip' or 'zstd'
+            on_write: Called with (offset, data, timestamp) after each write,
+                e.g. to feed a search index
+        """
+        self.directory = directory
+        self.on_write = on_write
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        if codec == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, compressing output logs with gzip")
+            codec = 'gzip'
+        self.codec = codec if codec in CODECS else 'gzip'
+        self._file: Optional[BinaryIO] = None
+        self._marks_file: Optional[BinaryIO] = None
+        self._start = 0  # log offset of the active segment's first byte
+        self._size = 0  # bytes in the active segment
+        self._marks: List[List[float]] = []  # [offset, timestamp] within the active segment
+        self._last_ts: Optional[float] = None
+        self._closed = False
+        self._lock = _directory_lock(directory)
+
+    def append(self, text: str):
+        """
+        Queue output for the active segment without waiting for the disk
+
+        Output is written in the order it was appended. If the writer falls
+        more than MAX_PENDING_WRITES behind, output is dropped (and counted)
+        rather than blocking the caller.
+        """
+        if not text:
+            return
+        _writer.submit(self, text.encode('utf-8'), time.time())
+
+    def _write(self, data: bytes, now: float):
+        """
+        Write output to the active segment, rotating it when full (writer thread)
+
+        Failures are logged and swallowed: losing log lines must never break
+        the output pump feeding the in-memory buffer.
+        """
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._open()
+                if not self._marks or self._start + self._size - self._marks[-1][0] >= MARK_INTERVAL:
+                    self._add_mark(self._start + self._size, now)
+                offset = self._start + self._size
+                self._file.write(data)
+                self._file.flush()
+                self._size += len(data)
+                if self.on_write is not None:
+                    self.on_write(offset, data, now)
+                self._last_ts = now
+                if self._size >= self.segment_size:
+                    self._rotate()
+                if self._closed:
+                    # Late output from a pump that outlived close(); don't keep files open
+                    self._close_files()
+        except Exception as e:
+            logger.error(f"Error writing output log in {self.directory}: {e}")
+
+    def close(self):
+        """Release the active segment once queued output is written (it is resumed on the next open)"""
+        _writer.submit(self, None, None)
+
+    def _close(self):
+        """Flush and release the active segment (writer thread)"""
+        with self._lock:
+            self._closed = True
+            self._close_files()
+
+    def _close_files(self):
+        """Close the active segment and its marks (caller holds the lock)"""
+        for handle in (self._file, self._marks_file):
+            if handle is not None:
+                handle.close()
+        self._file = None
+        self._marks_file = None
+
+    def _open(self):
+        """Pick up where a previous writer left off (caller holds the lock)"""
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._read_index()
+        self._start = segments[-1]['end'] if segments else 0
+        active = os.path.join(self.directory, ACTIVE_SEGMENT)
+        self._size = os.path.getsize(active) if os.path.exists(active) else 0
+        self._marks = self._read_marks()
+        self._last_ts = self._marks[-1][1] if self._marks else None
+        self._file = open(active, 'ab')
+        self._marks_file = open(os.path.join(self.directory, ACTIVE_MARKS), 'ab')
+
+    def _add_mark(self, offset: int, timestamp: float):
+        """Record where the log was at a point in time (caller holds the lock)"""
+        self._marks.append([offset, timestamp])
+        self._marks_file.write(json.dumps([offset, timestamp]).encode('utf-8') + b'\n')
+        self._marks_file.flush()
+
+    def _rotate(self):
+        """Close the active segment, index it and compress it in the background (caller holds the lock)"""
+        name = f"seg-{self._start:016d}.log"
+        entry = {
+            'file': name + EXTENSIONS[self.codec],
+            'start': self._start,
+            'end': self._start + self._size,
+            'first_ts': self._marks[0][1] if self._marks else self._last_ts,
+            'last_ts': self._last_ts,
+            'marks': self._marks
+        }
+        self._file.close()
+        self._marks_file.close()
+        os.replace(os.path.join(self.directory, ACTIVE_SEGMENT), os.path.join(self.directory, name))
+        with open(os.path.join(self.directory, INDEX_FILE), 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+        self._start = entry['end']
+        self._size = 0
+        self._marks = []
+        self._file = open(os.path.join(self.directory, ACTIVE_SEGMENT), 'wb')
+        self._marks_file = open(os.path.join(self.directory, ACTIVE_MARKS), 'wb')
+
+        threading.Thread(
+            target=self._compress, args=(name, entry['file']),
+            name=f"log-compress-{name}", daemon=True
+        ).start()
+
+    def _compress(self, name: str, compressed_name: str):
+        """Compress a rotated segment, then apply retention"""
+        source = os.path.join(self.directory, name)
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=self.directory)
+            with open(source, 'rb') as src, os.fdopen(fd, 'wb') as raw:
+                if self.codec == 'zstd':
+                    with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as out:
+                        _copy(src, out)
+                else:
+                    with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+                        _copy(src, out)
+            # Readers fall back to the plain file until the compressed one appears
+            os.replace(temp_path, os.path.join(self.directory, compressed_name))
+            os.unlink(source)
+        except Exception as e:
+            logger.error(f"Error compressing output log segment {source}: {e}")
+            return
+        self._apply_retention()
+
+    def _apply_retention(self):
+        """Delete the oldest segments beyond max_segments"""
+        with self._lock:
+            segments = self._read_index()
+            excess = len(segments) - self.max_segments
+            if excess <= 0:
+                return
+            for entry in segments[:excess]:
+                for path in (entry['file'], entry['file'].rsplit('.', 1)[0]):
+                    try:
+                        os.unlink(os.path.join(self.directory, path))
+                    except FileNotFoundError:
+                        pass
+            fd, temp_path = tempfile.mkstemp(prefix=INDEX_FILE + '.', suffix='.tmp', dir=self.directory)
+            with os.fdopen(fd, 'w') as f:
+                f.writelines(json.dumps(entry, separators=(',', ':')) + '\n' for entry in segments[excess:])
+            os.replace(temp_path, os.path.join(self.directory, INDEX_FILE))
+
+    def _read_index(self) -> List[Dict]:
+        """Rotated segments, oldest first"""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                lines = f.read().split('\n')
+        except FileNotFoundError:
+            return []
+        segments = []
+        for line in lines:
+            if line.strip():
+                try:
+                    segments.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt output log index entry in {self.directory}")
+        return segments
+
+    def _read_marks(self) -> List[List[float]]:
+        """Marks of the active segment as last written"""
+        try:
+            with open(os.path.join(self.directory, ACTIVE_MARKS)) as f:
+                return [json.loads(line) for line in f.read().split('\n') if line.strip()]
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def segments(self) -> List[Dict]:
+        """
+        Every segment still on disk, including the active one
+
+        Returns:
+            List[Dict]: Entries with file, start, end, first_ts, last_ts and
+            marks, oldest first
+        """
+        segments = self._read_index()
+        start = segments[-1]['end'] if segments else 0
+        try:
+            size = os.path.getsize(os.path.join(self.directory, ACTIVE_SEGMENT))
+        except FileNotFoundError:
+            size = 0
+        if size:
+            marks = self._read_marks()
+            segments.append({
+                'file': ACTIVE_SEGMENT,
+                'start': start,
+                'end': start + size,
+                'first_ts': marks[0][1] if marks else None,
+                'last_ts': marks[-1][1] if marks else None,
+                'marks': marks
+            })
+        return segments
+
+    def offset_at(self, timestamp: float, segments: Optional[List[Dict]] = None) -> int:
+        """
+        Earliest offset that may hold output written at or after a time
+
+        Resolution is one mark interval, so reads by time can include a
+        little earlier output but never miss any.
+        """
+        segments = self.segments() if segments is None else segments
+        marks = [mark for entry in segments for mark in entry['marks']]
+        if not marks:
+            return segments[0]['start'] if segments else 0
+        index = bisect.bisect_right([mark[1] for mark in marks], timestamp) - 1
+        return int(marks[max(0, index)][0])
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None,
+             since: Optional[float] = None, until: Optional[float] = None,
+             limit: int = DEFAULT_READ_LIMIT) -> Dict:
+        """
+        Read a byte range (or a time range) of the log from disk
+
+        Args:
+            start: First byte offset (defaults to the oldest retained byte)
+            end: Offset one past the last byte (defaults to the end of the log)
+            since: Start at output written at or after this Unix time
+            until: Stop at output written after this Unix time
+            limit: Most bytes returned; use next_offset to page
+
+        Returns:
+            Dict: 'data' (bytes), 'start' (offset actually served), 'next_offset',
+            'end_offset' (size of the whole log) and 'truncated' (the requested
+            start had already been deleted by retention)
+        """
+        segments = self.segments()
+        first = segments[0]['start'] if segments else 0
+        last = segments[-1]['end'] if segments else 0
+
+        if since is not None:
+            start = max(start or 0, self.offset_at(since, segments))
+        if until is not None:
+            marks = [mark for entry in segments for mark in entry['marks'] if mark[1] > until]
+            if marks:
+                end = min(end if end is not None else last, int(marks[0][0]))
+        requested = first if start is None else start
+        start = min(max(requested, first), last)
+        end = last if end is None else max(start, min(end, last))
+        end = min(end, start + limit)
+
+        parts = []
+        for entry in segments:
+            if entry['end'] <= start or entry['start'] >= end:
+                continue
+            skip = max(start, entry['start']) - entry['start']
+            length = min(end, entry['end']) - entry['start'] - skip
+            parts.append(self._read_segment(entry['file'], skip, length))
+        data = b''.join(parts)
+        return {
+            'data': data,
+            'start': start,
+            'next_offset': start + len(data),
+            'end_offset': last,
+            'truncated': requested < first
+        }
+
+    def _read_segment(self, name: str, skip: int, length: int) -> bytes:
+        """Read part of one segment, compressed or not"""
+        path = os.path.join(self.directory, name)
+        opener = _opener(name)
+        if opener is not None and not os.path.exists(path):
+            # Rotated but not compressed yet
+            path, opener = path.rsplit('.', 1)[0], None
+        try:
+            if opener is None:
+                with open(path, 'rb') as f:
+                    f.seek(skip)
+                    return f.read(length)
+            return _decompressed(path, opener)[skip:skip + length]
+        except FileNotFoundError:
+            # Removed by retention while we were reading
+            return b''
+
+
+_segment_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_segment_cache_lock = threading.Lock()
+
+
+def _decompressed(path: str, opener) -> bytes:
+    """Whole decompressed segment, from a small LRU cache (compressed segments never change)"""
+    key = (path, os.stat(path).st_mtime_ns)
+    with _segment_cache_lock:
+        data = _segment_cache.get(key)
+        if data is not None:
+            _segment_cache.move_to_end(key)
+            return data
+    with opener(path) as f:
+        data = f.read()
+    with _segment_cache_lock:
+        _segment_cache[key] = data
+        while len(_segment_cache) > SEGMENT_CACHE_SIZE:
+            _segment_cache.popitem(last=False)
+    return data
+
+
+def _opener(name: str):
+    """Reader factory for a segment file name, or None for plain files"""
+    if name.endswith('.gz'):
+        return lambda path: gzip.open(path, 'rb')
+    if name.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {name}")
+        return lambda path: zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return None
+
+
+def _copy(source: BinaryIO, destination, chunk_size: int = 1024 * 1024):
+    """Stream one file object into another"""
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        destination.write(chunk)
@@ -0,0 +1,56 @@
+import codecs
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Largest single read from a child pipe
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class OutputPump(threading.Thread):
+    """
+    Background thread that continuously drains a child's output
+
+    The stream is anything unbuffered with read(size) that returns what is
+    available and b'' at EOF: a pipe, a PTY master or a SpoolTail.
+    """
+
+    def __init__(self, stream, on_output: Callable[[str], None], name: str):
+        super().__init__(name=f"output-pump-{name}", daemon=True)
+        self.stream = stream
+        self.on_output = on_output
+        self.bytes_read = 0  # raw bytes drained so far, for metrics
+
+    def run(self):
+        """Read until EOF, handing decoded text to the output callback"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            while True:
+                try:
+                    data = self.stream.read(READ_CHUNK_SIZE)
+                except OSError:
+                    # EIO/EBADF once the child side has gone away
+                    break
+                if not data:
+                    break
+                self.bytes_read += len(data)
+                self._emit(decoder.decode(data))
+            self._emit(decoder.decode(b'', final=True))
+        except Exception as e:
+            logger.error(f"Output pump {self.name} failed: {e}")
+        finally:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+
+    def _emit(self, text: str):
+        """Forward text to the callback, never letting it kill the pump"""
+        if not text:
+            return
+        try:
+            self.on_output(text)
+        except Exception as e:
+            logger.error(f"Output handler for {self.name} failed: {e}")
@@ -0,0 +1,221 @@
+import logging
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from utils.config_manager import ConfigManager
+from utils.job_queue import Job, JobQueue
+from utils.process_manager import ProcessManager
+
+logger = logging.getLogger(__name__)
+
+
+class Portal:
+    """
+    The application catalog and the jobs acting on it, kept next to the processes
+
+    Lives in whichever process owns the children: the portal process itself,
+    or the supervisor daemon, where every web worker reaches it as
+    SupervisorClient.portal. Config changes, ID allocation and the job table
+    then exist exactly once, so a job created through one worker can be
+    polled through any other and two workers never hand out the same ID.
+    Everything returned is plain data that can cross the supervisor socket.
+    """
+
+    def __init__(self, manager: ProcessManager, config_manager: ConfigManager, job_queue: JobQueue):
+        self.manager = manager
+        self.config = config_manager
+        self.jobs = job_queue
+        config_manager.add_reload_listener(self._on_config_reload)
+
+    def get_applications(self) -> Tuple[Mapping, ...]:
+        """Read-only configurations of every application"""
+        return self.config.get_applications()
+
+    def get_application(self, app_id: str) -> Optional[Mapping]:
+        """Read-only configuration of one application, or None if unknown"""
+        return self.config.get_application(app_id)
+
+    def get_applications_by_category(self, category: str) -> Tuple[Mapping, ...]:
+        """Read-only configurations of the applications in a category"""
+        return self.config.get_applications_by_category(category)
+
+    def add_application(self, app_config: Dict) -> bool:
+        """
+        Add an application under the next free numeric ID
+
+        Args:
+            app_config: Application configuration without an 'id'
+
+        Returns:
+            bool: True if the application was added
+        """
+        if not self.config.add_application(app_config):
+            return False
+        self.manager.notify_status_change()
+        return True
+
+    def remove_application(self, app_id: str) -> Dict:
+        """
+        Queue a job that stops an application if it is running, then removes it from the catalog
+
+        The job has its own 'remove' action, so it is refused while a launch
+        or stop is unfinished rather than being merged into a plain stop.
+        The configuration is only removed once the stop has finished.
+
+        Args:
+            app_id: Application to remove
+
+        Returns:
+            Dict: The job
+
+        Raises:
+            ValueError: If the application is unknown
+            JobConflict: If the application has an unfinished launch or stop job
+        """
+        if self.config.get_application(app_id) is None:
+            raise ValueError(f"Application '{app_id}' not found")
+
+        def work(job: Job) -> bool:
+            if self.manager.is_running(app_id) and not self.manager.stop_application(app_id):
+                job.error = "Failed to stop application"
+                return False
+            if not self.config.remove_application(app_id):
+                return False
+            self.manager.notify_status_change()
+            logger.info(f"Removed application: {app_id}")
+            return True
+
+        return self._job_info(self.jobs.submit('remove', app_id, work))
+
+    def submit(self, action: str, app_id: str) -> Dict:
+        """
+        Queue a launch or stop job for one application
+
+        Args:
+            action: 'launch' or 'stop'
+            app_id: Application to act on
+
+        Returns:
+            Dict: The job (or the application's unfinished job with the same action)
+
+        Raises:
+            ValueError: If the application is unknown
+            JobConflict: If the application has an unfinished job with another action
+        """
+        application = self.config.get_application(app_id)
+        if application is None:
+            raise ValueError(f"Application '{app_id}' not found")
+        if action == 'launch':
+            job = self.jobs.submit(
+                'launch', app_id,
+                lambda job: self.manager.launch_application(app_id, application, progress=job.report)
+            )
+        else:
+            job = self.jobs.submit('stop', app_id, lambda job: self.manager.stop_application(app_id))
+        return self._job_info(job)
+
+    def submit_bulk(self, action: str, selection: str, app_ids: List[str],
+                    max_parallel: Optional[int] = None) -> Dict:
+        """
+        Queue one job launching or stopping a set of applications
+
+        Args:
+            action: 'launch' or 'stop'
+            selection: Label of the selection, e.g. 'category:Web'
+            app_ids: Applications to act on
+            max_parallel: Most launches warming up at once (manager default if None)
+
+        Returns:
+            Dict: The job
+
+        Raises:
+            ValueError: If an application is unknown
+            JobConflict: If the selection or an application has an unfinished
+                job with another action
+        """
+        unknown = [app_id for app_id in app_ids if self.config.get_application(app_id) is None]
+        if unknown:
+            raise ValueError(f"Applications not found: {', '.join(unknown)}")
+        applications = [self.config.get_application(app_id) for app_id in app_ids]
+
+        def work(job: Job) -> bool:
+            if action == 'launch':
+                result = self.manager.launch_applications(applications, max_parallel, progress=job.report)
+            else:
+                result = self.manager.stop_applications(list(app_ids), progress=job.report)
+            job.result = result
+            if not result['success']:
+                failed = [app_id for app_id, entry in result['apps'].items()
+                          if entry['result'] in ('failed', 'not-ready')]
+                job.error = f"{len(failed)} of {result['requested']} applications failed to {action}: {', '.join(failed)}"
+            return result['success']
+
+        return self._job_info(self.jobs.submit(action, selection, work, targets=list(app_ids)))
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """State and progress of a job, or None if unknown or expired"""
+        job = self.jobs.get(job_id)
+        return self._job_info(job) if job is not None else None
+
+    def get_active_job(self, app_id: str) -> Optional[Dict]:
+        """Unfinished job of an application (its own or a bulk job it is part of), if any"""
+        job = self.jobs.get_active(app_id)
+        return self._job_info(job) if job is not None else None
+
+    def list_jobs(self) -> List[Dict]:
+        """All retained jobs, newest first"""
+        return [job.to_dict() for job in self.jobs.list_jobs()]
+
+    def status_snapshot(self) -> List[Dict]:
+        """
+        Status of every configured application in one call
+
+        The dashboard and /api/status are built from this alone, so through
+        the supervisor they cost one round trip however many apps there are.
+
+        Returns:
+            List[Dict]: Per application: id, name and status, plus restart
+            history, pending restart reason, readiness and last exit where
+            they apply
+        """
+        app_states = self.manager.get_app_states()
+        restart_pending = dict(self.manager.restart_pending)
+        status_data = []
+        for app_config in self.config.get_applications():
+            app_id = app_config['id']
+            entry = {
+                'id': app_id,
+                'name': app_config['name'],
+                'status': app_states.get(app_id, 'stopped')
+            }
+            restarts = self.manager.get_restart_status(app_id)
+            if restarts:
+                entry['restarts'] = restarts
+            if app_id in restart_pending:
+                entry['restart_pending'] = restart_pending[app_id]
+            readiness = self.manager.get_readiness(app_id)
+            if entry['status'] == 'running' and readiness:
+                entry['ready'] = readiness['state']
+            if readiness and readiness['time_to_ready'] is not None:
+                entry['time_to_ready'] = readiness['time_to_ready']
+            exit_status = self.manager.get_exit_status(app_id)
+            if entry['status'] in ('stopped', 'crashed', 'crash-loop') and exit_status:
+                entry['exit_code'] = exit_status['exit_code']
+                entry['exited_at'] = exit_status['exited_at']
+            status_data.append(entry)
+        return status_data
+
+    def _job_info(self, job: Job) -> Dict:
+        """Job status enriched with the application's readiness for launch jobs"""
+        data = job.to_dict()
+        if job.action == 'launch' and job.targets is None:
+            data['readiness'] = self.manager.get_readiness(job.app_id)
+        return data
+
+    def _on_config_reload(self, diff: Dict[str, List[str]]):
+        """Flag running applications whose configuration changed or vanished on disk"""
+        for app_id in diff['changed']:
+            self.manager.flag_restart(app_id, 'changed')
+        for app_id in diff['removed']:
+            self.manager.flag_restart(app_id, 'removed')
+        # Added, removed and renamed apps change the status listing
+        self.manager.notify_status_change()
@@ -0,0 +1,84 @@
+import subprocess
+import threading
+from typing import Callable, Hashable, Optional
+
+from utils.async_engine import AsyncioEngine
+from utils.input_writer import DEFAULT_MAX_PENDING, InputWriter
+from utils.output_buffer import OutputBuffer
+from utils.output_pump import OutputPump
+from utils.process_reaper import ExitCallback, ProcessReaper
+from utils.readiness import ReadinessProbe
+
+# Process engines a ProcessManager can run on
+THREAD_ENGINE = 'threads'
+ENGINES = (THREAD_ENGINE, AsyncioEngine.name)
+
+
+class ThreadEngine:
+    """
+    Does the process I/O of a ProcessManager with blocking calls on threads
+
+    Every process gets an output pump thread and, once it is sent input,
+    an input writer thread; exits are reported by one ProcessReaper and
+    every background readiness probe gets a thread of its own. Simple and
+    portable, but the thread count grows with the number of children (see
+    AsyncioEngine for the alternative).
+    """
+
+    name = THREAD_ENGINE
+
+    def __init__(self, on_exit: ExitCallback):
+        self.reaper = ProcessReaper(on_exit)
+
+    def popen(self, args, **popen_kwargs) -> subprocess.Popen:
+        """Start a child (same arguments as subprocess.Popen)"""
+        return subprocess.Popen(args, **popen_kwargs)
+
+    def watch(self, key: Hashable, process):
+        """Report the process's exit to the exit callback"""
+        self.reaper.watch(key, process)
+
+    def pump_output(self, stream, on_output: Callable[[str], None], name: str) -> OutputPump:
+        """Drain a child's output into on_output until EOF"""
+        pump = OutputPump(stream, on_output, name)
+        pump.start()
+        return pump
+
+    def input_writer(self, stream, name: str, max_pending: int = DEFAULT_MAX_PENDING) -> InputWriter:
+        """Bounded, non-blocking input queue feeding a child's stdin"""
+        writer = InputWriter(stream, name, max_pending)
+        writer.start()
+        return writer
+
+    def wait_ready(self, probe: ReadinessProbe, is_alive: Callable[[], bool],
+                   buffer: Optional[OutputBuffer], timeout: float) -> bool:
+        """Run a readiness probe in the calling thread"""
+        return probe.wait(is_alive, buffer, timeout)
+
+    def probe_in_background(self, probe: ReadinessProbe, is_alive: Callable[[], bool],
+                            buffer: Optional[OutputBuffer], timeout: float,
+                            on_done: Callable[[bool], None], name: str):
+        """Run a readiness probe without waiting for it; on_done gets the outcome"""
+        threading.Thread(
+            target=lambda: on_done(probe.wait(is_alive, buffer, timeout)),
+            name=f"readiness-{name}", daemon=True
+        ).start()
+
+
+def create_engine(kind: str, on_exit: ExitCallback):
+    """
+    Process engine by name
+
+    Args:
+        kind: 'threads' or 'asyncio'
+        on_exit: Called with (key, process, return_code, exited_at) for
+            every watched process that exits
+
+    Raises:
+        ValueError: If the engine name is unknown
+    """
+    if kind == THREAD_ENGINE:
+        return ThreadEngine(on_exit)
+    if kind == AsyncioEngine.name:
+        return AsyncioEngine(on_exit)
+    raise ValueError(f"Unknown process engine '{kind}' (expected one of: {', '.join(ENGINES)})")
@@ -1,48 +1,182 @@
+import heapq
 import subprocess
 import psutil
 import logging
 import os
-from typing import Dict, List, Optional
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping, Optional
+from utils.admission import AdmissionController
+from utils.input_writer import DEFAULT_MAX_PENDING
+from utils.output_buffer import OutputBuffer
+from utils.output_index import COMPONENT_PREFIX, DEFAULT_CONTEXT_LINES, DEFAULT_SEARCH_LIMIT, OutputIndex
+from utils.output_log import DEFAULT_SEGMENT_SIZE, OutputLog, stream_directory
+from utils.process_engine import THREAD_ENGINE, create_engine
+from utils.process_state import STATE_SUPPORTED, AdoptedProcess, StateFile, process_record
+from utils.process_tree import IS_WINDOWS, exited, new_group_kwargs, reaping_held, terminate_trees
+from utils.pty_process import DEFAULT_COLS, DEFAULT_ROWS, PTY_SUPPORTED, is_pty, set_window_size, spawn_in_pty
+from utils.readiness import AppReadiness, DEFAULT_READY_TIMEOUT, ReadinessProbe
+from utils.resource_limits import ChildSetup, CgroupTree, ResourceLimits, cgroup_of
+from utils.restart_policy import RestartPolicy, RestartTracker
+from utils.spool import SPOOL_SUPPORTED, attach_spool, spawn_spooled
+from utils.telemetry import DEFAULT_HISTORY_SIZE, DEFAULT_SAMPLE_INTERVAL, TelemetrySampler
 
 logger = logging.getLogger(__name__)
 
+# Seconds a stop gives processes to exit after SIGTERM before SIGKILL
+STOP_GRACE_PERIOD = 5.0
+
+# State changes within this window are coalesced into one state file write (seconds)
+STATE_SAVE_DELAY = 0.2
+
+# Application lifecycle states
+STARTING = 'starting'
+RUNNING = 'running'
+STOPPING = 'stopping'
+STOPPED = 'stopped'
+CRASHED = 'crashed'
+RESTARTING = 'restarting'  # every process is down and waiting out its restart backoff
+CRASH_LOOP = 'crash-loop'  # gave up after too many restarts in the policy window
+
+# States in which an application counts as running (is_running, get_running_processes)
+ACTIVE_STATES = (RUNNING, RESTARTING)
+
 class ProcessManager:
     """Manages launching and tracking of application processes"""
     
-    def __init__(self):
+    def __init__(self, telemetry_interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 telemetry_history: int = DEFAULT_HISTORY_SIZE, log_dir: Optional[str] = None,
+                 log_segment_size: int = DEFAULT_SEGMENT_SIZE, log_codec: str = 'gzip',
+                 input_queue_size: int = DEFAULT_MAX_PENDING, state_dir: Optional[str] = None,
+                 engine: str = THREAD_ENGINE, admission: Optional[AdmissionController] = None,
+                 cgroups: bool = False, cgroup_root: Optional[str] = None):
         self.running_processes: Dict[str, subprocess.Popen] = {}
         self.process_info: Dict[str, Dict] = {}
-        self.output_buffers: Dict[str, str] = {}
+        self.output_buffers: Dict[str, OutputBuffer] = {}
+        self.component_buffers: Dict[str, Dict[str, OutputBuffer]] = {}  # app_id -> {component_name: buffer}
         self.component_processes: Dict[str, Dict[str, subprocess.Popen]] = {}  # app_id -> {component_name: process}
+        self.output_pumps: Dict[str, List] = {}  # app_id -> output pumps of the engine
+        self.exit_status: Dict[str, Dict] = {}  # app_id -> how and when it last stopped
+        self.readiness: Dict[str, AppReadiness] = {}  # app_id -> readiness of its latest launch
+        self.app_states: Dict[str, str] = {}  # app_id -> lifecycle state
+        self.restart_pending: Dict[str, str] = {}  # app_id -> why its running config is stale
+        self.app_stats: Dict[str, Dict] = {}  # app_id -> counters that outlive individual runs
+        # Output is also written to rotated logs under log_dir when set
+        self.log_dir = log_dir
+        self.log_segment_size = log_segment_size
+        self.log_codec = log_codec
+        # Searchable index over the logged output of every app
+        self.search_index = OutputIndex(self._read_log_range) if log_dir else None
+        self.app_configs: Dict[str, Dict] = {}  # app_id -> configuration of the running launch
+        self.restart_trackers: Dict[str, Dict[str, RestartTracker]] = {}  # app_id -> {component: tracker}
+        self.terminal_sizes: Dict[tuple, tuple] = {}  # (app_id, component) -> (rows, cols) of its PTY
+        # Input goes through a bounded queue per process so a child that stops
+        # reading can never block the caller
+        self.input_queue_size = input_queue_size
+        self.input_writers: Dict[str, Dict[Optional[str], object]] = {}  # app_id -> {component: writer}
+        # Each app's state and tracking dicts are only mutated under that app's
+        # lock; readers do plain dict lookups and never wait on another app
+        self._app_locks: Dict[str, threading.RLock] = {}
+        self._app_locks_guard = threading.Lock()
+        # Spawning, output, input, exit waits and readiness probes run on threads
+        # ('threads') or all on one event loop ('asyncio'); see process_engine
+        self.engine = create_engine(engine, self._handle_exit)
+        # Paces bulk launches (launch_applications) across all callers
+        self.admission = admission or AdmissionController()
+        # With cgroup v2 every process runs in a cgroup of its own, which enforces
+        # its 'resources' limits and gives telemetry cheap usage accounting;
+        # without it limits fall back to setrlimit and nice (see resource_limits)
+        self.cgroups: Optional[CgroupTree] = CgroupTree.detect(cgroup_root) if cgroups else None
+        self.process_cgroups: Dict[tuple, str] = {}  # (app_id, component) -> cgroup directory
+        # Restarts waiting out their backoff: heap of (due, seq, app_id, component, dead process)
+        self._restart_queue: List = []
+        self._restart_seq = 0
+        self._pending_restarts: Dict[tuple, subprocess.Popen] = {}  # (app_id, component) -> dead process
+        self._supervisor_wakeup = threading.Condition()
+        self._supervisor: Optional[threading.Thread] = None
+        # With a state directory, non-PTY children write to spool files instead of
+        # pipes and are recorded in a state file, so they outlive the portal
+        # process and the next one re-adopts them (see adopt_processes)
+        self.state_dir: Optional[str] = None
+        self.state_file: Optional[StateFile] = None
+        self._state_lock = threading.Lock()
+        # Saved records by app_id; a background writer refreshes the stale ones
+        # (see _schedule_state_save) so no transition waits on an fsync
+        self._state_records: Dict[str, Dict] = {}
+        self._state_stale: set = set()
+        self._state_stale_changed = threading.Condition()
+        self._state_writer: Optional[threading.Thread] = None
+        if state_dir and SPOOL_SUPPORTED and STATE_SUPPORTED:
+            state_file = StateFile(state_dir)
+            if state_file.acquire():
+                self.state_dir, self.state_file = state_dir, state_file
+            else:
+                logger.warning(f"Another portal process owns {state_dir}; "
+                               f"applications started here will not survive a portal restart")
+        elif state_dir:
+            logger.info("Children cannot outlive the portal on this platform; using plain pipes")
+        # Bumped on every change visible in status responses, for ETags and long-polling
+        self.status_generation = 0
+        self._status_changed = threading.Condition()
+        # Started by the caller; until then get_process_info has no usage figures
+        self.telemetry = TelemetrySampler(self.get_process_roots, telemetry_interval, telemetry_history,
+                                          self.get_process_cgroups)
     
-    def launch_application(self, app_id: str, app_config: Dict) -> bool:
+    def launch_application(self, app_id: str, app_config: Dict,
+                           progress: Optional[Callable[[str, str], None]] = None) -> bool:
         """
         Launch an application process
         
         Args:
             app_id: Unique identifier for the application
             app_config: Application configuration dictionary
+            progress: Optional callback receiving (component name, state) as
+                each component moves through waiting/starting/started/ready/failed
             
         Returns:
             bool: True if launch successful, False otherwise
         """
+        # Claim the app; a concurrent launch (e.g. a double click) loses here
+        if not self._transition(app_id, (STOPPED, CRASHED, CRASH_LOOP), STARTING):
+            logger.warning(f"Application {app_id} is already {self.get_app_state(app_id)}")
+            return False
+        
+        self.restart_pending.pop(app_id, None)
+        started = time.monotonic()
+        success = False
         try:
-            # Check if already running
-            if self.is_running(app_id):
-                logger.warning(f"Application {app_id} is already running")
-                return False
-            
+            # Trackers exist before anything is spawned, so even an instant exit is supervised
+            self._set_restart_policies(app_id, app_config)
+
             # Check if application has components (multi-component) or single command
             if app_config.get('components'):
-                return self._launch_multi_component_application(app_id, app_config)
+                success = self._launch_multi_component_application(app_id, app_config, progress)
             else:
-                return self._launch_single_component_application(app_id, app_config)
+                success = self._launch_single_component_application(app_id, app_config, progress)
+            return success
                 
         except Exception as e:
             logger.error(f"Error launching application {app_id}: {e}")
             return False
+        finally:
+            stats = self._stats(app_id)
+            stats['launch_seconds'] = round(time.monotonic() - started, 3)
+            if success:
+                stats['launches'] += 1
+            else:
+                stats['launch_failures'] += 1
+                self.restart_trackers.pop(app_id, None)
+                with self._app_lock(app_id):
+                    # Readiness of an earlier run no longer describes the app
+                    self.readiness.pop(app_id, None)
+                self._release_launch(app_id)
+                self._transition(app_id, (STARTING,), CRASHED)
     
-    def _launch_single_component_application(self, app_id: str, app_config: Dict) -> bool:
+    def _launch_single_component_application(self, app_id: str, app_config: Dict,
+                                             progress: Optional[Callable[[str, str], None]] = None) -> bool:
         """Launch a single-component application"""
         try:
             command = app_config.get('command', '')
@@ -52,47 +186,56 @@ class ProcessManager:
                 logger.error(f"No command specified for application {app_id}")
                 return False
             
-            # Split command into parts for subprocess
-            command_parts = command.split()
-            
-            # Remove log file handling, restore original subprocess.PIPE behavior
-            process = subprocess.Popen(
-                command_parts,
-                cwd=working_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,  # Combine stderr with stdout
-                stdin=subprocess.PIPE,
-                text=True,
-                bufsize=1,  # Line buffered
-                universal_newlines=True,
-                shell=True  # Use shell=True for Windows compatibility
-            )
+            readiness = AppReadiness(float(app_config.get('ready_timeout', DEFAULT_READY_TIMEOUT)))
+            probe = ReadinessProbe.from_config(app_config)
+            readiness.begin(app_id, probe)
+            
+            self._report(progress, app_id, 'starting')
+            process = self._spawn(command, working_dir, self._wants_pty(app_config), (app_id, None), app_config)
+            buffer = self._new_buffer(app_id)
             
             # Store process information
-            self.running_processes[app_id] = process
-            self.process_info[app_id] = {
-                'pid': process.pid,
-                'command': command,
-                'working_dir': working_dir,
-                'name': app_config.get('name', app_id),
-                'type': 'single'
-            }
-            self.output_buffers[app_id] = ""
+            with self._app_lock(app_id):
+                self.running_processes[app_id] = process
+                self.process_info[app_id] = {
+                    'pid': process.pid,
+                    'command': command,
+                    'working_dir': working_dir,
+                    'name': app_config.get('name', app_id),
+                    'type': 'single',
+                    'pty': is_pty(process.stdin)
+                }
+                self.output_buffers[app_id] = buffer
+                self.component_buffers[app_id] = {}
+                self.output_pumps[app_id] = [
+                    self._start_output_pump(app_id, process, self._make_output_handler(app_id))
+                ]
+                self.exit_status.pop(app_id, None)
+                self.readiness[app_id] = readiness
+                self._set_state(app_id, RUNNING)
+            self.engine.watch((app_id, None), process)
+            self._report(progress, app_id, 'started')
+            if probe:
+                self._probe_in_background(app_id, app_id, process, probe, buffer, readiness)
             
             logger.info(f"Successfully launched application {app_id} with PID {process.pid}")
             return True
             
         except FileNotFoundError:
             logger.error(f"Command not found for application {app_id}: {command}")
+            self._report(progress, app_id, 'failed')
             return False
         except PermissionError:
             logger.error(f"Permission denied launching application {app_id}")
+            self._report(progress, app_id, 'failed')
             return False
         except Exception as e:
             logger.error(f"Error launching single component application {app_id}: {e}")
+            self._report(progress, app_id, 'failed')
             return False
     
-    def _launch_multi_component_application(self, app_id: str, app_config: Dict) -> bool:
+    def _launch_multi_component_application(self, app_id: str, app_config: Dict,
+                                            progress: Optional[Callable[[str, str], None]] = None) -> bool:
         """Launch a multi-component application (frontend + backend)"""
         try:
             components = app_config.get('components', [])
@@ -103,60 +246,128 @@ class ProcessManager:
             
             # Sort components by order
             components = sorted(components, key=lambda x: x.get('order', 0))
+            dependencies = self._resolve_component_dependencies(app_id, components)
+            if dependencies is None:
+                return False
             
             launched_processes = {}
-            combined_output = ""
+            launch_lock = threading.Lock()
+            app_buffer = self._new_buffer(app_id)
+            component_buffers = {
+                component.get('name', ''): self._new_buffer(app_id, component.get('name', ''))
+                for component in components
+            }
+            pumps = []
+            readiness = AppReadiness(float(app_config.get('ready_timeout', DEFAULT_READY_TIMEOUT)))
+            # Only components something depends on hold up the launch; the rest
+            # are probed in the background
+            awaited = {dependency for deps in dependencies.values() for dependency in deps}
             
-            for component in components:
+            def launch_component(component: Dict) -> bool:
+                """Wait for dependencies, then start one component"""
+                component_name = component.get('name', '')
+                for dependency in dependencies[component_name]:
+                    if not ready[dependency].result():
+                        logger.error(f"Not starting component {component_name} of application {app_id}: "
+                                     f"dependency {dependency} failed")
+                        self._report(progress, component_name, 'skipped')
+                        return False
+                try:
+                    started = start_component(component)
+                except Exception:
+                    self._report(progress, component_name, 'failed')
+                    raise
+                self._report(progress, component_name, 'started' if started is None else
+                             ('ready' if started else 'failed'))
+                return started is not False
+            
+            def start_component(component: Dict) -> Optional[bool]:
+                """Spawn one component; None when its readiness is probed in the background"""
                 component_name = component.get('name', '')
+                self._report(progress, component_name, 'starting')
+                
                 command = component.get('command', '')
                 working_dir = component.get('working_dir', '') or app_config.get('working_dir', '') or None
                 
                 if not command:
                     logger.error(f"No command specified for component {component_name} in application {app_id}")
-                    continue
+                    return True
                 
-                # Split command into parts for subprocess
-                command_parts = command.split()
-                
-                # Remove log file handling, restore original subprocess.PIPE behavior
-                process = subprocess.Popen(
-                    command_parts,
-                    cwd=working_dir,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    stdin=subprocess.PIPE,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
-                    shell=True  # Use shell=True for Windows compatibility
+                probe = ReadinessProbe.from_config(component)
+                readiness.begin(component_name, probe)
+                process = self._spawn(command, working_dir, self._wants_pty(component, app_config),
+                                      (app_id, component_name), component, app_config)
+                with launch_lock:
+                    launched_processes[component_name] = process
+                app_buffer.append(f"[{component_name}] Started with PID {process.pid}\n")
+                handler = self._make_output_handler(
+                    app_id, component_name, app_buffer, component_buffers[component_name]
                 )
-                
-                launched_processes[component_name] = process
-                combined_output += f"[{component_name}] Started with PID {process.pid}\n"
+                pump = self._start_output_pump(f"{app_id}-{component_name}", process, handler)
+                with launch_lock:
+                    pumps.append(pump)
                 
                 logger.info(f"Successfully launched component {component_name} for application {app_id} with PID {process.pid}")
-                
-                # Small delay between component launches
-                import time
-                time.sleep(0.5)
+                if probe is None:
+                    return self._wait_until_ready(app_id, component_name, process)
+                if component_name in awaited:
+                    self._report(progress, component_name, 'probing')
+                    return self._run_probe(app_id, component_name, process, probe,
+                                           component_buffers[component_name], readiness)
+                self._probe_in_background(app_id, component_name, process, probe,
+                                          component_buffers[component_name], readiness)
+                return None
+            
+            for component in components:
+                self._report(progress, component.get('name', ''), 'waiting')
+            
+            # Every component gets its own thread and starts as soon as the
+            # components it depends on are ready, so independent components
+            # launch together and the total time tracks the longest chain
+            with ThreadPoolExecutor(max_workers=len(components),
+                                    thread_name_prefix=f"launch-{app_id}") as executor:
+                by_name = {component.get('name', ''): component for component in components}
+                ready = {}
+                for name in dependencies:
+                    ready[name] = executor.submit(launch_component, by_name[name])
+                results = {name: future.result() for name, future in ready.items()}
+            
+            if not all(results.values()):
+                failed = [name for name, ok in results.items() if not ok]
+                raise RuntimeError(f"components failed to start: {', '.join(failed)}")
+            
+            # Keep the configured order so the first component stays the main one
+            launched_processes = {
+                component.get('name', ''): launched_processes[component.get('name', '')]
+                for component in components
+                if component.get('name', '') in launched_processes
+            }
             
             if launched_processes:
-                # Store component processes
-                self.component_processes[app_id] = launched_processes
-                
-                # Create a combined process info
-                main_process = list(launched_processes.values())[0]  # Use first component as main
-                self.running_processes[app_id] = main_process
-                self.process_info[app_id] = {
-                    'pid': main_process.pid,
-                    'command': f"Multi-component app ({len(launched_processes)} components)",
-                    'working_dir': app_config.get('working_dir', ''),
-                    'name': app_config.get('name', app_id),
-                    'type': 'multi',
-                    'components': {name: proc.pid for name, proc in launched_processes.items()}
-                }
-                self.output_buffers[app_id] = combined_output
+                with self._app_lock(app_id):
+                    # Store component processes
+                    self.component_processes[app_id] = launched_processes
+                    
+                    # Create a combined process info
+                    main_process = list(launched_processes.values())[0]  # Use first component as main
+                    self.running_processes[app_id] = main_process
+                    self.process_info[app_id] = {
+                        'pid': main_process.pid,
+                        'command': f"Multi-component app ({len(launched_processes)} components)",
+                        'working_dir': app_config.get('working_dir', ''),
+                        'name': app_config.get('name', app_id),
+                        'type': 'multi',
+                        'components': {name: proc.pid for name, proc in launched_processes.items()},
+                        'pty': is_pty(main_process.stdin)
+                    }
+                    self.output_buffers[app_id] = app_buffer
+                    self.component_buffers[app_id] = component_buffers
+                    self.output_pumps[app_id] = pumps
+                    self.exit_status.pop(app_id, None)
+                    self.readiness[app_id] = readiness
+                    self._set_state(app_id, RUNNING)
+                for component_name, process in launched_processes.items():
+                    self.engine.watch((app_id, component_name), process)
                 
                 logger.info(f"Successfully launched multi-component application {app_id} with {len(launched_processes)} components")
                 return True
@@ -167,16 +378,379 @@ class ProcessManager:
         except Exception as e:
             # Clean up any launched processes on error
             if 'launched_processes' in locals():
-                for proc in launched_processes.values():
-                    try:
-                        proc.terminate()
-                        proc.wait(timeout=5)
-                    except:
-                        proc.kill()
+                terminate_trees(list(launched_processes.values()), STOP_GRACE_PERIOD)
+                for buffer in [app_buffer, *component_buffers.values()]:
+                    buffer.close()
             
             logger.error(f"Error launching multi-component application {app_id}: {e}")
             return False
     
+    def _report(self, progress: Optional[Callable[[str, str], None]], name: str, state: str):
+        """Forward a progress update to an optional callback"""
+        if progress is not None:
+            try:
+                progress(name, state)
+            except Exception as e:
+                logger.debug(f"Progress callback failed for {name}: {e}")
+    
+    def _resolve_component_dependencies(self, app_id: str, components: List[Dict]) -> Optional[Dict[str, List[str]]]:
+        """
+        Work out which components each component has to wait for
+        
+        A component's 'depends_on' list names its dependencies explicitly.
+        Without one, it depends on every component with a lower 'order', so
+        components sharing an order start together.
+        
+        Args:
+            app_id: Unique identifier for the application (for logging)
+            components: Component configurations sorted by order
+            
+        Returns:
+            Optional[Dict[str, List[str]]]: Component name -> dependency names in
+            dependency order, or None if the names are duplicated, unknown or cyclic
+        """
+        names = [component.get('name', '') for component in components]
+        if len(set(names)) != len(names):
+            logger.error(f"Duplicate component names in application {app_id}")
+            return None
+        
+        dependencies = {}
+        for component in components:
+            name = component.get('name', '')
+            if component.get('depends_on') is not None:
+                declared = component['depends_on']
+                if isinstance(declared, str):
+                    declared = [declared]
+                unknown = [dep for dep in declared if dep not in names or dep == name]
+                if unknown:
+                    logger.error(f"Component {name} of application {app_id} has invalid dependencies: {unknown}")
+                    return None
+                dependencies[name] = list(declared)
+            else:
+                order = component.get('order', 0)
+                dependencies[name] = [
+                    other.get('name', '') for other in components if other.get('order', 0) < order
+                ]
+        
+        # Order dependencies before their dependents, rejecting cycles that would
+        # leave launch threads waiting on each other forever
+        ordered = {}
+        remaining = {name: set(deps) for name, deps in dependencies.items()}
+        while remaining:
+            startable = [name for name, deps in remaining.items() if not deps]
+            if not startable:
+                logger.error(f"Dependency cycle between components of application {app_id}: {sorted(remaining)}")
+                return None
+            for name in startable:
+                ordered[name] = dependencies[name]
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(startable)
+        
+        return ordered
+    
+    def _run_probe(self, app_id: str, name: str, process: subprocess.Popen, probe: ReadinessProbe,
+                   buffer: OutputBuffer, readiness: AppReadiness) -> bool:
+        """Run a readiness probe within the app's launch budget and record the result"""
+        ready = self.engine.wait_ready(probe, lambda: not exited(process), buffer, readiness.remaining())
+        return self._probe_finished(app_id, name, probe, readiness, ready)
+    
+    def _probe_finished(self, app_id: str, name: str, probe: ReadinessProbe,
+                        readiness: AppReadiness, ready: bool) -> bool:
+        """Record the outcome of a readiness probe"""
+        readiness.finish(name, ready)
+        self.notify_status_change()
+        if ready:
+            logger.info(f"{name} of application {app_id} is ready ({probe.describe()})")
+        else:
+            logger.warning(f"{name} of application {app_id} did not become ready ({probe.describe()})")
+        return ready
+    
+    def _probe_in_background(self, app_id: str, name: str, process: subprocess.Popen,
+                             probe: ReadinessProbe, buffer: OutputBuffer, readiness: AppReadiness):
+        """Run a readiness probe without waiting for it"""
+        self.engine.probe_in_background(
+            probe, lambda: not exited(process), buffer, readiness.remaining(),
+            lambda ready: self._probe_finished(app_id, name, probe, readiness, ready),
+            f"{app_id}-{name}"
+        )
+    
+    def _wait_until_ready(self, app_id: str, component_name: str, process: subprocess.Popen) -> bool:
+        """
+        Decide whether a component without a readiness probe can serve its dependents
+        
+        Such a component counts as ready once it has been spawned and has not
+        already exited with an error.
+        """
+        return_code = process.poll()
+        if return_code:
+            logger.error(f"Component {component_name} of application {app_id} exited with code {return_code}")
+            return False
+        return True
+    
+    def _wants_pty(self, config: Dict, app_config: Optional[Dict] = None) -> bool:
+        """Whether an app or component asked for a PTY ('pty': true; components inherit the app's)"""
+        wanted = config.get('pty', app_config.get('pty', False) if app_config else False)
+        if wanted and not PTY_SUPPORTED:
+            logger.warning("PTY mode is not supported on this platform, using pipes")
+            return False
+        return bool(wanted)
+    
+    def _spawn(self, command: str, working_dir: Optional[str], use_pty: bool = False,
+               key: Optional[tuple] = None, config: Optional[Dict] = None,
+               app_config: Optional[Dict] = None) -> subprocess.Popen:
+        """
+        Start a shell command with binary pipes (or a PTY) for the output pumps
+        
+        Args:
+            command: Shell command to run
+            working_dir: Directory to run it in
+            use_pty: Attach the child to a pseudo-terminal instead of pipes
+            key: (app_id, component) the process runs for; picks its spool
+                directory, its cgroup and the last terminal size of a PTY
+            config: Configuration of the app or component, for its resource limits
+            app_config: Configuration of the whole app when spawning a component
+        """
+        popen_kwargs = new_group_kwargs()  # Own process group so stops reach grandchildren
+        setup = self._child_setup(key, config, app_config) if key is not None else None
+        if setup is not None and setup.preexec_fn is not None:
+            popen_kwargs['preexec_fn'] = setup.preexec_fn
+        try:
+            process = self._start_child(command, working_dir, use_pty, key, popen_kwargs)
+        finally:
+            if setup is not None:
+                setup.close()
+        if setup is not None:
+            setup.apply_priorities(process.pid)
+        return process
+    
+    def _start_child(self, command: str, working_dir: Optional[str], use_pty: bool,
+                     key: Optional[tuple], popen_kwargs: Dict) -> subprocess.Popen:
+        """Start the child of _spawn through the right mechanism for its output"""
+        if use_pty:
+            # A PTY dies with its master side, so these children never outlive the portal
+            rows, cols = self.terminal_sizes.get(key, (DEFAULT_ROWS, DEFAULT_COLS))
+            return spawn_in_pty(command, working_dir, rows, cols, popen=self.engine.popen, **popen_kwargs)
+        if self.state_file is not None and key is not None:
+            app_id, component_name = key
+            spool_dir = os.path.join(self.state_dir, 'spool', app_id, component_name or 'main')
+            return spawn_spooled(command, working_dir, spool_dir, lambda: self._schedule_state_save(app_id),
+                                 popen=self.engine.popen, **popen_kwargs)
+        return self.engine.popen(
+            command,
+            cwd=working_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,  # Combine stderr with stdout
+            stdin=subprocess.PIPE,
+            bufsize=0,
+            shell=True,  # Use shell=True for Windows compatibility
+            **popen_kwargs
+        )
+    
+    def _child_setup(self, key: tuple, config: Optional[Dict],
+                     app_config: Optional[Dict]) -> Optional[ChildSetup]:
+        """
+        Cgroup placement and limits for a process about to be spawned
+        
+        A component's cgroup sits inside its app's, so the app's limits cap
+        all components together and a component's own limits cap it alone.
+        nice and ionice of the app apply to every component that sets none.
+        
+        Raises:
+            ValueError: If the 'resources' settings are invalid
+        """
+        if IS_WINDOWS:
+            return None
+        app_id, component_name = key
+        app_limits = ResourceLimits.from_config(app_config) if component_name is not None else None
+        limits = ResourceLimits.from_config(config)
+        process_limits = (app_limits or ResourceLimits()).merged(limits) if app_limits or limits else None
+        setup = None
+        if self.cgroups is not None:
+            try:
+                setup = ChildSetup(process_limits, self.cgroups.prepare(app_id, component_name, app_limits, limits))
+            except OSError as e:
+                logger.warning(f"Cannot place {component_name or app_id} of application {app_id} in a cgroup: {e}")
+        if setup is None and process_limits is not None:
+            setup = ChildSetup(process_limits)
+            unenforced = setup.unenforced()
+            if unenforced:
+                logger.warning(f"Resource limits of {component_name or app_id} of application {app_id} "
+                               f"not enforced without cgroup v2: {', '.join(unenforced)}")
+        with self._app_lock(app_id):
+            if setup is not None and setup.cgroup is not None:
+                self.process_cgroups[key] = setup.cgroup
+            else:
+                self.process_cgroups.pop(key, None)
+        return setup
+    
+    def _new_buffer(self, app_id: str, component_name: Optional[str] = None) -> OutputBuffer:
+        """Output buffer for an app or component, mirrored to disk when logging is on"""
+        if not self.log_dir:
+            return OutputBuffer()
+        log = self._open_log(app_id, component_name, indexed=component_name is None)
+        # Continue at the log's end so buffer offsets are log offsets too
+        segments = log.segments()
+        return OutputBuffer(sink=log, offset=segments[-1]['end'] if segments else 0)
+    
+    def _open_log(self, app_id: str, component_name: Optional[str] = None,
+                  indexed: bool = False) -> OutputLog:
+        """Output log of an app (or one of its components), whether or not it is running"""
+        on_write = None
+        if indexed and self.search_index is not None:
+            # Only the combined app stream is indexed; component lines carry a [name] prefix there
+            on_write = lambda offset, data, timestamp: self.search_index.add(app_id, offset, data, timestamp)
+        return OutputLog(
+            stream_directory(self.log_dir, app_id, component_name),
+            segment_size=self.log_segment_size,
+            codec=self.log_codec,
+            on_write=on_write
+        )
+    
+    def _read_log_range(self, app_id: str, start: int, end: int) -> bytes:
+        """Exact bytes [start, end) of an app's combined output log, or nothing if retention removed them"""
+        chunk = self._open_log(app_id).read(start=start, end=end, limit=end - start)
+        return chunk['data'] if chunk['start'] == start else b''
+    
+    def index_existing_logs(self):
+        """Feed output logged by earlier runs of the portal into the search index"""
+        if self.search_index is None or not os.path.isdir(self.log_dir):
+            return
+        started = time.monotonic()
+        for app_id in sorted(os.listdir(self.log_dir)):
+            log = self._open_log(app_id)
+            for entry in log.segments():
+                # Feed mark to mark so indexed lines get the time they were written
+                marks = entry['marks'] or [[entry['start'], entry['first_ts'] or 0.0]]
+                bounds = [int(mark[0]) for mark in marks] + [entry['end']]
+                for (offset, timestamp), end in zip(marks, bounds[1:]):
+                    data = self._read_log_range(app_id, int(offset), end)
+                    if data:
+                        self.search_index.add(app_id, int(offset), data, timestamp)
+        logger.info(f"Queued existing output logs for indexing in {time.monotonic() - started:.2f}s")
+    
+    def search_output(self, query: str, regex: bool = False, case_sensitive: bool = False,
+                      app_ids: Optional[List[str]] = None, component: Optional[str] = None,
+                      since: Optional[float] = None, until: Optional[float] = None,
+                      limit: int = DEFAULT_SEARCH_LIMIT, context: int = DEFAULT_CONTEXT_LINES) -> Dict:
+        """
+        Search the captured output of all applications, newest matches first
+        
+        Uses the trigram index over the on-disk logs when output logging is
+        on; otherwise scans the in-memory buffers of running applications.
+        See OutputIndex.search for the arguments and result format.
+        
+        Raises:
+            re.error: If a regex query does not compile
+        """
+        if self.search_index is not None:
+            return self.search_index.search(query, regex, case_sensitive, app_ids, component,
+                                            since, until, limit, context)
+        
+        started = time.perf_counter()
+        pattern = re.compile(query if regex else re.escape(query), 0 if case_sensitive else re.IGNORECASE)
+        matches = []
+        for app_id, buffer in list(self.output_buffers.items()):
+            if app_ids is not None and app_id not in app_ids:
+                continue
+            text, start, _ = buffer.read(0)
+            lines = text.split('\n')
+            for index in range(len(lines) - 1, -1, -1):
+                if len(matches) >= limit:
+                    break
+                prefix = COMPONENT_PREFIX.match(lines[index])
+                if component is not None and (prefix is None or prefix.group(1) != component):
+                    continue
+                if pattern.search(lines[index]):
+                    matches.append({
+                        'app_id': app_id,
+                        'component': prefix.group(1) if prefix else None,
+                        'timestamp': None,
+                        'offset': None,
+                        'line': lines[index],
+                        'before': lines[max(0, index - context):index],
+                        'after': lines[index + 1:index + 1 + context]
+                    })
+        return {
+            'matches': matches,
+            'stats': {
+                'indexed': False,
+                'buffers': len(self.output_buffers),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+            }
+        }
+    
+    def read_log(self, app_id: str, component: Optional[str] = None, **range_args) -> Optional[Dict]:
+        """
+        Read persisted output of an application straight from disk
+        
+        Works for running, stopped and crashed applications alike.
+        
+        Args:
+            app_id: Unique identifier for the application
+            component: Component name, or None for the combined app output
+            **range_args: start/end byte offsets, since/until Unix times and limit
+                (see OutputLog.read)
+            
+        Returns:
+            Optional[Dict]: Bytes and offsets of the range, or None when
+            output logging is disabled
+        """
+        if not self.log_dir:
+            return None
+        return self._open_log(app_id, component).read(**range_args)
+    
+    def get_log_segments(self, app_id: str, component: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Index of an application's persisted output segments
+        
+        Args:
+            app_id: Unique identifier for the application
+            component: Component name, or None for the combined app output
+            
+        Returns:
+            Optional[List[Dict]]: Segment files with byte ranges and timestamps
+            (marks omitted), or None when output logging is disabled
+        """
+        if not self.log_dir:
+            return None
+        return [
+            {key: value for key, value in entry.items() if key != 'marks'}
+            for entry in self._open_log(app_id, component).segments()
+        ]
+    
+    def _start_output_pump(self, name: str, process: subprocess.Popen, handler: Callable[[str], None]):
+        """Have the engine drain a process's stdout into the given handler"""
+        return self.engine.pump_output(process.stdout, handler, name)
+    
+    def _make_output_handler(self, app_id: str, component_name: Optional[str] = None,
+                             app_buffer: Optional[OutputBuffer] = None,
+                             component_buffer: Optional[OutputBuffer] = None) -> Callable[[str], None]:
+        """
+        Build the callback an output pump feeds decoded text into
+        
+        Single-component output goes straight into the app buffer. Component
+        output is kept raw in its own buffer and mirrored into the app buffer
+        one complete line at a time, prefixed with the component name, so
+        interleaved components stay readable.
+        """
+        if component_name is None:
+            def handle(text: str):
+                buffer = app_buffer or self.output_buffers.get(app_id)
+                if buffer is not None:
+                    buffer.append(text)
+            return handle
+        
+        pending = ['']
+        
+        def handle_component(text: str):
+            component_buffer.append(text)
+            lines = (pending[0] + text).split('\n')
+            pending[0] = lines.pop()
+            if lines:
+                app_buffer.append(''.join(f"[{component_name}] {line}\n" for line in lines))
+        return handle_component
+    
     def stop_application(self, app_id: str) -> bool:
         """
         Stop a running application
@@ -188,49 +762,20 @@ class ProcessManager:
             bool: True if stop successful, False otherwise
         """
         try:
-            if app_id not in self.running_processes:
+            if not self._transition(app_id, ACTIVE_STATES, STOPPING):
                 logger.warning(f"Application {app_id} is not running")
                 return False
             
-            process_info = self.process_info.get(app_id, {})
-            
-            # Check if it's a multi-component application
-            if app_id in self.component_processes:
-                # Stop all components
-                for component_name, process in self.component_processes[app_id].items():
-                    try:
-                        process.terminate()
-                        try:
-                            process.wait(timeout=5)
-                        except subprocess.TimeoutExpired:
-                            process.kill()
-                            process.wait()
-                        logger.info(f"Stopped component {component_name} of application {app_id}")
-                    except Exception as e:
-                        logger.error(f"Error stopping component {component_name}: {e}")
-                
-                # Clean up component processes
-                del self.component_processes[app_id]
-            else:
-                # Single component application
-                process = self.running_processes[app_id]
-                
-                # Terminate the process
-                process.terminate()
+            try:
+                killed = terminate_trees(self._app_processes(app_id), STOP_GRACE_PERIOD)
+                if killed:
+                    logger.warning(f"Force killed {len(killed)} process group(s) of application {app_id}")
                 
-                # Wait for process to terminate (with timeout)
-                try:
-                    process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    # Force kill if it doesn't terminate gracefully
-                    process.kill()
-                    process.wait()
-            
-            # Clean up
-            del self.running_processes[app_id]
-            del self.process_info[app_id]
-            if app_id in self.output_buffers:
-                del self.output_buffers[app_id]
+                # Clean up
+                self._record_exit(app_id, 'stopped')
+                self._forget(app_id)
+            finally:
+                self._transition(app_id, (STOPPING,), STOPPED)
             
             logger.info(f"Successfully stopped application {app_id}")
             return True
@@ -239,46 +784,638 @@ class ProcessManager:
             logger.error(f"Error stopping application {app_id}: {e}")
             return False
     
+    def _app_processes(self, app_id: str) -> List[subprocess.Popen]:
+        """Every tracked process (group leader) of an application"""
+        with self._app_lock(app_id):
+            if app_id in self.component_processes:
+                return list(self.component_processes[app_id].values())
+            process = self.running_processes.get(app_id)
+            return [process] if process else []
+    
     def is_running(self, app_id: str) -> bool:
         """
         Check if an application is currently running
         
+        Exits are picked up by the engine as they happen, so this is a plain
+        lookup rather than a poll of the child. An application waiting out a
+        restart backoff still counts as running.
+        
         Args:
             app_id: Unique identifier for the application
             
         Returns:
             bool: True if running, False otherwise
         """
-        if app_id not in self.running_processes:
+        return self.app_states.get(app_id) in ACTIVE_STATES
+    
+    def get_app_state(self, app_id: str) -> str:
+        """
+        Get an application's lifecycle state
+        
+        Args:
+            app_id: Unique identifier for the application
+            
+        Returns:
+            str: One of starting, running, restarting, stopping, stopped,
+            crashed or crash-loop
+        """
+        return self.app_states.get(app_id, STOPPED)
+    
+    def get_app_states(self) -> Dict[str, str]:
+        """
+        Get the lifecycle state of every application launched since startup
+        
+        Returns:
+            Dict[str, str]: app_id -> state
+        """
+        return dict(self.app_states)
+    
+    def flag_restart(self, app_id: str, reason: str) -> bool:
+        """
+        Mark a running application as needing a restart to pick up new config
+        
+        The application keeps running; the flag clears on its next launch.
+        
+        Args:
+            app_id: Unique identifier for the application
+            reason: Why a restart is needed (e.g. 'changed' or 'removed')
+            
+        Returns:
+            bool: True if the application is active and was flagged
+        """
+        if self.app_states.get(app_id) not in (STARTING, RUNNING, RESTARTING):
             return False
+        self.restart_pending[app_id] = reason
+        self.notify_status_change()
+        logger.info(f"Application {app_id} needs a restart to apply its {reason} configuration")
+        return True
+    
+    def _app_lock(self, app_id: str) -> threading.RLock:
+        """Lock guarding one application's state and tracking entries"""
+        lock = self._app_locks.get(app_id)
+        if lock is None:
+            with self._app_locks_guard:
+                lock = self._app_locks.setdefault(app_id, threading.RLock())
+        return lock
+    
+    def _set_state(self, app_id: str, state: str):
+        """Change an application's lifecycle state (caller holds the app lock)"""
+        self.app_states[app_id] = state
+        self._schedule_state_save(app_id)
+        self.notify_status_change()
+    
+    def _named_processes(self, app_id: str) -> Dict[Optional[str], subprocess.Popen]:
+        """Tracked processes of an application by component name (None for a single-process app)"""
+        if app_id in self.component_processes:
+            return dict(self.component_processes[app_id])
+        process = self.running_processes.get(app_id)
+        return {None: process} if process is not None else {}
+    
+    def save_state(self):
+        """
+        Write the live spooled processes of every active application to the state file now
+        
+        Used on the way out and after adoption; state transitions and spool
+        checkpoints go through _schedule_state_save instead.
+        """
+        if self.state_file is None:
+            return
+        self._save_records(set(self.app_states) | set(self._state_records))
+    
+    def _schedule_state_save(self, app_id: str):
+        """
+        Have the state writer refresh one application's record shortly
+        
+        Called on every state transition and whenever a spool tail has
+        consumed another CHECKPOINT_BYTES of output. Only marks the record
+        stale, so callers holding an app lock never wait on the file; the
+        writer thread coalesces everything within STATE_SAVE_DELAY into a
+        single write.
+        """
+        if self.state_file is None:
+            return
+        with self._state_stale_changed:
+            self._state_stale.add(app_id)
+            if self._state_writer is None:
+                self._state_writer = threading.Thread(target=self._write_state, name="state-writer", daemon=True)
+                self._state_writer.start()
+            self._state_stale_changed.notify()
+    
+    def _write_state(self):
+        """State writer thread: save stale records in batches"""
+        while True:
+            with self._state_stale_changed:
+                while not self._state_stale:
+                    self._state_stale_changed.wait()
+            time.sleep(STATE_SAVE_DELAY)
+            with self._state_stale_changed:
+                stale, self._state_stale = self._state_stale, set()
+            try:
+                self._save_records(stale)
+            except Exception as e:
+                logger.error(f"Error saving process state: {e}")
+    
+    def _save_records(self, app_ids: set):
+        """
+        Rebuild the records of some applications and write the state file
+        
+        Once the offsets are on disk the spool space before them is released.
+        """
+        with self._state_lock:
+            tails = []
+            for app_id in app_ids:
+                record = self._state_record(app_id, tails)
+                if record is None:
+                    self._state_records.pop(app_id, None)
+                else:
+                    self._state_records[app_id] = record
+            try:
+                self.state_file.save(self._state_records)
+            except (OSError, TypeError, ValueError) as e:
+                logger.error(f"Error saving process state: {e}")
+                return
+            for tail, offset in tails:
+                tail.release(offset)
+    
+    def _state_record(self, app_id: str, tails: List) -> Optional[Dict]:
+        """State file record of one application, or None if it has no live spooled process"""
+        if self.app_states.get(app_id) not in ACTIVE_STATES:
+            return None
+        previous = (self._state_records.get(app_id) or {}).get('processes', {})
+        processes = {}
+        for name, process in self._named_processes(app_id).items():
+            spool_dir = getattr(process, 'spool_dir', None)
+            if spool_dir is None or process.returncode is not None:
+                continue
+            entry = previous.get(name or '')
+            if entry is not None and entry['pid'] == process.pid and entry['spool'] == spool_dir:
+                # Same process as last time: only the offset moves, no need to ask psutil again
+                record = dict(entry, offset=process.stdout.offset)
+            else:
+                record = process_record(process, spool_dir, process.stdout.offset)
+            if record is not None:
+                processes[name or ''] = record
+                tails.append((process.stdout, record['offset']))
+        if not processes:
+            return None
+        readiness = self.readiness.get(app_id)
+        info = self.process_info.get(app_id, {})
+        return {
+            'config': self.app_configs.get(app_id, {}),
+            'name': info.get('name', app_id),
+            'command': info.get('command'),
+            'working_dir': info.get('working_dir'),
+            'launched_at': readiness.launched_at if readiness else None,
+            'processes': processes
+        }
+    
+    def adopt_processes(self) -> List[str]:
+        """
+        Take over the children a previous portal process left running
         
-        process = self.running_processes[app_id]
+        Each recorded process is matched by PID and create_time, so a reused
+        PID is never adopted. Applications get their output pumps, buffers,
+        restart policies and exit watching back, and output continues from
+        the last saved spool offset (after a portal crash, output since the
+        last checkpoint may be shown twice). Processes that exited while no
+        portal was attached are handled as if they had just exited, with
+        the exit code their shell recorded.
         
-        # Check if process is still alive
-        if process.poll() is None:
+        Returns:
+            List[str]: IDs of the applications that were adopted
+        """
+        if self.state_file is None:
+            return []
+        adopted = []
+        for app_id, record in self.state_file.load().items():
+            try:
+                if self._adopt(app_id, record):
+                    adopted.append(app_id)
+            except Exception as e:
+                logger.error(f"Error adopting application {app_id}: {e}")
+        self.save_state()
+        if adopted:
+            logger.info(f"Adopted {len(adopted)} running application(s): {', '.join(adopted)}")
+        return adopted
+    
+    def _adopt(self, app_id: str, record: Dict) -> bool:
+        """Re-attach to one application's recorded processes"""
+        app_config = record.get('config') or {}
+        processes = {
+            name or None: (AdoptedProcess.from_record(entry), entry)
+            for name, entry in record.get('processes', {}).items()
+        }
+        if not processes:
+            return False
+        for component_name, (process, _) in processes.items():
+            if process.returncode is not None:
+                # Handed to the engine below like any other exit, so restart policies apply
+                logger.info(f"{component_name or app_id} of application {app_id} exited with code "
+                            f"{process.returncode} while the portal was down")
+        
+        with self._app_lock(app_id):
+            if self.app_states.get(app_id, STOPPED) not in (STOPPED, CRASHED, CRASH_LOOP):
+                return False
+            self._set_restart_policies(app_id, app_config)
+            readiness = AppReadiness()
+            readiness.launched_at = record.get('launched_at') or readiness.launched_at
+            multi = bool(app_config.get('components'))
+            app_buffer = self._new_buffer(app_id)
+            component_buffers = {}
+            pumps = []
+            for component_name, (process, entry) in processes.items():
+                cgroup = cgroup_of(process.pid) if self.cgroups is not None else None
+                if cgroup is not None and self.cgroups.owns(cgroup):
+                    self.process_cgroups[(app_id, component_name)] = cgroup
+                attach_spool(process, entry['spool'], int(entry.get('offset', 0)),
+                             lambda process=process: exited(process),
+                             lambda app_id=app_id: self._schedule_state_save(app_id))
+                readiness.finish(component_name or app_id, process.returncode is None)
+                if multi:
+                    component_buffers[component_name] = self._new_buffer(app_id, component_name)
+                    handler = self._make_output_handler(app_id, component_name, app_buffer,
+                                                        component_buffers[component_name])
+                else:
+                    handler = self._make_output_handler(app_id, None, app_buffer)
+                pumps.append(self._start_output_pump(f"{app_id}-{component_name or 'main'}", process, handler))
+            
+            main_process = next(iter(processes.values()))[0]
+            self.running_processes[app_id] = main_process
+            if multi:
+                self.component_processes[app_id] = {name: process for name, (process, _) in processes.items()}
+            self.process_info[app_id] = {
+                'pid': main_process.pid,
+                'command': record.get('command'),
+                'working_dir': record.get('working_dir'),
+                'name': record.get('name', app_id),
+                'type': 'multi' if multi else 'single',
+                'pty': False,
+                'adopted': True
+            }
+            if multi:
+                self.process_info[app_id]['components'] = {name: process.pid for name, (process, _) in processes.items()}
+            self.output_buffers[app_id] = app_buffer
+            self.component_buffers[app_id] = component_buffers
+            self.output_pumps[app_id] = pumps
+            self.exit_status.pop(app_id, None)
+            self.readiness[app_id] = readiness
+            self._set_state(app_id, RUNNING)
+        for component_name, (process, _) in processes.items():
+            self.engine.watch((app_id, component_name), process)
+        self._supervisor_note(app_id, "adopted after a portal restart")
+        return True
+    
+    def notify_status_change(self):
+        """Bump the status generation and wake long-polling status requests"""
+        with self._status_changed:
+            self.status_generation += 1
+            self._status_changed.notify_all()
+    
+    def wait_for_status_change(self, generation: int, timeout: float) -> int:
+        """
+        Block until the status generation moves past a known value
+        
+        Args:
+            generation: Generation the caller has already seen
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            int: The current generation (unchanged if the wait timed out)
+        """
+        with self._status_changed:
+            self._status_changed.wait_for(lambda: self.status_generation != generation, timeout)
+            return self.status_generation
+    
+    def _transition(self, app_id: str, allowed_from: tuple, new_state: str) -> bool:
+        """Atomically move an application to a new state if it is in an allowed one"""
+        with self._app_lock(app_id):
+            if self.app_states.get(app_id, STOPPED) not in allowed_from:
+                return False
+            self._set_state(app_id, new_state)
             return True
+    
+    def _handle_exit(self, key, process: subprocess.Popen, return_code: int, exited_at: float):
+        """Engine exit callback: record a child's exit, restart it per policy or drop the app once nothing is left"""
+        app_id, component_name = key
+        with self._app_lock(app_id):
+            if component_name is None:
+                tracked = self.running_processes.get(app_id)
+            else:
+                tracked = self.component_processes.get(app_id, {}).get(component_name)
+            if tracked is not process:
+                # Already stopped, or replaced by a newer launch
+                return
+            if self.app_states.get(app_id) == STOPPING:
+                # stop_application records the exit itself
+                return
+            if self._pending_restarts.get(key) is process:
+                # Exit already handled and a restart is queued
+                return
+            
+            info = self.process_info.get(app_id, {})
+            info.setdefault('exits', {})[component_name or app_id] = {
+                'exit_code': return_code,
+                'exited_at': exited_at
+            }
+            logger.info(f"Application {app_id}{f' component {component_name}' if component_name else ''} "
+                        f"exited with code {return_code}")
+            if return_code:
+                self._stats(app_id)['crashes'] += 1
+            
+            if self._schedule_restart(app_id, component_name, process, return_code):
+                return
+            self._finish_if_idle(app_id)
+    
+    def _finish_if_idle(self, app_id: str):
+        """Drop an application whose processes are all gone and none is due a restart"""
+        with self._app_lock(app_id):
+            processes = self.component_processes.get(app_id) or {None: self.running_processes.get(app_id)}
+            if any(proc is not None and proc.returncode is None for proc in processes.values()):
+                return
+            if any(key[0] == app_id for key in self._pending_restarts):
+                return
+            
+            crash_loop = any(tracker.crash_loop for tracker in self.restart_trackers.get(app_id, {}).values())
+            self._record_exit(app_id, 'crash-loop' if crash_loop else 'exited')
+            self._forget(app_id)
+            if crash_loop:
+                self._set_state(app_id, CRASH_LOOP)
+            else:
+                self._set_state(app_id, STOPPED if not self.exit_status[app_id]['exit_code'] else CRASHED)
+    
+    def _set_restart_policies(self, app_id: str, app_config: Dict):
+        """Create restart trackers for a launch from its (and its components') restart settings"""
+        app_policy = RestartPolicy.from_config(app_config)
+        if app_config.get('components'):
+            policies = {
+                component.get('name', ''): RestartPolicy.from_config(component, app_policy)
+                for component in app_config['components']
+            }
         else:
-            # Process has terminated, clean up
-            if app_id in self.running_processes:
-                del self.running_processes[app_id]
-            if app_id in self.process_info:
-                del self.process_info[app_id]
-            if app_id in self.output_buffers:
-                del self.output_buffers[app_id]
+            policies = {app_id: app_policy}
+        with self._app_lock(app_id):
+            self.app_configs[app_id] = app_config
+            self.restart_trackers[app_id] = {
+                name: RestartTracker(policy) for name, policy in policies.items() if policy is not None
+            }
+    
+    def _schedule_restart(self, app_id: str, component_name: Optional[str],
+                          process: subprocess.Popen, return_code: Optional[int]) -> bool:
+        """
+        Queue a restart of an exited process if its policy asks for one
+        
+        Returns:
+            bool: True if a restart was queued, False if the process stays down
+            (no policy, a clean exit under on-failure, or a crash loop)
+        """
+        name = component_name or app_id
+        label = f"Component {component_name} of application {app_id}" if component_name else f"Application {app_id}"
+        with self._app_lock(app_id):
+            tracker = self.restart_trackers.get(app_id, {}).get(name)
+            if tracker is None or not tracker.policy.applies_to(return_code):
+                return False
+            
+            delay = tracker.next_delay()
+            if delay is None:
+                logger.error(f"{label} is crash-looping ({tracker.policy.max_restarts} restarts within "
+                             f"{tracker.policy.window}s), giving up")
+                self._supervisor_note(app_id, f"{name} is crash-looping, not restarting")
+                self.notify_status_change()
+                return False
+            
+            logger.warning(f"{label} exited with code {return_code}, restarting in {delay:.1f}s "
+                           f"(restart {tracker.restarts})")
+            self._supervisor_note(app_id, f"{name} exited with code {return_code}, restarting in {delay:.1f}s")
+            self._pending_restarts[(app_id, component_name)] = process
+            processes = self.component_processes.get(app_id) or {None: process}
+            if all(proc.returncode is not None for proc in processes.values()):
+                self._set_state(app_id, RESTARTING)
+            else:
+                # Restart counters are part of the status even while the app stays running
+                self.notify_status_change()
+        
+        with self._supervisor_wakeup:
+            self._restart_seq += 1
+            heapq.heappush(self._restart_queue,
+                           (time.monotonic() + delay, self._restart_seq, app_id, component_name, process))
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(target=self._supervise, name="restart-supervisor", daemon=True)
+                self._supervisor.start()
+            self._supervisor_wakeup.notify()
+        return True
+    
+    def _supervise(self):
+        """Supervisor loop: start queued restarts once their backoff has passed"""
+        while True:
+            with self._supervisor_wakeup:
+                while not self._restart_queue or self._restart_queue[0][0] > time.monotonic():
+                    timeout = self._restart_queue[0][0] - time.monotonic() if self._restart_queue else None
+                    self._supervisor_wakeup.wait(timeout)
+                _, _, app_id, component_name, process = heapq.heappop(self._restart_queue)
+            try:
+                self._restart_process(app_id, component_name, process)
+            except Exception as e:
+                logger.error(f"Error restarting {component_name or app_id} of application {app_id}: {e}")
+    
+    def _restart_process(self, app_id: str, component_name: Optional[str], old_process: subprocess.Popen):
+        """Respawn one exited process in place, keeping the app's buffers and its other components"""
+        key = (app_id, component_name)
+        with self._app_lock(app_id):
+            if self._pending_restarts.get(key) is not old_process:
+                # Stopped or relaunched while the restart was waiting
+                return
+            del self._pending_restarts[key]
+            if self.app_states.get(app_id) not in ACTIVE_STATES:
+                return
+            
+            app_config = self.app_configs.get(app_id, {})
+            if component_name is None:
+                config = app_config
+                working_dir = app_config.get('working_dir', '') or None
+            else:
+                config = next((component for component in app_config.get('components', [])
+                               if component.get('name', '') == component_name), {})
+                working_dir = config.get('working_dir', '') or app_config.get('working_dir', '') or None
+            
+            try:
+                process = self._spawn(config.get('command', ''), working_dir,
+                                      self._wants_pty(config, app_config), key, config, app_config)
+            except Exception as e:
+                logger.error(f"Failed to restart {component_name or app_id} of application {app_id}: {e}")
+                if not self._schedule_restart(app_id, component_name, old_process, None):
+                    self._finish_if_idle(app_id)
+                return
+            
+            app_buffer = self.output_buffers.get(app_id)
+            info = self.process_info.setdefault(app_id, {})
+            if component_name is None:
+                handler = self._make_output_handler(app_id)
+                buffer = app_buffer
+                self.running_processes[app_id] = process
+                info['pid'] = process.pid
+            else:
+                buffer = self.component_buffers.get(app_id, {}).get(component_name)
+                handler = self._make_output_handler(app_id, component_name, app_buffer, buffer)
+                self.component_processes.setdefault(app_id, {})[component_name] = process
+                info.setdefault('components', {})[component_name] = process.pid
+                if self.running_processes.get(app_id) is old_process:
+                    self.running_processes[app_id] = process
+                    info['pid'] = process.pid
+            self.output_pumps.setdefault(app_id, []).append(
+                self._start_output_pump(f"{app_id}-{component_name or 'main'}", process, handler)
+            )
+            tracker = self.restart_trackers.get(app_id, {}).get(component_name or app_id)
+            if tracker is not None:
+                tracker.next_restart_at = None
+            self._stats(app_id)['restarts'] += 1
+            self._set_state(app_id, RUNNING)
+            self._supervisor_note(app_id, f"{component_name or app_id} restarted with PID {process.pid}")
+        self.engine.watch(key, process)
+        logger.info(f"Restarted {component_name or app_id} of application {app_id} with PID {process.pid}")
+        
+        probe = ReadinessProbe.from_config(config)
+        readiness = self.readiness.get(app_id)
+        if probe is not None and readiness is not None:
+            readiness.begin(component_name or app_id, probe)
+            self._probe_in_background(app_id, component_name or app_id, process, probe, buffer, readiness)
+    
+    def _supervisor_note(self, app_id: str, message: str):
+        """Write a supervisor message into the app's output so viewers see restarts"""
+        buffer = self.output_buffers.get(app_id)
+        if buffer is not None:
+            buffer.append(f"[supervisor] {message}\n")
+    
+    def get_restart_status(self, app_id: str) -> Dict[str, Dict]:
+        """
+        Restart policy state of an application's processes
+        
+        Args:
+            app_id: Unique identifier for the application
+            
+        Returns:
+            Dict[str, Dict]: Component name (or app_id) -> restarts, crash-loop
+            flag and next scheduled restart; empty when no policy applies
+        """
+        return {name: tracker.to_dict() for name, tracker in list(self.restart_trackers.get(app_id, {}).items())}
+    
+    def _record_exit(self, app_id: str, reason: str):
+        """Remember how an application ended before its tracking is dropped"""
+        with self._app_lock(app_id):
+            info = self.process_info.get(app_id, {})
+            exits = dict(info.get('exits', {}))
+            processes = self.component_processes.get(app_id) or {app_id: self.running_processes.get(app_id)}
+            for name, proc in processes.items():
+                if name not in exits and proc is not None:
+                    exits[name] = {'exit_code': proc.returncode, 'exited_at': time.time()}
+            
+            codes = [entry['exit_code'] for entry in exits.values()]
+            self.exit_status[app_id] = {
+                'reason': reason,
+                'exit_code': next((code for code in codes if code), codes[0] if codes else None),
+                'exited_at': max((entry['exited_at'] for entry in exits.values()), default=time.time()),
+                'components': exits if app_id in self.component_processes else {}
+            }
+    
+    def wait_until_ready(self, app_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for every readiness probe of a running application to finish
+        
+        Args:
+            app_id: Unique identifier for the application
+            timeout: Maximum seconds to wait (None for no limit)
+            
+        Returns:
+            bool: True if the application is running and every component is ready
+        """
+        readiness = self.readiness.get(app_id)
+        if readiness is None or not self.is_running(app_id):
             return False
+        return readiness.wait(timeout) and self.is_running(app_id)
+    
+    def get_readiness(self, app_id: str) -> Optional[Dict]:
+        """
+        Get readiness and cold-start latency of an application's latest launch
+        
+        Args:
+            app_id: Unique identifier for the application
+            
+        Returns:
+            Optional[Dict]: Overall state, time to ready in seconds and per-component
+            results, or None if the application has not been launched
+        """
+        readiness = self.readiness.get(app_id)
+        return readiness.to_dict() if readiness else None
+    
+    def get_exit_status(self, app_id: str) -> Optional[Dict]:
+        """
+        Get how an application last stopped
+        
+        Args:
+            app_id: Unique identifier for the application
+            
+        Returns:
+            Optional[Dict]: Reason ('exited' or 'stopped'), exit code, exit time
+            and per-component exits, or None if it has not stopped since launch
+        """
+        return self.exit_status.get(app_id)
+    
+    def _forget(self, app_id: str):
+        """Drop all tracking state for an application"""
+        with self._app_lock(app_id):
+            self.running_processes.pop(app_id, None)
+            self.process_info.pop(app_id, None)
+            self.component_processes.pop(app_id, None)
+            buffer = self.output_buffers.pop(app_id, None)
+            component_buffers = self.component_buffers.pop(app_id, {})
+            pumps = self.output_pumps.pop(app_id, None) or []
+            writers = self.input_writers.pop(app_id, {})
+            
+            for key in [key for key in self._pending_restarts if key[0] == app_id]:
+                del self._pending_restarts[key]
+            for key in [key for key in self.terminal_sizes if key[0] == app_id]:
+                del self.terminal_sizes[key]
+            
+            # Carry this run's output counters over so metrics stay monotonic
+            stats = self._stats(app_id)
+            stats['output_bytes'] += sum(pump.bytes_read for pump in pumps)
+            stats['dropped_output'] += buffer.dropped if buffer is not None else 0
+            stats['input_rejected'] += sum(writer.rejected for writer in writers.values())
+        
+        for writer in writers.values():
+            writer.close()
+        self._release_launch(app_id)
+        # Wake any streaming readers so they can notice the app is gone
+        for closing in [buffer, *component_buffers.values()]:
+            if closing is not None:
+                closing.close()
+    
+    def _release_launch(self, app_id: str):
+        """
+        Remove what spawning an application's processes left outside the tracking dicts
+        
+        Shared by _forget and failed launches, whose processes never made it
+        into tracking: cgroups, spool files and telemetry.
+        """
+        with self._app_lock(app_id):
+            for key in [key for key in self.process_cgroups if key[0] == app_id]:
+                del self.process_cgroups[key]
+            if self.cgroups is not None:
+                self.cgroups.remove(app_id)
+            self.telemetry.forget(app_id)
+        if self.state_dir:
+            # Pumps still draining keep their open spool files; nothing else needs them
+            shutil.rmtree(os.path.join(self.state_dir, 'spool', app_id), ignore_errors=True)
     
     def get_running_processes(self) -> List[str]:
         """
         Get list of currently running application IDs
         
+        Agrees with is_running: applications waiting out a restart backoff are included.
+        
         Returns:
             List[str]: List of running application IDs
         """
-        running = []
-        for app_id in list(self.running_processes.keys()):
-            if self.is_running(app_id):
-                running.append(app_id)
-        return running
+        return [app_id for app_id, state in list(self.app_states.items()) if state in ACTIVE_STATES]
     
     def get_process_info(self, app_id: str) -> Optional[Dict]:
         """
@@ -299,14 +1436,20 @@ class ProcessManager:
         try:
             process = self.running_processes[app_id]
             info['status'] = 'running'
-            info['return_code'] = process.poll()
+            info['return_code'] = process.returncode
+            info['readiness'] = self.get_readiness(app_id)
+            info['restarts'] = self.get_restart_status(app_id)
+            info['input'] = self.get_input_status(app_id)
+            info['resources'] = self.get_resource_status(app_id)
             
-            # Try to get system information about the process
+            # Resource usage of the whole tree comes from the sampler's cached handles
+            sample = self.telemetry.get_current(app_id)
+            if sample is not None:
+                info['memory_info'] = {'rss': sample['rss']}
+                info['cpu_percent'] = sample['cpu_percent']
+                info['telemetry'] = sample
             try:
-                ps_process = psutil.Process(process.pid)
-                info['memory_info'] = ps_process.memory_info()._asdict()
-                info['cpu_percent'] = ps_process.cpu_percent()
-                info['create_time'] = ps_process.create_time()
+                info['create_time'] = psutil.Process(process.pid).create_time()
             except psutil.NoSuchProcess:
                 pass
             
@@ -316,49 +1459,274 @@ class ProcessManager:
         
         return info
     
+    def _stats(self, app_id: str) -> Dict:
+        """Per-application counters, created on first use"""
+        stats = self.app_stats.get(app_id)
+        if stats is None:
+            stats = self.app_stats.setdefault(app_id, {
+                'launches': 0,
+                'restarts': 0,
+                'launch_failures': 0,
+                'crashes': 0,
+                'launch_seconds': None,
+                'output_bytes': 0,
+                'dropped_output': 0,
+                'input_rejected': 0
+            })
+        return stats
+    
+    def get_app_metrics(self) -> Dict[str, Dict]:
+        """
+        Cached counters and gauges for every application that has been launched
+        
+        Nothing here touches psutil or the filesystem, so it is cheap enough
+        to call on every metrics scrape.
+        
+        Returns:
+            Dict[str, Dict]: app_id -> state, counters, latencies and the
+            latest telemetry sample (None when not running)
+        """
+        metrics = {}
+        for app_id, stats in list(self.app_stats.items()):
+            entry = dict(stats)
+            pumps = self.output_pumps.get(app_id) or []
+            buffer = self.output_buffers.get(app_id)
+            entry['output_bytes'] += sum(pump.bytes_read for pump in pumps)
+            entry['dropped_output'] += buffer.dropped if buffer is not None else 0
+            writers = list(self.input_writers.get(app_id, {}).values())
+            entry['input_rejected'] += sum(writer.rejected for writer in writers)
+            entry['input_pending'] = sum(writer.pending for writer in writers)
+            entry['state'] = self.get_app_state(app_id)
+            readiness = self.get_readiness(app_id)
+            entry['time_to_ready'] = readiness['time_to_ready'] if readiness else None
+            entry['telemetry'] = self.telemetry.get_current(app_id)
+            metrics[app_id] = entry
+        return metrics
+    
+    def get_process_roots(self) -> Dict[str, Dict[str, int]]:
+        """
+        Group leader PIDs of every live application, for telemetry
+        
+        Returns:
+            Dict[str, Dict[str, int]]: app_id -> {component name (or 'main'): pid}
+        """
+        roots = {}
+        for app_id, main_process in list(self.running_processes.items()):
+            processes = self.component_processes.get(app_id) or {'main': main_process}
+            roots[app_id] = {
+                name: process.pid for name, process in list(processes.items())
+                if process.returncode is None
+            }
+        return roots
+    
+    def get_process_cgroups(self) -> Dict[str, Dict[str, str]]:
+        """
+        Cgroup directories of every process placed in one, for telemetry
+        
+        Returns:
+            Dict[str, Dict[str, str]]: app_id -> {component name (or 'main'): cgroup directory}
+        """
+        cgroups = {}
+        for (app_id, component_name), cgroup in list(self.process_cgroups.items()):
+            cgroups.setdefault(app_id, {})[component_name or 'main'] = cgroup
+        return cgroups
+    
+    def get_resource_status(self, app_id: str) -> Dict:
+        """
+        Configured resource limits of an application and how they are enforced
+        
+        Returns:
+            Dict: 'enforcement' ('cgroup' or 'rlimit'), the app's 'limits',
+            those of its 'components' and the 'cgroups' its processes run in
+        """
+        app_config = self.app_configs.get(app_id, {})
+        status = {
+            'enforcement': 'cgroup' if self.cgroups is not None else 'rlimit',
+            'limits': {},
+            'components': {},
+            'cgroups': self.get_process_cgroups().get(app_id, {})
+        }
+        try:
+            limits = ResourceLimits.from_config(app_config)
+            status['limits'] = limits.to_dict() if limits else {}
+            for component in app_config.get('components', []):
+                limits = ResourceLimits.from_config(component)
+                if limits:
+                    status['components'][component.get('name', '')] = limits.to_dict()
+        except ValueError as e:
+            status['error'] = str(e)
+        return status
+    
     def cleanup_dead_processes(self):
-        """Clean up any dead processes from tracking"""
-        dead_processes = []
-        for app_id in list(self.running_processes.keys()):
-            if not self.is_running(app_id):
-                dead_processes.append(app_id)
+        """Sweep for exits the engine has not reported yet (normally a no-op)"""
+        tracked = [
+            (app_id, name, proc)
+            for app_id, main_process in list(self.running_processes.items())
+            for name, proc in (self.component_processes.get(app_id) or {None: main_process}).items()
+        ]
         
-        for app_id in dead_processes:
-            logger.info(f"Cleaned up dead process: {app_id}")
+        for app_id, component_name, process in tracked:
+            # Leave processes a stop is holding unreaped to the stop
+            if not reaping_held(process.pid) and process.poll() is not None:
+                self._handle_exit((app_id, component_name), process, process.returncode, time.time())
+                logger.info(f"Cleaned up dead process: {app_id}")
+    
+    def launch_applications(self, applications: List[Mapping], max_parallel: Optional[int] = None,
+                            progress: Optional[Callable[[str, str], None]] = None) -> Dict:
+        """
+        Launch several applications, a bounded number at a time
+        
+        Up to max_parallel launches of this batch run at once, and every
+        launch also goes through the shared admission controller: it holds
+        a slot until its application is ready and waits while the host is
+        short of CPU or memory. Applications that are already active are
+        skipped.
+        
+        Args:
+            applications: Application configurations (each with an 'id')
+            max_parallel: Launches of this batch in flight at once (defaults
+                to the admission controller's limit)
+            progress: Optional callback receiving (app_id, state) as each
+                application moves through waiting/starting/ready/not-ready/failed/skipped
+            
+        Returns:
+            Dict: Aggregated outcome; per-app results under 'apps' and
+            counts per result under 'counts'
+        """
+        started = time.monotonic()
+        results: Dict[str, Dict] = {}
+        
+        def launch(app_config: Mapping):
+            app_id = app_config['id']
+            if self.get_app_state(app_id) not in (STOPPED, CRASHED, CRASH_LOOP):
+                results[app_id] = {'result': 'skipped', 'state': self.get_app_state(app_id)}
+                self._report(progress, app_id, 'skipped')
+                return
+            with self.admission.slot() as waited:
+                self._report(progress, app_id, 'starting')
+                if not self.launch_application(app_id, app_config):
+                    state = self.get_app_state(app_id)
+                    # Lost a race with another launch of the same app
+                    outcome = 'skipped' if state not in (STOPPED, CRASHED, CRASH_LOOP) else 'failed'
+                    results[app_id] = {'result': outcome, 'state': state, 'admission_wait': round(waited, 3)}
+                    self._report(progress, app_id, outcome)
+                    return
+                budget = float(app_config.get('ready_timeout', DEFAULT_READY_TIMEOUT))
+                ready = self.wait_until_ready(app_id, budget)
+            readiness = self.get_readiness(app_id) or {}
+            outcome = 'ready' if ready else 'not-ready'
+            results[app_id] = {
+                'result': outcome,
+                'state': self.get_app_state(app_id),
+                'admission_wait': round(waited, 3),
+                'time_to_ready': readiness.get('time_to_ready')
+            }
+            self._report(progress, app_id, outcome)
+        
+        for app_config in applications:
+            self._report(progress, app_config['id'], 'waiting')
+        parallel = max(1, min(max_parallel or self.admission.max_concurrent, len(applications) or 1))
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="bulk-launch") as executor:
+            for future in [executor.submit(launch, app_config) for app_config in applications]:
+                future.result()
+        
+        summary = self._bulk_summary('launch', applications, results, started)
+        logger.info(f"Bulk launch of {len(applications)} application(s) finished in "
+                    f"{summary['elapsed_seconds']}s: {summary['counts']}")
+        return summary
+    
+    def stop_applications(self, app_ids: List[str],
+                          progress: Optional[Callable[[str, str], None]] = None) -> Dict:
+        """
+        Stop several applications in parallel under one shared grace period
+        
+        Stops are not throttled: they only free resources. Applications
+        that are not running are skipped.
+        
+        Args:
+            app_ids: Applications to stop
+            progress: Optional callback receiving (app_id, state) as each
+                application is stopped or skipped
+            
+        Returns:
+            Dict: Aggregated outcome in the same form as launch_applications
+        """
+        started = time.monotonic()
+        results: Dict[str, Dict] = {}
+        stopping = []
+        for app_id in app_ids:
+            if self._transition(app_id, ACTIVE_STATES, STOPPING):
+                stopping.append(app_id)
+            else:
+                results[app_id] = {'result': 'skipped', 'state': self.get_app_state(app_id)}
+                self._report(progress, app_id, 'skipped')
+        
+        try:
+            owners = {id(process): app_id for app_id in stopping for process in self._app_processes(app_id)}
+            processes = [process for app_id in stopping for process in self._app_processes(app_id)]
+            killed = terminate_trees(processes, STOP_GRACE_PERIOD)
+            if killed:
+                logger.warning(f"Force killed {len(killed)} process group(s) while stopping {len(stopping)} application(s)")
+            forced = {owners.get(id(process)) for process in killed}
+            for app_id in stopping:
+                self._record_exit(app_id, 'stopped')
+                self._forget(app_id)
+                results[app_id] = {'result': 'stopped', 'forced': app_id in forced}
+        finally:
+            for app_id in stopping:
+                self._transition(app_id, (STOPPING,), STOPPED)
+                self._report(progress, app_id, 'stopped')
+        
+        return self._bulk_summary('stop', [{'id': app_id} for app_id in app_ids], results, started)
+    
+    def _bulk_summary(self, action: str, applications: List[Mapping], results: Dict[str, Dict],
+                      started: float) -> Dict:
+        """Aggregated result of a bulk operation, apps in request order"""
+        apps = {app_config['id']: results.get(app_config['id'], {'result': 'failed'})
+                for app_config in applications}
+        counts: Dict[str, int] = {}
+        for entry in apps.values():
+            counts[entry['result']] = counts.get(entry['result'], 0) + 1
+        return {
+            'action': action,
+            'success': not any(entry['result'] in ('failed', 'not-ready') for entry in apps.values()),
+            'requested': len(apps),
+            'counts': counts,
+            'elapsed_seconds': round(time.monotonic() - started, 3),
+            'apps': apps
+        }
     
     def stop_all_applications(self):
-        """Stop all running applications"""
-        for app_id in list(self.running_processes.keys()):
-            self.stop_application(app_id)
+        """Stop all running applications in parallel under one shared grace period"""
+        self.stop_applications(list(self.app_states))
+        logger.info("All applications stopped")
     
-    def send_input(self, app_id: str, user_input: str) -> bool:
+    def send_input(self, app_id: str, user_input: str, component: Optional[str] = None) -> bool:
         """
-        Send input to a running application
+        Send a line of input to a running application
+        
+        The line is queued for the process's input writer, so this
+        never blocks, even when the child has stopped reading.
         
         Args:
             app_id: Unique identifier for the application
-            user_input: Input text to send
+            user_input: Input text to send (a newline is appended)
+            component: Component to send to, or None for the main process
             
         Returns:
-            bool: True if input sent successfully, False otherwise
+            bool: True if the input was queued, False if the application is
+            not running or its input queue is full
         """
         try:
-            if app_id not in self.running_processes:
+            writer = self._input_writer(app_id, component)
+            if writer is None:
                 logger.warning(f"Application {app_id} is not running")
                 return False
             
-            process = self.running_processes[app_id]
-            
-            # Check if process is still alive
-            if process.poll() is not None:
-                logger.warning(f"Application {app_id} process has terminated")
-                self.cleanup_dead_processes()
+            if not writer.write((user_input + '\n').encode('utf-8')):
+                logger.debug(f"Input queue of {app_id} is full ({writer.pending} bytes pending)")
                 return False
             
-            # Send input to the process
-            process.stdin.write(user_input + '\n')
-            process.stdin.flush()
-            
             logger.debug(f"Sent input to {app_id}: {user_input}")
             return True
             
@@ -366,66 +1734,179 @@ class ProcessManager:
             logger.error(f"Error sending input to {app_id}: {e}")
             return False
     
-    def get_output(self, app_id: str) -> str:
+    def _terminal_process(self, app_id: str, component: Optional[str] = None) -> tuple:
         """
-        Get output from a running application
+        The live process input for an app or component goes to
+        
+        Returns:
+            tuple: (component name, process); the name is that of the main
+            component when a multi-component app is addressed as a whole, and
+            the process is None when nothing is running there
+        """
+        if component is None:
+            process = self.running_processes.get(app_id)
+            # The main process of a multi-component app is its first component
+            component = next((name for name, proc in self.component_processes.get(app_id, {}).items()
+                              if proc is process), None)
+        else:
+            process = self.component_processes.get(app_id, {}).get(component)
+        if process is None or process.returncode is not None or process.stdin is None:
+            return component, None
+        return component, process
+    
+    def _input_writer(self, app_id: str, component: Optional[str] = None):
+        """Input writer of a running process, started on first use"""
+        with self._app_lock(app_id):
+            component, process = self._terminal_process(app_id, component)
+            if process is None:
+                return None
+            writers = self.input_writers.setdefault(app_id, {})
+            writer = writers.get(component)
+            # A writer that stopped on its own keeps its place: the process's
+            # input is closed, and further writes are rejected until a restart
+            if writer is None or writer.stream is not process.stdin:
+                if writer is not None:
+                    # The process was restarted; its predecessor's writer is finished
+                    self._stats(app_id)['input_rejected'] += writer.rejected
+                    writer.close()
+                writer = self.engine.input_writer(process.stdin, f"{app_id}-{component or 'main'}",
+                                                  self.input_queue_size)
+                writers[component] = writer
+            return writer
+    
+    def get_input_status(self, app_id: str) -> Dict[str, Dict]:
+        """
+        Input queues of an application's processes
         
         Args:
             app_id: Unique identifier for the application
             
         Returns:
-            str: Output from the application
+            Dict[str, Dict]: Component name (app_id for a single-process app)
+            -> queue depth and counters; only processes that were sent input
         """
-        try:
-            if app_id not in self.running_processes:
-                return ""
+        return {
+            component or app_id: writer.to_dict()
+            for component, writer in list(self.input_writers.get(app_id, {}).items())
+        }
+    
+    def write_terminal(self, app_id: str, data: bytes, component: Optional[str] = None) -> bool:
+        """
+        Pass raw bytes (keystrokes, pastes, control characters) to a process's stdin
+        
+        Unlike send_input nothing is appended, so a PTY-backed child gets
+        exactly what was typed; its line discipline handles echo and editing.
+        Goes through the same bounded queue as send_input.
+        
+        Args:
+            app_id: Unique identifier for the application
+            data: Bytes to write
+            component: Component name, or None for the main process
             
-            process = self.running_processes[app_id]
+        Returns:
+            bool: True if the bytes were queued
+        """
+        writer = self._input_writer(app_id, component)
+        return writer is not None and writer.write(data)
+    
+    def resize_terminal(self, app_id: str, rows: int, cols: int, component: Optional[str] = None) -> bool:
+        """
+        Resize the PTY of a running process
+        
+        The size is remembered, so a restarted process starts at it.
+        
+        Args:
+            app_id: Unique identifier for the application
+            rows: Window height in character cells
+            cols: Window width in character cells
+            component: Component name, or None for the main process
             
-            # Check if process is still alive
-            if process.poll() is not None:
-                logger.warning(f"Application {app_id} process has terminated")
-                self.cleanup_dead_processes()
-                return ""
+        Returns:
+            bool: True if the process has a PTY and was resized
+        """
+        component, process = self._terminal_process(app_id, component)
+        if process is None or not is_pty(process.stdin):
+            return False
+        try:
+            set_window_size(process.stdin.fileno(), rows, cols)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Error resizing terminal of {app_id}: {e}")
+            return False
+        self.terminal_sizes[(app_id, component)] = (rows, cols)
+        return True
+    
+    def read_output(self, app_id: str, offset: int = 0,
+                    component: Optional[str] = None) -> Optional[Dict]:
+        """
+        Read buffered output from an offset without blocking
+        
+        Args:
+            app_id: Unique identifier for the application
+            offset: Offset returned by the previous read (0 for everything retained)
+            component: Component name to read instead of the combined app output
             
-            # Read available output (non-blocking)
-            new_output = ""
-            try:
-                import select
-                import os
-                
-                if hasattr(select, 'select'):
-                    # Unix-like systems
-                    ready, _, _ = select.select([process.stdout], [], [], 0.1)
-                    if ready:
-                        # Read available data
-                        data = os.read(process.stdout.fileno(), 1024)
-                        if data:
-                            new_output = data.decode('utf-8', errors='ignore')
-                else:
-                    # Fallback - try to read without blocking
-                    try:
-                        line = process.stdout.readline()
-                        if line:
-                            new_output = line
-                    except:
-                        pass
-                
-                # Add to buffer
-                if new_output:
-                    self.output_buffers[app_id] = self.output_buffers.get(app_id, "") + new_output
-                
-                # Return all accumulated output and clear buffer
-                output = self.output_buffers.get(app_id, "")
-                self.output_buffers[app_id] = ""
-                return output
-                    
-            except Exception as e:
-                logger.debug(f"Error reading output from {app_id}: {e}")
-                return ""
+        Returns:
+            Optional[Dict]: Output text with its start and next offsets, or None if
+            the application or component has no buffer. 'truncated' is set when
+            the requested offset was no longer (or not yet) in the buffer.
+        """
+        if component:
+            buffer = self.component_buffers.get(app_id, {}).get(component)
+        else:
+            buffer = self.output_buffers.get(app_id)
+        if buffer is None:
+            return None
+        
+        output, start, next_offset = buffer.read(offset)
+        return {
+            'output': output,
+            'offset': start,
+            'next_offset': next_offset,
+            'truncated': start != offset
+        }
+    
+    def wait_output(self, app_id: str, offset: int, timeout: float,
+                    component: Optional[str] = None) -> Optional[Dict]:
+        """
+        Wait for output past an offset, then read it
+        
+        Args:
+            app_id: Unique identifier for the application
+            offset: Offset the caller has already consumed up to
+            timeout: Maximum number of seconds to wait for new output
+            component: Component name to read instead of the combined app output
             
+        Returns:
+            Optional[Dict]: Same shape as read_output (with empty output on
+            timeout), or None if the application has no buffer
+        """
+        if component:
+            buffer = self.component_buffers.get(app_id, {}).get(component)
+        else:
+            buffer = self.output_buffers.get(app_id)
+        if buffer is None:
+            return None
+        
+        buffer.wait(offset, timeout)
+        return self.read_output(app_id, offset, component)
+    
+    def get_output(self, app_id: str, offset: int = 0) -> str:
+        """
+        Get output from a running application
+        
+        Reading does not consume anything, so any number of viewers can follow
+        the same application by each remembering their own offset.
+        
+        Args:
+            app_id: Unique identifier for the application
+            offset: Offset to read from (0 for everything retained)
+            
+        Returns:
+            str: Output from the application
+        """
+        try:
+            chunk = self.read_output(app_id, offset)
+            return chunk['output'] if chunk else ""
         except Exception as e:
             logger.error(f"Error getting output from {app_id}: {e}")
             return ""
-        
-        logger.info("All applications stopped")
@@ -0,0 +1,122 @@
+import logging
+import os
+import selectors
+import threading
+import time
+from typing import Callable, Hashable, List, Tuple
+
+from utils.process_tree import reap, reaping_held
+
+logger = logging.getLogger(__name__)
+
+# Callback signature: (key, process, return_code, exited_at)
+ExitCallback = Callable[[Hashable, object, int, float], None]
+
+
+class ProcessReaper:
+    """
+    Learns about child exits as they happen and reports them via a callback
+
+    On Linux every watched process gets a pidfd that becomes readable when
+    the process exits, and a single thread waits on all of them. Elsewhere
+    each process gets a small daemon thread blocked in wait(). Processes are
+    reaped through process_tree.reap(), so one whose group a stop is still
+    signalling is left a zombie until the stop is done with it.
+    """
+
+    def __init__(self, on_exit: ExitCallback):
+        self.on_exit = on_exit
+        self.use_pidfd = hasattr(os, 'pidfd_open')
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[Hashable, object]] = []
+        self._selector = None
+        self._wake_r = self._wake_w = None
+        self._thread = None
+
+    def watch(self, key: Hashable, process):
+        """
+        Start watching a process for exit
+
+        Args:
+            key: Identifier handed back to the exit callback
+            process: Popen-like object with pid, poll() and wait()
+        """
+        if self.use_pidfd:
+            with self._lock:
+                self._pending.append((key, process))
+                self._ensure_thread()
+            os.write(self._wake_w, b'\0')
+        else:
+            self._wait_in_thread(key, process)
+
+    def _wait_in_thread(self, key: Hashable, process):
+        """Wait for one process on a dedicated daemon thread"""
+        threading.Thread(
+            target=self._wait_blocking, args=(key, process),
+            name=f"reaper-{process.pid}", daemon=True
+        ).start()
+
+    def _ensure_thread(self):
+        """Lazily create the selector thread (caller holds the lock)"""
+        if self._thread is not None:
+            return
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._run, name="process-reaper", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Wait on every pidfd at once and dispatch exits"""
+        while True:
+            for selector_key, _ in self._selector.select():
+                if selector_key.data is None:
+                    try:
+                        os.read(self._wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    self._register_pending()
+                    continue
+
+                key, process = selector_key.data
+                self._selector.unregister(selector_key.fd)
+                os.close(selector_key.fd)
+                if reaping_held(process.pid):
+                    # A stop is still signalling its group; reap once it lets go
+                    self._wait_in_thread(key, process)
+                else:
+                    self._dispatch(key, process, reap(process))
+
+    def _register_pending(self):
+        """Open pidfds for processes queued by watch()"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for key, process in pending:
+            if process.returncode is not None:
+                # Reaped before we got to it; don't risk opening a reused PID
+                # (an unreaped zombie keeps its PID, and its pidfd is readable)
+                self._dispatch(key, process, process.returncode)
+                continue
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except ProcessLookupError:
+                # Already gone (and possibly reaped) before we could watch it
+                self._wait_in_thread(key, process)
+                continue
+            except OSError as e:
+                logger.warning(f"pidfd_open failed for PID {process.pid}, using a wait thread: {e}")
+                self._wait_in_thread(key, process)
+                continue
+            self._selector.register(pidfd, selectors.EVENT_READ, (key, process))
+
+    def _wait_blocking(self, key: Hashable, process):
+        """Fallback: block a dedicated thread until the process exits and may be reaped"""
+        self._dispatch(key, process, reap(process))
+
+    def _dispatch(self, key: Hashable, process, return_code: int):
+        """Invoke the exit callback, never letting it kill the reaper"""
+        try:
+            self.on_exit(key, process, return_code, time.time())
+        except Exception as e:
+            logger.error(f"Exit handler for {key} failed: {e}")
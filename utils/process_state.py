@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import subprocess
+import time
+from collections.abc import Mapping
+from typing import Dict, Optional
+
+import psutil
+
+from utils.spool import read_exit_status
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so no way to own a state directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'processes.json'
+LOCK_FILE = 'portal.lock'
+STATE_VERSION = 1
+
+# Whether a portal can own a state directory (and so persist and re-adopt children)
+STATE_SUPPORTED = fcntl is not None
+
+# Reported for a re-adopted process that died without recording its exit code
+# (e.g. killed by a signal while no portal was attached)
+UNKNOWN_EXIT_CODE = 255
+
+# create_time values of the same process agree to well within this (seconds)
+CREATE_TIME_TOLERANCE = 0.05
+
+# Poll interval while waiting for a process that is not our child
+ADOPTED_WAIT_INTERVAL = 0.05
+
+
+class StateFile:
+    """
+    Durable record of the processes a portal is running
+
+    Written atomically (temp file, fsync, rename) on every change, so a
+    portal that restarts or crashes can find and re-adopt its children.
+    Only one portal process may own a state directory; the others (e.g. a
+    second gunicorn worker) run without persistence.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, STATE_FILE)
+        self._lock_fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """
+        Take ownership of the state directory for the life of this process
+
+        Returns:
+            bool: False if another live portal process owns it, or if
+            this platform cannot lock it
+        """
+        if fcntl is None:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._lock_fd = fd
+        return True
+
+    def load(self) -> Dict[str, Dict]:
+        """
+        Records left by the previous owner
+
+        Returns:
+            Dict[str, Dict]: app_id -> record; empty if there is no usable file
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable process state file {self.path}: {e}")
+            return {}
+        if state.get('version') != STATE_VERSION:
+            logger.warning(f"Ignoring process state file with version {state.get('version')}")
+            return {}
+        return state.get('apps', {})
+
+    def save(self, apps: Dict[str, Dict]):
+        """Replace the file with the given records"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'version': STATE_VERSION, 'saved_at': time.time(), 'apps': apps}, f,
+                      default=lambda value: dict(value) if isinstance(value, Mapping) else str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+def process_record(process, spool_dir: str, offset: int) -> Optional[Dict]:
+    """
+    State file entry identifying one live spooled process
+
+    Returns:
+        Optional[Dict]: PID, process group, create time and spool position,
+        or None if the process is already gone
+    """
+    try:
+        create_time = psutil.Process(process.pid).create_time()
+        pgid = os.getpgid(process.pid)
+    except (psutil.NoSuchProcess, ProcessLookupError):
+        return None
+    return {
+        'pid': process.pid,
+        'pgid': pgid,
+        'create_time': create_time,
+        'spool': spool_dir,
+        'offset': offset
+    }
+
+
+class AdoptedProcess:
+    """
+    Popen-like handle on a child started by an earlier portal process
+
+    The process is no longer our child, so liveness comes from psutil, and
+    its identity is pinned by create_time so a reused PID is never mistaken
+    for it. The exit code is read from the status file the spool wrapper
+    writes.
+    """
+
+    def __init__(self, pid: int, create_time: float, spool_dir: str):
+        self.pid = pid
+        self.create_time = create_time
+        self.spool_dir = spool_dir
+        self.returncode: Optional[int] = None
+        self.args = None
+        self.stdin = None
+        self.stdout = None
+        self._process: Optional[psutil.Process] = None
+
+    @classmethod
+    def from_record(cls, record: Dict) -> 'AdoptedProcess':
+        """
+        Handle on the process a state record describes
+
+        If the PID is gone, or now belongs to a different process, the
+        handle comes back already exited.
+
+        Args:
+            record: Entry written by process_record()
+        """
+        adopted = cls(record['pid'], record['create_time'], record['spool'])
+        try:
+            process = psutil.Process(record['pid'])
+            if abs(process.create_time() - record['create_time']) <= CREATE_TIME_TOLERANCE:
+                adopted._process = process
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        adopted.poll()
+        return adopted
+
+    def poll(self) -> Optional[int]:
+        """Exit code once the process has exited, else None"""
+        if self.returncode is not None:
+            return self.returncode
+        try:
+            alive = (self._process is not None and self._process.is_running()
+                     and self._process.status() != psutil.STATUS_ZOMBIE)
+        except psutil.NoSuchProcess:
+            alive = False
+        if not alive:
+            status = read_exit_status(self.spool_dir)
+            self.returncode = UNKNOWN_EXIT_CODE if status is None else status
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for the process to exit
+
+        Raises:
+            subprocess.TimeoutExpired: If it is still running after timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(f"PID {self.pid}", timeout)
+            time.sleep(ADOPTED_WAIT_INTERVAL)
+        return self.returncode
@@ -0,0 +1,220 @@
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = os.name == 'nt'
+
+# How often a stop checks whether group leaders have exited (seconds)
+EXIT_POLL_INTERVAL = 0.02
+
+# Leaders a stop may still SIGKILL the group of, by PID -> number of holds.
+# An unreaped leader keeps its PID, and with it the group ID, from being reused.
+_reaping_holds: Dict[int, int] = {}
+_reaping_released = threading.Condition()
+
+
+def new_group_kwargs() -> Dict:
+    """
+    Popen keyword arguments that start a child in its own process group
+
+    On POSIX the child gets a new session (and so a group whose id is its
+    PID), which lets the whole shell -> npm -> node chain be signalled at
+    once. On Windows it gets a new process group.
+    """
+    if IS_WINDOWS:
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def collect_descendants(pids: Iterable[int]) -> List[psutil.Process]:
+    """
+    Snapshot every live descendant of the given processes
+
+    Descendants that moved to their own group or session would escape a group
+    signal, so stops signal this snapshot as well.
+    """
+    descendants = []
+    for pid in pids:
+        try:
+            descendants.extend(psutil.Process(pid).children(recursive=True))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return descendants
+
+
+def signal_group(pid: int, force: bool = False):
+    """Send SIGTERM (or SIGKILL with force) to the process group led by pid"""
+    if IS_WINDOWS:
+        try:
+            process = psutil.Process(pid)
+            process.kill() if force else process.terminate()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def signal_processes(processes: Iterable[psutil.Process], force: bool = False):
+    """Send terminate (or kill with force) to each process, ignoring ones already gone"""
+    for process in processes:
+        try:
+            process.kill() if force else process.terminate()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+
+
+def terminate_trees(leaders: List[subprocess.Popen], grace_period: float) -> List[subprocess.Popen]:
+    """
+    Stop several process trees in parallel under one shared deadline
+
+    Every group gets SIGTERM at once. Everything then shares a single grace
+    period, and whatever is still alive at the deadline (group leaders,
+    group members and escaped descendants alike) gets SIGKILL.
+
+    Group members can outlive their leader, so the SIGKILL goes to every
+    group that was running when the stop began and that killpg(pgid, 0)
+    still reports. Reaping of our own leaders is held off (see
+    hold_reaping) from before the SIGTERM until the SIGKILLs are out, so
+    they stay zombies and their group IDs cannot be reused in between.
+    Leaders an engine reaps on its own (the asyncio loop) are the
+    exception; their group ID stays reserved only while members are left,
+    which is the only case in which it is signalled again.
+
+    Args:
+        leaders: Processes started with new_group_kwargs()
+        grace_period: Seconds the whole set gets to exit cleanly
+
+    Returns:
+        List[subprocess.Popen]: Leaders that had to be killed
+    """
+    leaders = [process for process in leaders if process is not None]
+    running = [process for process in leaders if process.returncode is None]
+    with hold_reaping(process.pid for process in running):
+        descendants = collect_descendants(process.pid for process in leaders)
+
+        for process in running:
+            signal_group(process.pid)
+        signal_processes(descendants)
+
+        deadline = time.monotonic() + grace_period
+        for process in running:
+            _wait_exited(process, deadline)
+        _, lingering = psutil.wait_procs(descendants, timeout=max(0.0, deadline - time.monotonic()))
+
+        killed = [process for process in running if not exited(process)]
+        for process in running:
+            if group_alive(process.pid):
+                signal_group(process.pid, force=True)
+        signal_processes(lingering, force=True)
+
+    for process in leaders:
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Process {process.pid} survived SIGKILL")
+    return killed
+
+
+def group_alive(pid: int) -> bool:
+    """True while the process group led by pid has members (zombies included)"""
+    if IS_WINDOWS:
+        return psutil.pid_exists(pid)
+    try:
+        os.killpg(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+@contextmanager
+def hold_reaping(pids: Iterable[int]):
+    """
+    Keep reap() from reaping these processes for the duration of the block
+
+    Holds nest: a PID stays held until every block holding it has exited.
+    """
+    pids = list(pids)
+    with _reaping_released:
+        for pid in pids:
+            _reaping_holds[pid] = _reaping_holds.get(pid, 0) + 1
+    try:
+        yield
+    finally:
+        with _reaping_released:
+            for pid in pids:
+                remaining = _reaping_holds.pop(pid) - 1
+                if remaining:
+                    _reaping_holds[pid] = remaining
+            _reaping_released.notify_all()
+
+
+def reaping_held(pid: int) -> bool:
+    """True while a stop holds the process unreaped"""
+    with _reaping_released:
+        return pid in _reaping_holds
+
+
+def reap(process) -> int:
+    """
+    Wait for a process to exit and reap it, once no stop holds it
+
+    Reapers use this instead of wait(), so a process whose group is still
+    being stopped stays a zombie until terminate_trees is done with it.
+
+    Returns:
+        int: The exit code
+    """
+    if not isinstance(process, subprocess.Popen) or not hasattr(os, 'waitid'):
+        # Not our child, or nothing to hold off on this platform
+        return process.wait()
+    try:
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+    except ChildProcessError:
+        pass
+    with _reaping_released:
+        while process.pid in _reaping_holds:
+            _reaping_released.wait()
+        # Exited already, so this does not block; holding the lock keeps a
+        # new hold from starting half-way
+        return process.wait()
+
+
+def exited(process) -> bool:
+    """
+    True once a process has exited, without reaping it
+
+    Our own children are checked with waitid(WNOWAIT), which leaves them
+    zombies; anything else (adopted processes, children the asyncio loop
+    reaps, platforms without waitid) falls back to poll().
+    """
+    if process.returncode is not None:
+        return True
+    if isinstance(process, subprocess.Popen) and hasattr(os, 'waitid'):
+        try:
+            return os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+        except ChildProcessError:
+            pass
+    return process.poll() is not None
+
+
+def _wait_exited(process, deadline: float):
+    """Wait until a leader has exited or the deadline passes, without reaping it"""
+    while not exited(process):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(EXIT_POLL_INTERVAL, remaining))
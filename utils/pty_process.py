@@ -0,0 +1,98 @@
+import os
+import struct
+import subprocess
+import sys
+from typing import Callable, Optional
+
+IS_WINDOWS = os.name == 'nt'
+
+if not IS_WINDOWS:
+    import fcntl
+    import pty
+    import termios
+
+# Whether children can be attached to a pseudo-terminal on this platform
+PTY_SUPPORTED = not IS_WINDOWS
+
+# Window size a PTY starts with until a terminal client reports its own
+DEFAULT_ROWS = 24
+DEFAULT_COLS = 80
+
+# Exec'd in the child in place of the shell: makes the PTY on stdin the
+# controlling terminal of the new session, then becomes the shell. A
+# separate program rather than a preexec_fn, so the forked child runs no
+# Python before exec.
+CTTY_HELPER = (
+    "import fcntl, os, sys, termios\n"
+    "fcntl.ioctl(0, termios.TIOCSCTTY, 0)\n"
+    "os.execv('/bin/sh', ['/bin/sh', '-c', sys.argv[1]])\n"
+)
+
+
+def spawn_in_pty(command: str, working_dir: Optional[str], rows: int = DEFAULT_ROWS,
+                 cols: int = DEFAULT_COLS, popen: Callable = subprocess.Popen,
+                 **popen_kwargs) -> subprocess.Popen:
+    """
+    Start a shell command with a pseudo-terminal as its stdin, stdout and stderr
+
+    The child sees a real TTY, so interactive tools line-buffer their output,
+    draw prompts and colours, and Ctrl-C typed into the terminal reaches them
+    as SIGINT. The returned process has the master side of the PTY as its
+    stdout (for reading) and a duplicate as its stdin (for writing and
+    resizing), both unbuffered.
+
+    Args:
+        command: Shell command to run
+        working_dir: Directory to run it in, or None for the current one
+        rows: Initial window height
+        cols: Initial window width
+        popen: Popen or a look-alike that starts the child (see process_engine)
+        **popen_kwargs: Extra Popen arguments; must start a new session
+            (see process_tree.new_group_kwargs) so the PTY can become the
+            child's controlling terminal
+
+    Returns:
+        subprocess.Popen: The running child
+    """
+    master, slave = pty.openpty()
+    try:
+        set_window_size(slave, rows, cols)
+        env = dict(popen_kwargs.pop('env', None) or os.environ)
+        env.setdefault('TERM', 'xterm-256color')
+        process = popen(
+            [sys.executable, '-I', '-S', '-c', CTTY_HELPER, command],
+            cwd=working_dir,
+            stdin=slave,
+            stdout=slave,
+            stderr=slave,
+            bufsize=0,
+            env=env,
+            **popen_kwargs
+        )
+    except Exception:
+        os.close(master)
+        raise
+    finally:
+        os.close(slave)
+
+    process.stdout = os.fdopen(master, 'rb', buffering=0)
+    process.stdin = os.fdopen(os.dup(master), 'wb', buffering=0)
+    return process
+
+
+def is_pty(stream) -> bool:
+    """True if a child's stdin stream is the master side of a PTY"""
+    try:
+        return stream is not None and os.isatty(stream.fileno())
+    except (OSError, ValueError):
+        return False
+
+
+def set_window_size(fd: int, rows: int, cols: int):
+    """
+    Set the window size of a PTY
+
+    The kernel sends SIGWINCH to the terminal's foreground process group,
+    so full-screen programs redraw at the new size.
+    """
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
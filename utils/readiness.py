@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import re
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from utils.output_buffer import OutputBuffer
+
+logger = logging.getLogger(__name__)
+
+# Default seconds an application gets to become ready after launch
+DEFAULT_READY_TIMEOUT = 60.0
+
+# Backoff between probe attempts (seconds)
+DEFAULT_INITIAL_INTERVAL = 0.05
+DEFAULT_MAX_INTERVAL = 2.0
+
+# Readiness states
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+UNPROBED = 'unprobed'
+
+# How often an output probe on the asyncio engine re-reads its buffer (seconds)
+OUTPUT_POLL_INTERVAL = 0.02
+
+
+class ReadinessProbe:
+    """
+    Decides when a started process is actually able to serve
+
+    Supported types:
+        tcp:    connect to host:port (taken from 'url' when not given)
+        http:   GET the url; any response below 500 counts as ready
+        output: a regex 'pattern' appears in the process output
+    """
+
+    def __init__(self, kind: str, url: str = '', host: str = '', port: int = 0,
+                 pattern: str = '', timeout: float = DEFAULT_READY_TIMEOUT,
+                 initial_interval: float = DEFAULT_INITIAL_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL):
+        self.kind = kind
+        self.url = url
+        self.host = host
+        self.port = port
+        self.pattern = re.compile(pattern, re.MULTILINE) if pattern else None
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['ReadinessProbe']:
+        """
+        Build a probe from a component (or single-component app) configuration
+
+        An explicit 'readiness' block wins. Otherwise a configured 'url'
+        gets a TCP connect probe against its host and port. Without either
+        there is nothing to probe.
+
+        Args:
+            config: Component or application configuration dictionary
+
+        Returns:
+            Optional[ReadinessProbe]: Probe to run, or None for ready-on-spawn
+        """
+        settings = config.get('readiness')
+        if settings is None:
+            if not config.get('url'):
+                return None
+            settings = {'type': 'tcp'}
+        if isinstance(settings, str):
+            settings = {'type': settings}
+
+        kind = settings.get('type', 'tcp')
+        if kind == 'none':
+            return None
+        if kind not in ('tcp', 'http', 'output'):
+            logger.warning(f"Unknown readiness probe type '{kind}', treating as ready on spawn")
+            return None
+
+        url = settings.get('url') or config.get('url', '')
+        host = settings.get('host', '')
+        port = int(settings.get('port', 0) or 0)
+        if url and (not host or not port):
+            parsed = urlparse(url)
+            host = host or parsed.hostname or 'localhost'
+            port = port or parsed.port or (443 if parsed.scheme == 'https' else 80)
+
+        if kind in ('tcp', 'http') and not (url if kind == 'http' else port):
+            logger.warning(f"Readiness probe '{kind}' has no target, treating as ready on spawn")
+            return None
+        if kind == 'output' and not settings.get('pattern'):
+            logger.warning("Output readiness probe has no pattern, treating as ready on spawn")
+            return None
+
+        return cls(
+            kind,
+            url=url,
+            host=host or 'localhost',
+            port=port,
+            pattern=settings.get('pattern', ''),
+            timeout=float(settings.get('timeout', DEFAULT_READY_TIMEOUT)),
+            initial_interval=float(settings.get('interval', DEFAULT_INITIAL_INTERVAL)),
+            max_interval=float(settings.get('max_interval', DEFAULT_MAX_INTERVAL))
+        )
+
+    def describe(self) -> str:
+        """Short human-readable description of what is being probed"""
+        if self.kind == 'output':
+            return f"output /{self.pattern.pattern}/"
+        if self.kind == 'http':
+            return f"http {self.url}"
+        return f"tcp {self.host}:{self.port}"
+
+    def wait(self, is_alive: Callable[[], bool], buffer: Optional[OutputBuffer] = None,
+             timeout: Optional[float] = None) -> bool:
+        """
+        Probe with exponential backoff until ready, dead or out of time
+
+        Args:
+            is_alive: Returns False once the probed process has exited
+            buffer: Output buffer to match against (output probes only)
+            timeout: Overrides the probe's own timeout when smaller
+
+        Returns:
+            bool: True once the probe succeeds
+        """
+        budget = self.timeout if timeout is None else min(self.timeout, timeout)
+        deadline = time.monotonic() + budget
+
+        if self.kind == 'output':
+            return self._wait_for_output(is_alive, buffer, deadline)
+
+        interval = self.initial_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if self._check(max(0.05, min(remaining, 2.0))):
+                return True
+            if not is_alive():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.max_interval)
+
+    async def wait_async(self, is_alive: Callable[[], bool], buffer: Optional[OutputBuffer] = None,
+                         timeout: Optional[float] = None) -> bool:
+        """Coroutine version of wait() for the asyncio process engine"""
+        budget = self.timeout if timeout is None else min(self.timeout, timeout)
+        deadline = time.monotonic() + budget
+
+        if self.kind == 'output':
+            return await self._wait_for_output_async(is_alive, buffer, deadline)
+
+        interval = self.initial_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if await self._check_async(max(0.05, min(remaining, 2.0))):
+                return True
+            if not is_alive():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.max_interval)
+
+    def _check(self, attempt_timeout: float) -> bool:
+        """Single TCP or HTTP attempt"""
+        if self.kind == 'tcp':
+            try:
+                with socket.create_connection((self.host, self.port), timeout=attempt_timeout):
+                    return True
+            except OSError:
+                return False
+
+        try:
+            with urllib.request.urlopen(self.url, timeout=attempt_timeout) as response:
+                return response.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+
+    async def _check_async(self, attempt_timeout: float) -> bool:
+        """Single TCP or HTTP attempt without blocking the event loop"""
+        try:
+            if self.kind == 'tcp':
+                _, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port),
+                                                   attempt_timeout)
+                writer.close()
+                return True
+            status = await asyncio.wait_for(self._http_status(), attempt_timeout)
+            return status is not None and status < 500
+        except (OSError, asyncio.TimeoutError, ValueError):
+            return False
+
+    async def _http_status(self) -> Optional[int]:
+        """Status code of a GET of the url (redirects are not followed; they count as up)"""
+        parsed = urlparse(self.url)
+        secure = parsed.scheme == 'https'
+        reader, writer = await asyncio.open_connection(
+            parsed.hostname, parsed.port or (443 if secure else 80),
+            ssl=ssl.create_default_context() if secure else None
+        )
+        try:
+            target = parsed.path or '/'
+            if parsed.query:
+                target += f"?{parsed.query}"
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {parsed.netloc}\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1'))
+            status_line = (await reader.readline()).split()
+            return int(status_line[1]) if len(status_line) >= 2 else None
+        finally:
+            writer.close()
+
+    def _scan_output(self, carry: str, text: str) -> Tuple[bool, str]:
+        """Match new output against the pattern; returns (matched, partial line to carry)"""
+        window = carry + text
+        if self.pattern.search(window):
+            return True, carry
+        return False, window[window.rfind('\n') + 1:][-4096:]
+
+    def _wait_for_output(self, is_alive: Callable[[], bool], buffer: Optional[OutputBuffer],
+                         deadline: float) -> bool:
+        """Scan output as it arrives, carrying the last partial line across reads"""
+        if buffer is None:
+            return False
+        offset = 0
+        carry = ''
+        while True:
+            text, _, offset = buffer.read(offset)
+            if text:
+                matched, carry = self._scan_output(carry, text)
+                if matched:
+                    return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (not text and not is_alive()):
+                return False
+            buffer.wait(offset, min(remaining, 0.5))
+
+    async def _wait_for_output_async(self, is_alive: Callable[[], bool], buffer: Optional[OutputBuffer],
+                                     deadline: float) -> bool:
+        """_wait_for_output() polling the buffer, whose wait() would block the event loop"""
+        if buffer is None:
+            return False
+        offset = 0
+        carry = ''
+        while True:
+            text, _, offset = buffer.read(offset)
+            if text:
+                matched, carry = self._scan_output(carry, text)
+                if matched:
+                    return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (not text and not is_alive()):
+                return False
+            await asyncio.sleep(min(remaining, OUTPUT_POLL_INTERVAL))
+
+
+class AppReadiness:
+    """Readiness bookkeeping for one launch of an application"""
+
+    def __init__(self, budget: float = DEFAULT_READY_TIMEOUT):
+        self.budget = budget
+        self.launched_at = time.time()
+        self._started = time.monotonic()
+        self._components: Dict[str, Dict] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+
+    def remaining(self) -> float:
+        """Seconds left in the launch-latency budget"""
+        return max(0.0, self.budget - (time.monotonic() - self._started))
+
+    def begin(self, name: str, probe: Optional[ReadinessProbe]):
+        """Register a component whose readiness is being determined"""
+        with self._lock:
+            self._components[name] = {
+                'state': PENDING if probe else UNPROBED,
+                'probe': probe.describe() if probe else None,
+                'time_to_ready': None
+            }
+            if probe:
+                self._pending.add(name)
+                self._done.clear()
+            else:
+                self._components[name]['time_to_ready'] = round(time.monotonic() - self._started, 3)
+
+    def finish(self, name: str, ready: bool):
+        """Record the outcome of a component's probe"""
+        with self._lock:
+            entry = self._components.setdefault(name, {'probe': None})
+            entry['state'] = READY if ready else FAILED
+            entry['time_to_ready'] = round(time.monotonic() - self._started, 3) if ready else None
+            self._pending.discard(name)
+            if not self._pending:
+                self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for every probe to finish
+
+        Args:
+            timeout: Maximum seconds to wait (None for no limit)
+
+        Returns:
+            bool: True if every component ended up ready (or unprobed)
+        """
+        self._done.wait(timeout)
+        return self.state == READY
+
+    @property
+    def state(self) -> str:
+        """Overall state: pending, ready or failed"""
+        with self._lock:
+            if self._pending:
+                return PENDING
+            if any(entry['state'] == FAILED for entry in self._components.values()):
+                return FAILED
+            return READY
+
+    def to_dict(self) -> Dict:
+        """Snapshot for status reporting, including cold-start latency"""
+        with self._lock:
+            times = [entry['time_to_ready'] for entry in self._components.values()]
+            complete = not self._pending and all(t is not None for t in times)
+            return {
+                'state': PENDING if self._pending else (
+                    FAILED if any(e['state'] == FAILED for e in self._components.values()) else READY
+                ),
+                'launched_at': self.launched_at,
+                'time_to_ready': max(times, default=0.0) if complete else None,
+                'components': {name: dict(entry) for name, entry in self._components.items()}
+            }
@@ -0,0 +1,466 @@
+import logging
+import os
+import re
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits; limits there are not enforced
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Where the unified (v2) cgroup hierarchy is mounted
+CGROUP_MOUNT = '/sys/fs/cgroup'
+
+# Subtree of the portal's own cgroup that applications are placed in (unless CGROUP_ROOT is set)
+CGROUP_SUBTREE = 'apps'
+
+# Leaf the portal moves itself into so its own cgroup may delegate controllers
+PORTAL_LEAF = 'portal'
+
+# Controllers enabled for application cgroups, where the host offers them
+CGROUP_CONTROLLERS = ('cpu', 'memory', 'pids', 'io')
+
+# cpu.max period (microseconds); the quota is cpu_max CPUs worth of it
+CPU_PERIOD = 100000
+
+# Settings of a 'resources' block
+RESOURCE_KEYS = ('memory_max', 'memory_high', 'cpu_max', 'cpu_weight', 'pids_max', 'nice', 'ionice')
+
+# Settings only cgroups can enforce; without them they are reported and skipped
+CGROUP_ONLY_KEYS = ('memory_high', 'cpu_max', 'cpu_weight', 'pids_max')
+
+SIZE_SUFFIXES = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+IONICE_CLASSES = ('realtime', 'best-effort', 'idle')
+
+
+def parse_size(value) -> int:
+    """
+    Bytes from an integer or a string like '512M' or '2G'
+
+    Raises:
+        ValueError: If the value is not a positive size
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"invalid size {value!r}")
+    if isinstance(value, int):
+        size = value
+    else:
+        match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*', str(value), re.IGNORECASE)
+        if match is None:
+            raise ValueError(f"invalid size {value!r}")
+        size = int(float(match.group(1)) * SIZE_SUFFIXES[match.group(2).lower()])
+    if size <= 0:
+        raise ValueError(f"size must be positive, got {value!r}")
+    return size
+
+
+class ResourceLimits:
+    """
+    Resource settings of an application or component ('resources' in applications.json)
+
+    Settings:
+        memory_max:  hard memory limit (bytes or '512M'/'2G')
+        memory_high: memory use above which the kernel throttles and reclaims
+        cpu_max:     CPU time cap in CPUs (0.5 = half a core)
+        cpu_weight:  share of CPU under contention (1-10000, default 100)
+        pids_max:    most processes and threads at once
+        nice:        scheduling niceness (-20..19)
+        ionice:      IO class, optionally with a level: 'idle', 'best-effort:7', 'realtime:0'
+    """
+
+    def __init__(self, memory_max: Optional[int] = None, memory_high: Optional[int] = None,
+                 cpu_max: Optional[float] = None, cpu_weight: Optional[int] = None,
+                 pids_max: Optional[int] = None, nice: Optional[int] = None,
+                 ionice: Optional[Tuple[str, int]] = None):
+        self.memory_max = memory_max
+        self.memory_high = memory_high
+        self.cpu_max = cpu_max
+        self.cpu_weight = cpu_weight
+        self.pids_max = pids_max
+        self.nice = nice
+        self.ionice = ionice
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping]) -> Optional['ResourceLimits']:
+        """
+        Parse the 'resources' block of an application or component
+
+        Returns:
+            Optional[ResourceLimits]: The settings, or None if there are none
+
+        Raises:
+            ValueError: If a setting is unknown or out of range
+        """
+        settings = (config or {}).get('resources')
+        if not settings:
+            return None
+        if not isinstance(settings, Mapping):
+            raise ValueError("resources must be an object")
+        unknown = [key for key in settings if key not in RESOURCE_KEYS]
+        if unknown:
+            raise ValueError(f"unknown resource settings: {', '.join(unknown)}")
+
+        limits = cls()
+        if settings.get('memory_max') is not None:
+            limits.memory_max = parse_size(settings['memory_max'])
+        if settings.get('memory_high') is not None:
+            limits.memory_high = parse_size(settings['memory_high'])
+        if settings.get('cpu_max') is not None:
+            limits.cpu_max = float(settings['cpu_max'])
+            if limits.cpu_max <= 0:
+                raise ValueError("cpu_max must be a positive number of CPUs")
+        if settings.get('cpu_weight') is not None:
+            limits.cpu_weight = int(settings['cpu_weight'])
+            if not 1 <= limits.cpu_weight <= 10000:
+                raise ValueError("cpu_weight must be between 1 and 10000")
+        if settings.get('pids_max') is not None:
+            limits.pids_max = int(settings['pids_max'])
+            if limits.pids_max < 1:
+                raise ValueError("pids_max must be at least 1")
+        if settings.get('nice') is not None:
+            limits.nice = int(settings['nice'])
+            if not -20 <= limits.nice <= 19:
+                raise ValueError("nice must be between -20 and 19")
+        if settings.get('ionice') is not None:
+            io_class, _, level = str(settings['ionice']).partition(':')
+            if io_class not in IONICE_CLASSES:
+                raise ValueError(f"ionice class must be one of: {', '.join(IONICE_CLASSES)}")
+            # The idle class has no levels
+            limits.ionice = (io_class, 0 if io_class == 'idle' else int(level) if level else 4)
+            if not 0 <= limits.ionice[1] <= 7:
+                raise ValueError("ionice level must be between 0 and 7")
+        return limits
+
+    def merged(self, override: Optional['ResourceLimits']) -> 'ResourceLimits':
+        """These settings with every setting the override has replacing ours"""
+        merged = ResourceLimits(**vars(self))
+        for key, value in vars(override or ResourceLimits()).items():
+            if value is not None:
+                setattr(merged, key, value)
+        return merged
+
+    def cgroup_files(self) -> Dict[str, str]:
+        """Interface files of a cgroup enforcing these settings, with their contents"""
+        files = {}
+        if self.memory_max is not None:
+            files['memory.max'] = str(self.memory_max)
+        if self.memory_high is not None:
+            files['memory.high'] = str(self.memory_high)
+        if self.cpu_max is not None:
+            files['cpu.max'] = f"{int(self.cpu_max * CPU_PERIOD)} {CPU_PERIOD}"
+        if self.cpu_weight is not None:
+            files['cpu.weight'] = str(self.cpu_weight)
+        if self.pids_max is not None:
+            files['pids.max'] = str(self.pids_max)
+        return files
+
+    def to_dict(self) -> Dict:
+        """Settings that are set, for status reporting"""
+        settings = {key: value for key, value in vars(self).items() if value is not None}
+        if self.ionice is not None:
+            settings['ionice'] = self.ionice[0] if self.ionice[0] == 'idle' else f"{self.ionice[0]}:{self.ionice[1]}"
+        return settings
+
+
+class ChildSetup:
+    """
+    Puts a child into its cgroup and applies per-process limits
+
+    The cgroup part runs as the Popen preexec_fn, between fork and exec. The
+    portal is multithreaded, so that step does no more than two system
+    calls: the cgroup's procs file is opened here in the parent, and the
+    child writes "0" (itself) to it, which puts it in the cgroup (with
+    every process it forks) before the command starts. Without a cgroup,
+    memory_max becomes RLIMIT_DATA of every process. nice and ionice are
+    applied from the parent once the child exists (see apply_priorities).
+    """
+
+    def __init__(self, limits: Optional[ResourceLimits], cgroup: Optional[str] = None):
+        self.limits = limits or ResourceLimits()
+        self.cgroup = cgroup
+        self._procs_fd = os.open(os.path.join(cgroup, 'cgroup.procs'), os.O_WRONLY | os.O_CLOEXEC) \
+            if cgroup else None
+        self._rlimit = None
+        if self._procs_fd is None and self.limits.memory_max is not None and resource is not None:
+            self._rlimit = (self.limits.memory_max, self.limits.memory_max)
+
+    @property
+    def preexec_fn(self):
+        """Callable to run in the child before exec, or None if there is nothing to do there"""
+        return self if self._procs_fd is not None or self._rlimit is not None else None
+
+    def unenforced(self) -> List[str]:
+        """Settings this setup cannot enforce"""
+        if self.cgroup is not None:
+            return []
+        unenforced = [key for key in CGROUP_ONLY_KEYS if getattr(self.limits, key) is not None]
+        if resource is None and self.limits.memory_max is not None:
+            unenforced.append('memory_max')
+        return unenforced
+
+    def __call__(self):
+        """Runs in the child between fork and exec: system calls only"""
+        if self._procs_fd is not None:
+            os.write(self._procs_fd, b'0')
+        elif self._rlimit is not None:
+            resource.setrlimit(resource.RLIMIT_DATA, self._rlimit)
+
+    def apply_priorities(self, pid: int):
+        """
+        Parent side: set nice and ionice of a started child and what it has forked so far
+
+        Best effort: raising priorities needs privileges the portal may lack.
+        Processes forked later inherit the settings from their parent.
+        """
+        if self.limits.nice is None and self.limits.ionice is None:
+            return
+        try:
+            root = psutil.Process(pid)
+            processes = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return
+        for process in processes:
+            try:
+                if self.limits.nice is not None:
+                    process.nice(self.limits.nice)
+                if self.limits.ionice is not None:
+                    io_class, level = self.limits.ionice
+                    process.ionice(_ionice_class(io_class), None if io_class == 'idle' else level)
+            except (OSError, AttributeError, ValueError, psutil.Error) as e:
+                logger.warning(f"Cannot set priority of PID {process.pid}: {e}")
+
+    def close(self):
+        """Parent side: release the procs file once the child is started"""
+        if self._procs_fd is not None:
+            os.close(self._procs_fd)
+            self._procs_fd = None
+
+
+def _ionice_class(name: str) -> int:
+    return {
+        'realtime': psutil.IOPRIO_CLASS_RT,
+        'best-effort': psutil.IOPRIO_CLASS_BE,
+        'idle': psutil.IOPRIO_CLASS_IDLE
+    }[name]
+
+
+class CgroupTree:
+    """
+    The cgroup v2 subtree applications run in
+
+    <root>/<app_id> carries an application's own limits, which cap all of
+    its components together, and <root>/<app_id>/<component or 'main'>
+    those of one component. Every application gets its cgroups, limits or
+    not, because they also make usage accounting a few file reads instead
+    of a walk of the process table.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @classmethod
+    def detect(cls, root: Optional[str] = None) -> Optional['CgroupTree']:
+        """
+        Set up the subtree, or find out that cgroups cannot be used
+
+        Args:
+            root: A delegated cgroup directory to use as is; by default an
+                'apps' cgroup next to the portal inside its own cgroup
+                (which needs the portal's cgroup to be delegated, e.g.
+                systemd's Delegate=yes)
+
+        Returns:
+            Optional[CgroupTree]: The tree, or None without a writable cgroup v2 hierarchy
+        """
+        if not os.path.exists(os.path.join(CGROUP_MOUNT, 'cgroup.controllers')):
+            logger.info("cgroup v2 is not available, resource limits use setrlimit/nice")
+            return None
+        try:
+            if root is None:
+                own = _own_cgroup()
+                if own is None:
+                    return None
+                if os.path.basename(own) == PORTAL_LEAF:
+                    # Moved there by an earlier run (e.g. a re-exec of this process)
+                    own = os.path.dirname(own)
+                _delegate(own)
+                root = os.path.join(own, CGROUP_SUBTREE)
+            os.makedirs(root, exist_ok=True)
+            _enable_controllers(root)
+        except OSError as e:
+            logger.warning(f"Cannot manage cgroups ({e}), resource limits use setrlimit/nice")
+            return None
+        logger.info(f"Placing applications in cgroups under {root}")
+        return cls(root)
+
+    def app_path(self, app_id: str) -> str:
+        """Cgroup directory of an application"""
+        return os.path.join(self.root, app_id)
+
+    def path(self, app_id: str, component: Optional[str] = None) -> str:
+        """Cgroup directory of one process of an application (component None: the only one)"""
+        return os.path.join(self.app_path(app_id), component or 'main')
+
+    def prepare(self, app_id: str, component: Optional[str], app_limits: Optional[ResourceLimits],
+                limits: Optional[ResourceLimits]) -> str:
+        """
+        Create (or update) the cgroups of one process and write their limits
+
+        Args:
+            app_id: Application the process belongs to
+            component: Component name, or None for a single-process app
+            app_limits: Limits of the whole application
+            limits: Limits of this component alone
+
+        Returns:
+            str: The leaf cgroup to start the process in
+
+        Raises:
+            OSError: If the cgroups cannot be created or configured
+        """
+        app_path = self.app_path(app_id)
+        leaf = self.path(app_id, component)
+        os.makedirs(leaf, exist_ok=True)
+        _enable_controllers(app_path)
+        # Settings removed from the config go back to the kernel defaults
+        _write_limits(app_path, app_limits)
+        _write_limits(leaf, limits)
+        return leaf
+
+    def remove(self, app_id: str):
+        """Remove an application's cgroups once nothing runs in them"""
+        app_path = self.app_path(app_id)
+        if not os.path.isdir(app_path):
+            return
+        try:
+            for entry in os.scandir(app_path):
+                if entry.is_dir(follow_symlinks=False):
+                    os.rmdir(entry.path)
+            os.rmdir(app_path)
+        except OSError as e:
+            # EBUSY: something still runs in there (e.g. a daemonized grandchild)
+            logger.debug(f"Keeping cgroup {app_path}: {e}")
+
+    def owns(self, path: str) -> bool:
+        """True if a cgroup directory lies inside this tree"""
+        return os.path.commonpath([self.root, path]) == self.root
+
+
+def cgroup_of(pid: int) -> Optional[str]:
+    """Cgroup v2 directory a process is in, or None"""
+    try:
+        with open(f"/proc/{pid}/cgroup") as f:
+            for line in f:
+                if line.startswith('0::'):
+                    return os.path.join(CGROUP_MOUNT, line[3:].strip().lstrip('/'))
+    except OSError:
+        pass
+    return None
+
+
+def read_cgroup_usage(path: str) -> Optional[Dict]:
+    """
+    Accumulated usage of everything that ever ran in a cgroup
+
+    Returns:
+        Optional[Dict]: cpu_usec, memory (bytes, page cache included),
+        tasks (processes and threads), pids of its processes, read/written
+        bytes and OOM kills; None once the cgroup is gone
+    """
+    try:
+        with open(os.path.join(path, 'cgroup.procs')) as f:
+            pids = [int(line) for line in f if line.strip()]
+        usage = {'pids': pids, 'cpu_usec': 0, 'memory': 0, 'tasks': 0,
+                 'read_bytes': 0, 'write_bytes': 0, 'oom_kills': 0}
+        usage['cpu_usec'] = _read_keyed(os.path.join(path, 'cpu.stat')).get('usage_usec', 0)
+    except (OSError, ValueError):
+        return None
+    usage['memory'] = _read_int(os.path.join(path, 'memory.current'))
+    usage['tasks'] = _read_int(os.path.join(path, 'pids.current'))
+    usage['oom_kills'] = _read_keyed(os.path.join(path, 'memory.events')).get('oom_kill', 0)
+    try:
+        with open(os.path.join(path, 'io.stat')) as f:
+            for line in f:
+                fields = dict(field.split('=', 1) for field in line.split()[1:] if '=' in field)
+                usage['read_bytes'] += int(fields.get('rbytes', 0))
+                usage['write_bytes'] += int(fields.get('wbytes', 0))
+    except (OSError, ValueError):
+        pass
+    return usage
+
+
+def _own_cgroup() -> Optional[str]:
+    """Cgroup directory of the portal process"""
+    return cgroup_of(os.getpid())
+
+
+def _delegate(own: str):
+    """
+    Let the portal's cgroup hold child cgroups with controllers
+
+    A cgroup that contains processes cannot enable controllers for its
+    children, so the portal moves itself into a leaf of its own first.
+    """
+    try:
+        _enable_controllers(own)
+    except OSError:
+        leaf = os.path.join(own, PORTAL_LEAF)
+        os.makedirs(leaf, exist_ok=True)
+        with open(os.path.join(leaf, 'cgroup.procs'), 'w') as f:
+            f.write(str(os.getpid()))
+        _enable_controllers(own)
+
+
+def _enable_controllers(path: str):
+    """Make the wanted controllers available to a cgroup's children"""
+    with open(os.path.join(path, 'cgroup.controllers')) as f:
+        available = f.read().split()
+    wanted = [name for name in CGROUP_CONTROLLERS if name in available]
+    with open(os.path.join(path, 'cgroup.subtree_control')) as f:
+        enabled = f.read().split()
+    missing = [name for name in wanted if name not in enabled]
+    if missing:
+        with open(os.path.join(path, 'cgroup.subtree_control'), 'w') as f:
+            f.write(' '.join(f"+{name}" for name in missing))
+
+
+def _write_limits(path: str, limits: Optional[ResourceLimits]):
+    """Write a cgroup's limit files, resetting the ones that are not set"""
+    files = {'memory.max': 'max', 'memory.high': 'max', 'cpu.max': f"max {CPU_PERIOD}",
+             'cpu.weight': '100', 'pids.max': 'max'}
+    files.update(limits.cgroup_files() if limits else {})
+    for name, value in files.items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path):
+            if limits is not None and name in limits.cgroup_files():
+                logger.warning(f"Cannot apply {name} to {path}: controller not enabled")
+            continue
+        with open(file_path, 'w') as f:
+            f.write(value)
+
+
+def _read_int(path: str) -> int:
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return 0
+
+
+def _read_keyed(path: str) -> Dict[str, int]:
+    """'key value' lines of a cgroup stat file"""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(' ')
+                if value.strip().isdigit():
+                    values[key] = int(value)
+    except OSError:
+        pass
+    return values
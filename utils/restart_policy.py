@@ -0,0 +1,142 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Restart policies
+NEVER = 'never'
+ON_FAILURE = 'on-failure'
+ALWAYS = 'always'
+POLICIES = (NEVER, ON_FAILURE, ALWAYS)
+
+# Defaults for a 'restart' block
+DEFAULT_MAX_RESTARTS = 5
+DEFAULT_WINDOW = 60.0
+DEFAULT_INITIAL_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 30.0
+
+
+class RestartPolicy:
+    """
+    When and how quickly a crashed process is started again
+
+    Configured with a 'restart' block on an application or component, or
+    just the policy name as a string:
+
+        "restart": {"policy": "on-failure", "max_restarts": 5, "window": 60,
+                    "backoff": 1, "max_backoff": 30}
+
+    A component's own block overrides the application's.
+    """
+
+    def __init__(self, policy: str = NEVER, max_restarts: int = DEFAULT_MAX_RESTARTS,
+                 window: float = DEFAULT_WINDOW, initial_backoff: float = DEFAULT_INITIAL_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF):
+        self.policy = policy
+        self.max_restarts = max_restarts
+        self.window = window
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+    @classmethod
+    def from_config(cls, config: Dict, inherited: Optional['RestartPolicy'] = None) -> Optional['RestartPolicy']:
+        """
+        Build a policy from an application or component configuration
+
+        Args:
+            config: Application or component configuration dictionary
+            inherited: The application's policy, used when a component has none
+
+        Returns:
+            Optional[RestartPolicy]: Policy to enforce, or None to never restart
+        """
+        settings = config.get('restart')
+        if settings is None:
+            return inherited
+        if isinstance(settings, str):
+            settings = {'policy': settings}
+
+        policy = settings.get('policy', ON_FAILURE)
+        if policy not in POLICIES:
+            logger.warning(f"Unknown restart policy '{policy}', not restarting")
+            return None
+        if policy == NEVER:
+            return None
+        return cls(
+            policy,
+            max_restarts=int(settings.get('max_restarts', DEFAULT_MAX_RESTARTS)),
+            window=float(settings.get('window', DEFAULT_WINDOW)),
+            initial_backoff=float(settings.get('backoff', DEFAULT_INITIAL_BACKOFF)),
+            max_backoff=float(settings.get('max_backoff', DEFAULT_MAX_BACKOFF))
+        )
+
+    def applies_to(self, exit_code: Optional[int]) -> bool:
+        """True if a process that exited with this code should be restarted"""
+        if self.policy == ALWAYS:
+            return True
+        return self.policy == ON_FAILURE and exit_code != 0
+
+    def to_dict(self) -> Dict:
+        """Settings for status reporting"""
+        return {
+            'policy': self.policy,
+            'max_restarts': self.max_restarts,
+            'window': self.window,
+            'backoff': self.initial_backoff,
+            'max_backoff': self.max_backoff
+        }
+
+
+class RestartTracker:
+    """
+    Restart history of one process under a policy
+
+    Restarts inside the sliding window count towards the limit; once the
+    limit is reached the process is considered crash-looping and is left
+    down. The backoff doubles with each restart in the window and is
+    jittered so components that died together don't come back in lockstep.
+    """
+
+    def __init__(self, policy: RestartPolicy):
+        self.policy = policy
+        self.restarts = 0  # total restarts since launch
+        self.crash_loop = False
+        self.next_restart_at: Optional[float] = None  # wall clock, for reporting
+        self._recent = deque()  # monotonic times of restarts inside the window
+
+    def next_delay(self) -> Optional[float]:
+        """
+        Account for a new exit and decide how long to wait before restarting
+
+        Returns:
+            Optional[float]: Seconds to wait, or None if the restart budget for
+            the window is used up (crash loop)
+        """
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > self.policy.window:
+            self._recent.popleft()
+        if len(self._recent) >= self.policy.max_restarts:
+            self.crash_loop = True
+            self.next_restart_at = None
+            return None
+
+        self._recent.append(now)
+        self.restarts += 1
+        backoff = min(self.policy.max_backoff, self.policy.initial_backoff * 2 ** (len(self._recent) - 1))
+        # Equal jitter: at least half the backoff, at most all of it
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        self.next_restart_at = time.time() + delay
+        return delay
+
+    def to_dict(self) -> Dict:
+        """Restart counters for status reporting"""
+        return {
+            'policy': self.policy.policy,
+            'restarts': self.restarts,
+            'recent_restarts': len(self._recent),
+            'crash_loop': self.crash_loop,
+            'next_restart_at': self.next_restart_at
+        }
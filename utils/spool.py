@@ -0,0 +1,273 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import shlex
+import subprocess
+import time
+from typing import Callable, Dict, Optional
+
+from utils.config_watcher import IN_MODIFY, open_inotify
+from utils.process_tree import exited
+
+logger = logging.getLogger(__name__)
+
+# Children can only outlive the portal where FIFOs and append-only files work as below
+SPOOL_SUPPORTED = os.name != 'nt'
+
+# Longest a tail sleeps before re-checking whether its process is still alive
+SPOOL_IDLE_WAIT = 0.5
+
+# Read interval of a tail when inotify is unavailable
+SPOOL_POLL_INTERVAL = 0.05
+
+# Consumed output past the last checkpoint that triggers a new one (bytes)
+CHECKPOINT_BYTES = 1024 * 1024
+
+# fallocate(2) flags (linux/falloc.h)
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+
+
+def spool_paths(spool_dir: str) -> Dict[str, str]:
+    """Output file, input FIFO and exit status file of one spooled process"""
+    return {
+        'output': os.path.join(spool_dir, 'output'),
+        'input': os.path.join(spool_dir, 'input'),
+        'status': os.path.join(spool_dir, 'status')
+    }
+
+
+def spawn_spooled(command: str, working_dir: Optional[str], spool_dir: str,
+                  on_checkpoint: Optional[Callable[[], None]] = None,
+                  popen: Callable = subprocess.Popen, **popen_kwargs) -> subprocess.Popen:
+    """
+    Start a shell command whose stdio does not depend on the portal process
+
+    Output is appended to a file in spool_dir and stdin is a FIFO there, so
+    the child keeps running, and keeps its output, when the portal exits.
+    A later portal process can pick it up again with attach_spool().
+
+    The child holds its stdin FIFO open for writing as well, so it never
+    sees EOF on stdin while no portal is attached. The portal's end is
+    write-only and non-blocking (see attach_spool). The shell records the
+    command's exit code in the status file, because a re-adopted child
+    is not the new portal's child and its exit code cannot be waited for.
+
+    Args:
+        command: Shell command to run
+        working_dir: Directory to run it in
+        spool_dir: Directory for this process's spool files (reset here)
+        on_checkpoint: Called after every CHECKPOINT_BYTES of consumed output
+        popen: Popen or a look-alike that starts the child (see process_engine)
+        **popen_kwargs: Extra Popen arguments (see process_tree.new_group_kwargs)
+
+    Returns:
+        subprocess.Popen: The child, with a SpoolTail as stdout and the
+        FIFO as stdin
+    """
+    paths = spool_paths(spool_dir)
+    os.makedirs(spool_dir, exist_ok=True)
+    for stale in (paths['output'], paths['status']):
+        if os.path.exists(stale):
+            os.remove(stale)
+    if not os.path.exists(paths['input']):
+        os.mkfifo(paths['input'], 0o600)
+
+    output_fd = os.open(paths['output'], os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    input_fd = os.open(paths['input'], os.O_RDWR)
+    try:
+        # An EXIT trap also records exits through an explicit 'exit N'
+        wrapped = (f"__status_file={shlex.quote(os.path.abspath(paths['status']))}\n"
+                   f"trap 'echo $? > \"$__status_file\"' EXIT\n{command}")
+        process = popen(
+            wrapped,
+            cwd=working_dir,
+            stdin=input_fd,
+            stdout=output_fd,
+            stderr=output_fd,
+            shell=True,
+            **popen_kwargs
+        )
+    finally:
+        os.close(output_fd)
+        os.close(input_fd)
+
+    # Observed without reaping, so a stop in progress keeps the group ID pinned
+    attach_spool(process, spool_dir, 0, lambda: exited(process), on_checkpoint)
+    return process
+
+
+def attach_spool(process, spool_dir: str, offset: int, exited: Callable[[], bool],
+                 on_checkpoint: Optional[Callable[[], None]] = None):
+    """Give a spooled process (new or re-adopted) a tail as stdout and the FIFO as stdin"""
+    paths = spool_paths(spool_dir)
+    process.stdout = SpoolTail(paths['output'], offset, exited, on_checkpoint)
+    process.stdin = os.fdopen(_open_input(paths['input']), 'wb', buffering=0)
+    process.spool_dir = spool_dir
+
+
+def _open_input(path: str) -> int:
+    """
+    Portal end of a spooled child's stdin FIFO
+
+    Write-only and non-blocking: holding the FIFO open for reading too
+    would mean writes never fail with EPIPE once the child is gone, and a
+    child that stops reading would block the writer forever. Writes now
+    fail with EPIPE or EAGAIN instead, which input writers take as the end
+    of input.
+    """
+    try:
+        return os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError as e:
+        if e.errno != errno.ENXIO:
+            raise
+    # No reader: the child has already exited. Hand out a pipe without a
+    # read end so writes fail with EPIPE like they would on the FIFO.
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    os.set_blocking(write_fd, False)
+    return write_fd
+
+
+def read_exit_status(spool_dir: str) -> Optional[int]:
+    """Exit code the shell recorded for a spooled process, if it got to record one"""
+    try:
+        with open(spool_paths(spool_dir)['status']) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class SpoolTail:
+    """
+    Follows a spool file like a pipe: read() waits for more output and
+    returns b'' only once the process has exited and everything is read
+
+    Wakes up on inotify events for the file, so output arrives as fast as
+    through a pipe; polls where inotify is unavailable. Disk space of
+    output that has been consumed and checkpointed is given back with
+    hole punching, so the file's offsets stay valid while it does not grow
+    without bound.
+    """
+
+    def __init__(self, path: str, offset: int, exited: Callable[[], bool],
+                 on_checkpoint: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            path: Spool output file
+            offset: Byte offset to continue reading from
+            exited: True once the writing process has exited
+            on_checkpoint: Called after every CHECKPOINT_BYTES read, so the
+                owner can persist the offset and call release()
+        """
+        self.path = path
+        self.offset = offset
+        self.exited = exited
+        self.on_checkpoint = on_checkpoint
+        self.closed = False
+        self._checkpoint = offset
+        self._released = 0
+        self._fd = os.open(path, os.O_RDWR)
+        try:
+            self._inotify = open_inotify(path, IN_MODIFY)
+        except OSError as e:
+            logger.debug(f"inotify unavailable for {path}, polling: {e}")
+            self._inotify = None
+
+    def fileno(self) -> int:
+        return self._fd
+
+    @property
+    def wakeup_fd(self) -> Optional[int]:
+        """Descriptor that turns readable when the file is modified (None when polling)"""
+        return self._inotify
+
+    def read(self, size: int) -> bytes:
+        """Next chunk of output, waiting for it while the process is alive"""
+        while True:
+            data = self.read_nowait(size)
+            if data is not None:
+                return data
+            self._wait()
+
+    def read_nowait(self, size: int) -> Optional[bytes]:
+        """
+        Next chunk of output without waiting
+
+        Returns:
+            Optional[bytes]: The chunk, b'' once the process has exited and
+            everything is read, or None if there is nothing new yet
+        """
+        data = os.pread(self._fd, size, self.offset)
+        if not data:
+            if not self.exited():
+                return None
+            # Anything written between that read and the exit
+            data = os.pread(self._fd, size, self.offset)
+            if not data:
+                return b''
+        self.offset += len(data)
+        if self.on_checkpoint is not None and self.offset - self._checkpoint >= CHECKPOINT_BYTES:
+            self._checkpoint = self.offset
+            self.on_checkpoint()
+        return data
+
+    def _wait(self):
+        """Sleep until the file is modified (or a liveness check is due)"""
+        if self._inotify is None:
+            time.sleep(SPOOL_POLL_INTERVAL)
+            return
+        ready, _, _ = select.select([self._inotify], [], [], SPOOL_IDLE_WAIT)
+        if ready:
+            self.drain_wakeups()
+
+    def drain_wakeups(self):
+        """Consume pending inotify events once wakeup_fd has turned readable"""
+        try:
+            while os.read(self._inotify, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+
+    def release(self, offset: int):
+        """
+        Free the disk space of output before offset
+
+        Only call this with an offset that has been persisted: a portal that
+        re-adopts the process resumes from its persisted offset and must
+        not find the bytes after it punched out.
+        """
+        offset = min(offset, self.offset)
+        if self.closed or offset <= self._released:
+            return
+        if _punch_hole(self._fd, self._released, offset - self._released):
+            self._released = offset
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        os.close(self._fd)
+        if self._inotify is not None:
+            os.close(self._inotify)
+
+
+_libc = None
+
+
+def _punch_hole(fd: int, offset: int, length: int) -> bool:
+    """Deallocate a byte range of a file without changing its size; False if unsupported"""
+    global _libc
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            _libc.fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+        if _libc.fallocate(fd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, offset, length) == 0:
+            return True
+        logger.debug(f"Could not punch hole in spool file: {os.strerror(ctypes.get_errno())}")
+    except (OSError, AttributeError) as e:
+        logger.debug(f"Hole punching unavailable: {e}")
+    return False
@@ -0,0 +1,65 @@
+import atexit
+import os
+import threading
+
+from utils.admission import AdmissionController
+from utils.config_manager import ConfigManager
+from utils.config_watcher import ConfigWatcher
+from utils.job_queue import JobQueue
+from utils.portal import Portal
+from utils.process_manager import ProcessManager
+
+
+def create_process_manager() -> ProcessManager:
+    """ProcessManager configured from the environment, for the portal or the daemon"""
+    return ProcessManager(
+        telemetry_interval=float(os.environ.get("TELEMETRY_INTERVAL", "2")),
+        telemetry_history=int(os.environ.get("TELEMETRY_HISTORY", "300")),
+        # Persist output to rotated, compressed logs; set OUTPUT_LOG_DIR= to keep it in memory only
+        log_dir=os.environ.get("OUTPUT_LOG_DIR", "logs") or None,
+        log_segment_size=int(os.environ.get("OUTPUT_LOG_SEGMENT_BYTES", str(4 * 1024 * 1024))),
+        log_codec=os.environ.get("OUTPUT_LOG_CODEC", "gzip"),
+        input_queue_size=int(os.environ.get("INPUT_QUEUE_BYTES", str(64 * 1024))),
+        # 'asyncio' runs all process I/O on one event loop instead of threads per child
+        engine=os.environ.get("PROCESS_ENGINE", "threads"),
+        # Put every process in a cgroup v2 of its own for limits and accounting (needs a delegated
+        # cgroup, e.g. systemd Delegate=yes); CGROUP_ROOT picks one, CGROUPS=0 uses setrlimit/nice only
+        cgroups=os.environ.get("CGROUPS", "1") != "0",
+        cgroup_root=os.environ.get("CGROUP_ROOT") or None,
+        # Bulk launches: apps warming up at once, and the host headroom each one needs
+        admission=AdmissionController(
+            max_concurrent=int(os.environ.get("BULK_LAUNCH_PARALLELISM", "4")),
+            max_cpu_percent=float(os.environ.get("ADMISSION_MAX_CPU_PERCENT", "90")),
+            min_available_memory=float(os.environ.get("ADMISSION_MIN_MEMORY_PERCENT", "10")),
+            max_wait=float(os.environ.get("ADMISSION_MAX_WAIT", "60"))
+        ),
+        # Children outlive portal restarts and are re-adopted; set STATE_DIR= to tie them to this process.
+        # The debug reloader's file-watching process (see main.py) leaves them to the serving process.
+        state_dir=None if os.environ.get("PORTAL_WATCHER_PROCESS") else (os.environ.get("STATE_DIR", "state") or None)
+    )
+
+
+def create_portal(manager: ProcessManager) -> Portal:
+    """Application catalog and job table next to a manager, configured from the environment"""
+    return Portal(manager, ConfigManager(), JobQueue(max_workers=int(os.environ.get("JOB_WORKERS", "4"))))
+
+
+def start_supervision(portal: Portal):
+    """Start the background work of whichever process owns the children"""
+    manager = portal.manager
+    # Take over applications a previous process left running, and record
+    # final spool offsets on the way out so the next one resumes without repeats
+    manager.adopt_processes()
+    atexit.register(manager.save_state)
+
+    # Sample CPU/memory/IO of running process trees in the background
+    if os.environ.get("TELEMETRY", "1") != "0":
+        manager.telemetry.start()
+
+    # Make output from earlier runs searchable without delaying startup
+    if manager.search_index is not None:
+        threading.Thread(target=manager.index_existing_logs, name="log-indexer", daemon=True).start()
+
+    # Pick up hand edits and deployments of the config file without a restart
+    if os.environ.get("CONFIG_WATCH", "1") != "0":
+        ConfigWatcher(portal.config.config_file, portal.config.reload_if_changed).start()
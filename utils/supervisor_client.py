@@ -0,0 +1,141 @@
+import itertools
+import re
+import socket
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.job_queue import JobConflict
+from utils.supervisor_protocol import (
+    PROGRESS_ARGUMENT, REMOTE_ATTRIBUTES, REMOTE_METHODS, ProtocolError, recv_message, send_message
+)
+
+# Idle connections kept open for reuse
+MAX_IDLE_CONNECTIONS = 8
+
+# Exceptions re-raised as themselves when the daemon reports them, keyed by the
+# name it reports (re.error is called PatternError from Python 3.13 on)
+REMOTE_EXCEPTIONS = {
+    cls.__name__: cls
+    for cls in (re.error, ValueError, TypeError, KeyError, AttributeError)
+}
+
+
+class SupervisorError(Exception):
+    """A call failed inside the supervisor daemon"""
+
+
+class SupervisorUnavailable(ConnectionError):
+    """The supervisor daemon could not be reached"""
+
+
+class SupervisorClient:
+    """
+    Thin stand-in for ProcessManager that forwards calls to the supervisor daemon
+
+    Exposes the methods and attributes in REMOTE_METHODS/REMOTE_ATTRIBUTES
+    under their ProcessManager names, so the web tier does not care where
+    the children live; the daemon's Portal (catalog and jobs) is reached
+    through the portal attribute. Every call borrows a connection from a small pool,
+    so blocking calls from different request threads run side by side.
+    Any number of web workers can share one daemon.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._idle: List[socket.socket] = []
+        self._idle_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.telemetry = _RemoteNamespace(self, 'telemetry')
+        self.portal = _RemoteNamespace(self, 'portal')
+        # Children and their background work live in the daemon
+        self.search_index = None
+
+    def __getattr__(self, name: str) -> Any:
+        if name in REMOTE_ATTRIBUTES:
+            return self.call(name)
+        if name in REMOTE_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(f"'{type(self).__name__}' has no attribute '{name}'")
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        Invoke a ProcessManager method (or read an attribute) in the daemon
+
+        A callable 'progress' keyword argument is called with each progress
+        update the daemon streams back before the result.
+
+        Raises:
+            SupervisorUnavailable: If the daemon cannot be reached
+            SupervisorError: If the call raised in the daemon (common
+                exception types are re-raised as themselves)
+        """
+        progress: Optional[Callable] = kwargs.pop(PROGRESS_ARGUMENT, None)
+        if progress is not None:
+            kwargs[PROGRESS_ARGUMENT] = True
+        request = {'id': next(self._ids), 'method': method, 'args': list(args), 'kwargs': kwargs}
+        connection, pooled = self._acquire()
+        while True:
+            try:
+                reply = self._exchange(connection, request, progress)
+                break
+            except (OSError, ProtocolError) as e:
+                connection.close()
+                if not pooled:
+                    raise SupervisorUnavailable(f"Supervisor call {method} failed: {e}") from e
+                # A pooled connection can predate a daemon restart; try once on a fresh one
+                connection, pooled = self._connect(), False
+        self._release(connection)
+
+        if 'error' in reply:
+            if reply.get('type') == JobConflict.__name__:
+                raise JobConflict(reply['job'], reply.get('app_id'))
+            raise REMOTE_EXCEPTIONS.get(reply.get('type'), SupervisorError)(reply['error'])
+        return reply.get('result')
+
+    def _exchange(self, connection: socket.socket, request: Dict, progress: Optional[Callable]) -> Dict:
+        """Send one request and read frames until its reply, forwarding progress updates"""
+        send_message(connection, request)
+        while True:
+            reply = recv_message(connection)
+            if reply is None:
+                raise ProtocolError("Supervisor closed the connection")
+            if 'progress' not in reply:
+                return reply
+            if progress is not None:
+                progress(*reply['progress'])
+
+    def _acquire(self) -> Tuple[socket.socket, bool]:
+        """An idle pooled connection (flagged True), or a new one"""
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _connect(self) -> socket.socket:
+        """Open a new connection to the daemon"""
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.socket_path)
+        except OSError as e:
+            connection.close()
+            raise SupervisorUnavailable(f"Cannot reach the supervisor at {self.socket_path}: {e}") from e
+        return connection
+
+    def _release(self, connection: socket.socket):
+        """Return a healthy connection to the pool"""
+        with self._idle_lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+
+class _RemoteNamespace:
+    """Dotted access to a remote member object, e.g. client.telemetry.snapshot()"""
+
+    def __init__(self, client: SupervisorClient, prefix: str):
+        self._client = client
+        self._prefix = prefix
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, f"{self._prefix}.{name}")
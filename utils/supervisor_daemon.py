@@ -0,0 +1,176 @@
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from typing import Any, Dict
+
+from utils.job_queue import JobConflict
+from utils.portal import Portal
+from utils.supervision import create_portal, create_process_manager, start_supervision
+from utils.supervisor_protocol import (
+    PROGRESS_ARGUMENT, REMOTE_ATTRIBUTES, REMOTE_METHODS, ProtocolError, recv_message, send_message
+)
+
+logger = logging.getLogger(__name__)
+
+# Socket the daemon listens on when SUPERVISOR_SOCKET is not set
+DEFAULT_SOCKET_NAME = 'supervisor.sock'
+
+
+def resolve(portal: Portal, name: str) -> Any:
+    """Method or attribute by (possibly dotted) name: 'portal.' names on the Portal, the rest on its manager"""
+    target = portal.manager
+    parts = name.split('.')
+    if parts[0] == 'portal':
+        target, parts = portal, parts[1:]
+    for part in parts:
+        target = getattr(target, part)
+    return target
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """
+    Serves one client connection: a sequence of calls, answered in order
+
+    Request:  {"id": n, "method": name, "args": [...], "kwargs": {...}}
+    Reply:    {"id": n, "result": value} or {"id": n, "error": message, "type": class name}
+    (a JobConflict error also carries the conflicting "job" and its "app_id")
+    A call with "progress": true in kwargs also gets {"id": n, "progress": [...]}
+    frames before its reply. Each connection has its own thread, so a
+    blocking call (wait_output, long-polls) only holds up its own client.
+    Progress may be reported from several launch threads at once, so every
+    frame goes out under the connection's send lock.
+    """
+
+    def handle(self):
+        portal = self.server.portal
+        self._send_lock = threading.Lock()
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ProtocolError, OSError) as e:
+                logger.warning(f"Dropping supervisor client: {e}")
+                return
+            if request is None:
+                return
+            reply = self._call(portal, request)
+            try:
+                self._send(reply)
+            except OSError:
+                return
+
+    def _send(self, message: Dict):
+        """Write one whole frame; concurrent senders never interleave"""
+        with self._send_lock:
+            send_message(self.request, message)
+
+    def _call(self, portal: Portal, request: Dict) -> Dict:
+        call_id = request.get('id')
+        name = request.get('method', '')
+        try:
+            if name in REMOTE_ATTRIBUTES:
+                value = resolve(portal, name)
+                return {'id': call_id, 'result': dict(value) if isinstance(value, dict) else value}
+            if name not in REMOTE_METHODS:
+                raise AttributeError(f"'{name}' is not available over the supervisor socket")
+            kwargs = dict(request.get('kwargs') or {})
+            if kwargs.get(PROGRESS_ARGUMENT):
+                kwargs[PROGRESS_ARGUMENT] = lambda *update: self._send({'id': call_id, 'progress': list(update)})
+            return {'id': call_id, 'result': resolve(portal, name)(*request.get('args', []), **kwargs)}
+        except JobConflict as e:
+            return {'id': call_id, 'error': str(e), 'type': type(e).__name__, 'job': e.job, 'app_id': e.app_id}
+        except Exception as e:
+            return {'id': call_id, 'error': str(e), 'type': type(e).__name__}
+
+
+# The daemon needs Unix sockets (POSIX, and Windows builds with AF_UNIX)
+SUPERVISOR_SUPPORTED = hasattr(socket, 'AF_UNIX')
+
+if SUPERVISOR_SUPPORTED:
+    class SupervisorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """
+        Unix-socket front end of a Portal and its ProcessManager
+
+        Only the owner of the socket can connect (mode 0600): a client can
+        launch arbitrary commands.
+        """
+
+        daemon_threads = True
+
+        def __init__(self, portal: Portal, socket_path: str):
+            self.portal = portal
+            self.socket_path = socket_path
+            _remove_stale_socket(socket_path)
+            previous_umask = os.umask(0o077)
+            try:
+                super().__init__(socket_path, _ConnectionHandler)
+            finally:
+                os.umask(previous_umask)
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+
+def _remove_stale_socket(socket_path: str):
+    """Remove a socket file left by a dead daemon; refuse to replace a live one"""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"A supervisor is already listening on {socket_path}")
+
+
+def main():
+    """
+    Run the supervisor daemon until SIGTERM/SIGINT; children keep running and are re-adopted next time
+
+    The daemon also owns the application catalog and the job table, so
+    start it from the directory holding config/applications.json.
+    """
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    state_dir = os.environ.get("STATE_DIR", "state") or '.'
+    socket_path = os.environ.get("SUPERVISOR_SOCKET") or os.path.join(state_dir, DEFAULT_SOCKET_NAME)
+    if not SUPERVISOR_SUPPORTED:
+        logger.error("The supervisor daemon needs Unix domain sockets, which this platform lacks")
+        sys.exit(1)
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+
+    try:
+        # Before anything touches the state directory
+        _remove_stale_socket(socket_path)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    portal = create_portal(create_process_manager())
+    server = SupervisorServer(portal, socket_path)
+    start_supervision(portal)
+
+    def shut_down(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down")
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shut_down)
+    signal.signal(signal.SIGINT, shut_down)
+    logger.info(f"Supervisor listening on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import base64
+import json
+import socket
+import struct
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+try:
+    import msgpack
+except ImportError:  # JSON framing works everywhere, msgpack is just more compact
+    msgpack = None
+
+# Frame layout: 4-byte big-endian length, 1-byte codec, payload (length includes the codec byte)
+HEADER = struct.Struct('>I')
+CODEC_MSGPACK = b'M'
+CODEC_JSON = b'J'
+
+# Largest frame either side accepts (bytes)
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# ProcessManager methods and attributes the web tier may use through the
+# supervisor socket. Dotted names reach into ProcessManager.telemetry, and
+# portal.* names into the daemon's Portal (application catalog and jobs).
+REMOTE_METHODS = frozenset({
+    'launch_application', 'stop_application', 'stop_all_applications', 'is_running',
+    'launch_applications', 'stop_applications',
+    'get_app_state', 'get_app_states', 'flag_restart', 'notify_status_change',
+    'wait_for_status_change', 'get_restart_status', 'wait_until_ready', 'get_readiness',
+    'get_exit_status', 'get_running_processes', 'get_process_info', 'get_app_metrics',
+    'get_input_status', 'send_input', 'write_terminal', 'resize_terminal',
+    'read_output', 'wait_output', 'get_output', 'read_log', 'get_log_segments', 'search_output',
+    'telemetry.snapshot', 'telemetry.get_current', 'telemetry.get_history',
+    'portal.get_applications', 'portal.get_application', 'portal.get_applications_by_category',
+    'portal.add_application', 'portal.remove_application', 'portal.submit', 'portal.submit_bulk',
+    'portal.get_job', 'portal.get_active_job', 'portal.list_jobs', 'portal.status_snapshot'
+})
+REMOTE_ATTRIBUTES = frozenset({
+    'restart_pending', 'status_generation', 'telemetry.interval'
+})
+
+# Keyword argument carrying a progress callback; progress is streamed back as interim frames
+PROGRESS_ARGUMENT = 'progress'
+
+
+class ProtocolError(Exception):
+    """Malformed or oversized frame"""
+
+
+def _plain(value: Any) -> Any:
+    """Frozen configs (mapping proxies, tuples) as plain dicts and lists"""
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    """JSON has no bytes type; carry them base64-encoded"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'__bytes__': base64.b64encode(bytes(value)).decode('ascii')}
+    raise TypeError(f"{type(value).__name__} is not serializable")
+
+
+def _json_object_hook(value: Dict) -> Any:
+    if len(value) == 1 and '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+def encode(message: Dict, codec: Optional[bytes] = None) -> bytes:
+    """
+    Serialize a message into one frame
+
+    Args:
+        message: Message dictionary
+        codec: CODEC_MSGPACK or CODEC_JSON; msgpack when installed by default
+    """
+    if codec is None:
+        codec = CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+    message = _plain(message)
+    if codec == CODEC_MSGPACK:
+        payload = msgpack.packb(message, use_bin_type=True)
+    else:
+        payload = json.dumps(message, default=_json_default, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(payload) + 1) + codec + payload
+
+
+def decode(codec: bytes, payload: bytes) -> Dict:
+    """Deserialize the payload of one frame"""
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ProtocolError("Received a msgpack frame but msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if codec == CODEC_JSON:
+        return json.loads(payload, object_hook=_json_object_hook)
+    raise ProtocolError(f"Unknown codec {codec!r}")
+
+
+def send_message(sock: socket.socket, message: Dict, codec: Optional[bytes] = None):
+    """Write one framed message"""
+    sock.sendall(encode(message, codec))
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict]:
+    """
+    Read one framed message
+
+    Returns:
+        Optional[Dict]: The message, or None if the peer closed the connection
+        between messages
+
+    Raises:
+        ProtocolError: On a malformed frame or one cut off mid-way
+    """
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if not 0 < length <= MAX_FRAME_SIZE:
+        raise ProtocolError(f"Bad frame length {length}")
+    body = _recv_exactly(sock, length)
+    if body is None:
+        raise ProtocolError("Connection closed mid-frame")
+    return decode(body[:1], body[1:])
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Exactly size bytes, or None on EOF before the first byte"""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            if buffer:
+                raise ProtocolError("Connection closed mid-frame")
+            return None
+        buffer += chunk
+    return bytes(buffer)
@@ -0,0 +1,287 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import psutil
+
+from utils.process_tree import IS_WINDOWS
+from utils.resource_limits import read_cgroup_usage
+
+logger = logging.getLogger(__name__)
+
+# Seconds between samples
+DEFAULT_SAMPLE_INTERVAL = 2.0
+
+# Samples kept per application (10 minutes at the default interval)
+DEFAULT_HISTORY_SIZE = 300
+
+# Columns of each sample, in storage order
+SAMPLE_FIELDS = (
+    'timestamp', 'cpu_percent', 'rss', 'num_fds', 'num_threads',
+    'read_bytes', 'write_bytes', 'processes'
+)
+
+
+class TelemetrySampler(threading.Thread):
+    """
+    Samples resource usage of every running application's process trees
+
+    psutil.Process handles are cached across samples so cpu_percent() has a
+    previous reading to compare against (a fresh handle always reports 0.0).
+    Each tick builds one parent map of the whole system, walks it from every
+    tracked group leader to find grandchildren, and sums CPU, RSS, file
+    descriptors, threads and IO per component and per application. Samples
+    land in fixed-size ring buffers, one per application.
+
+    Components running in a cgroup of their own are read from the cgroup's
+    accounting files instead, and when every component is, the process table
+    is not walked at all. There 'rss' is the cgroup's memory.current (page
+    cache included), 'num_threads' its task count, and IO covers every
+    process that ever ran in it.
+    """
+
+    def __init__(self, get_roots: Callable[[], Dict[str, Dict[str, int]]],
+                 interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 history_size: int = DEFAULT_HISTORY_SIZE,
+                 get_cgroups: Optional[Callable[[], Dict[str, Dict[str, str]]]] = None):
+        """
+        Args:
+            get_roots: Returns {app_id: {component_name: pid}} for every
+                running application
+            interval: Seconds between samples
+            history_size: Samples kept per application
+            get_cgroups: Returns {app_id: {component_name: cgroup directory}}
+                for components that have one
+        """
+        super().__init__(name="telemetry-sampler", daemon=True)
+        self.get_roots = get_roots
+        self.get_cgroups = get_cgroups
+        self.interval = interval
+        self.history_size = history_size
+        self._handles: Dict[int, psutil.Process] = {}
+        self._cpu_usage: Dict[str, Tuple[float, int]] = {}  # cgroup -> (monotonic time, usage_usec)
+        self._history: Dict[str, deque] = {}  # app_id -> deque of sample tuples
+        self._current: Dict[str, Dict] = {}  # app_id -> latest sample with component breakdown
+        self._forgotten: Set[str] = set()  # forgotten while a sample was being taken
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Ask the sampler thread to exit"""
+        self._stop_event.set()
+
+    def run(self):
+        """Sample on a fixed cadence until stopped"""
+        logger.info(f"Sampling process telemetry every {self.interval}s")
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Telemetry sample failed: {e}")
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def sample(self):
+        """Take one sample of every running application"""
+        with self._lock:
+            self._forgotten.clear()
+        roots = self.get_roots()
+        cgroups = self.get_cgroups() if self.get_cgroups is not None and roots else {}
+        children = None
+        now = time.time()
+
+        seen = set()
+        seen_cgroups = set()
+        current = {}
+        for app_id, components in roots.items():
+            app_totals = _empty_totals()
+            breakdown = {}
+            for name, pid in components.items():
+                cgroup = cgroups.get(app_id, {}).get(name)
+                totals = self._cgroup_totals(cgroup) if cgroup else None
+                if totals is not None:
+                    seen_cgroups.add(cgroup)
+                else:
+                    totals = _empty_totals()
+                    if children is None:
+                        children = self._children_map()
+                    for process in self._tree(pid, children):
+                        seen.add(process.pid)
+                        _accumulate(totals, process)
+                breakdown[name] = totals
+                for field, value in totals.items():
+                    app_totals[field] += value
+            current[app_id] = dict(app_totals, timestamp=now, components=breakdown)
+
+        with self._lock:
+            for app_id in self._forgotten:
+                current.pop(app_id, None)
+            for app_id, sample in current.items():
+                history = self._history.get(app_id)
+                if history is None or history.maxlen != self.history_size:
+                    history = self._history[app_id] = deque(history or (), maxlen=self.history_size)
+                history.append(tuple(sample[field] for field in SAMPLE_FIELDS))
+            # Stopped applications have no current reading; their history
+            # stays until the process manager forgets them
+            self._current = current
+
+        # Drop handles of processes that have gone away
+        for pid in [pid for pid in self._handles if pid not in seen]:
+            del self._handles[pid]
+        for cgroup in [cgroup for cgroup in self._cpu_usage if cgroup not in seen_cgroups]:
+            del self._cpu_usage[cgroup]
+
+    def _cgroup_totals(self, cgroup: str) -> Optional[Dict[str, float]]:
+        """Readings of one component from its cgroup, or None if it cannot be read"""
+        usage = read_cgroup_usage(cgroup)
+        if usage is None:
+            return None
+        totals = _empty_totals()
+        now = time.monotonic()
+        previous = self._cpu_usage.get(cgroup)
+        self._cpu_usage[cgroup] = (now, usage['cpu_usec'])
+        if previous is not None and now > previous[0]:
+            # Microseconds of CPU per second of wall time, as a percentage of one core
+            totals['cpu_percent'] = max(0, usage['cpu_usec'] - previous[1]) / ((now - previous[0]) * 1e4)
+        totals['rss'] = usage['memory']
+        totals['num_threads'] = usage['tasks']
+        totals['read_bytes'] = usage['read_bytes']
+        totals['write_bytes'] = usage['write_bytes']
+        totals['processes'] = len(usage['pids'])
+        for pid in usage['pids']:
+            try:
+                totals['num_fds'] += len(os.listdir(f"/proc/{pid}/fd"))
+            except OSError:
+                pass
+        return totals
+
+    def _children_map(self) -> Dict[int, List[int]]:
+        """One pass over the process table: parent pid -> child pids"""
+        children: Dict[int, List[int]] = {}
+        for process in psutil.process_iter(['ppid']):
+            ppid = process.info.get('ppid')
+            if ppid:
+                children.setdefault(ppid, []).append(process.pid)
+        return children
+
+    def _tree(self, root_pid: int, children: Dict[int, List[int]]) -> List[psutil.Process]:
+        """Cached handles for a process and all its descendants"""
+        tree = []
+        stack = [root_pid]
+        visited = set()
+        while stack:
+            pid = stack.pop()
+            if pid in visited:
+                continue
+            visited.add(pid)
+            process = self._handle(pid)
+            if process is None:
+                continue
+            tree.append(process)
+            stack.extend(children.get(pid, ()))
+        return tree
+
+    def _handle(self, pid: int) -> Optional[psutil.Process]:
+        """Reuse the cached handle for pid unless the pid was recycled"""
+        process = self._handles.get(pid)
+        try:
+            if process is None or not process.is_running():
+                process = psutil.Process(pid)
+                # Prime the CPU counter; the first real reading comes next tick
+                process.cpu_percent()
+                self._handles[pid] = process
+            return process
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self._handles.pop(pid, None)
+            return None
+
+    def get_current(self, app_id: str) -> Optional[Dict]:
+        """
+        Latest sample for an application
+
+        Args:
+            app_id: Application to look up
+
+        Returns:
+            Optional[Dict]: Totals, timestamp and per-component breakdown, or
+            None if the application was not running at the last sample
+        """
+        return self._current.get(app_id)
+
+    def get_history(self, app_id: str, limit: Optional[int] = None) -> Dict[str, List]:
+        """
+        Recent samples for an application as one list per field
+
+        Args:
+            app_id: Application to look up
+            limit: Only return the newest this many samples
+
+        Returns:
+            Dict[str, List]: Field name -> values, oldest first
+        """
+        with self._lock:
+            samples = list(self._history.get(app_id, ()))
+        if limit is not None:
+            samples = samples[-limit:] if limit > 0 else []
+        return {field: [sample[index] for sample in samples] for index, field in enumerate(SAMPLE_FIELDS)}
+
+    def snapshot(self, limit: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Current and recent values for every application with telemetry
+
+        Args:
+            limit: Only include the newest this many history samples
+
+        Returns:
+            Dict[str, Dict]: app_id -> {'current': ..., 'history': ...}
+        """
+        with self._lock:
+            app_ids = list(self._history)
+        return {
+            app_id: {'current': self.get_current(app_id), 'history': self.get_history(app_id, limit)}
+            for app_id in app_ids
+        }
+
+    def forget(self, app_id: str):
+        """Drop the stored history and latest sample of an application"""
+        with self._lock:
+            self._history.pop(app_id, None)
+            self._current.pop(app_id, None)
+            self._forgotten.add(app_id)
+
+
+def _empty_totals() -> Dict[str, float]:
+    """Zeroed counters for summing a process tree"""
+    return {
+        'cpu_percent': 0.0, 'rss': 0, 'num_fds': 0, 'num_threads': 0,
+        'read_bytes': 0, 'write_bytes': 0, 'processes': 0
+    }
+
+
+def _accumulate(totals: Dict[str, float], process: psutil.Process):
+    """Add one process's readings to the running totals"""
+    try:
+        with process.oneshot():
+            totals['cpu_percent'] += process.cpu_percent()
+            totals['rss'] += process.memory_info().rss
+            totals['num_threads'] += process.num_threads()
+            totals['num_fds'] += process.num_handles() if IS_WINDOWS else process.num_fds()
+            io = _io_counters(process)
+            if io is not None:
+                totals['read_bytes'] += io[0]
+                totals['write_bytes'] += io[1]
+            totals['processes'] += 1
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        pass
+
+
+def _io_counters(process: psutil.Process) -> Optional[Tuple[int, int]]:
+    """Read and written bytes, or None where the platform or permissions don't allow it"""
+    try:
+        counters = process.io_counters()
+    except (AttributeError, NotImplementedError, psutil.AccessDenied):
+        return None
+    return counters.read_bytes, counters.write_bytes